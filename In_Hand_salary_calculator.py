@@ -1,9 +1,49 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-from tkinter import font as tkfont
+import argparse
+import csv
+import functools
+import io
+import itertools
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+import salary_engine
+import salary_store
+
+# Rows read, calculated and written at a time in batch mode
+DEFAULT_CHUNK_SIZE = 50000
+
+# Output columns of batch mode, in salary breakup order
+BREAKUP_COLUMNS = [key + suffix for _, key in salary_engine.BREAKDOWN
+                   for suffix in ("_monthly", "_annual")]
+
+# Input and output columns of solve mode
+SOLVE_INPUT_COLUMNS = ("ctc", "target_in_hand", "bonus", "gratuity", "medical", "other_allowances")
+# Solve mode inputs whose blanks mean "not given" rather than zero
+SOLVE_TARGET_COLUMNS = ("ctc", "target_in_hand")
+SOLVE_COLUMNS = ["ctc"] + list(salary_engine.INPUT_COLUMNS) + ["in_hand_monthly", "feasible"]
+
+# tkinter is imported by load_tk() only when the GUI is opened, so batch
+# jobs and scripts that import this module never pay for the GUI stack
+tk = ttk = messagebox = tkfont = None
+
+
+def load_tk():
+    """Imports tkinter for the GUI and returns the tkinter module"""
+    global tk, ttk, messagebox, tkfont
+    if tk is None:
+        import tkinter as tk
+        from tkinter import ttk, messagebox
+        from tkinter import font as tkfont
+    return tk
+
 
 class IndianSalaryCalculator:
     def __init__(self, root):
+        load_tk()
         self.root = root
         self.root.title("Indian Salary Calculator (Detailed)")
         self.root.geometry("950x750")
@@ -25,6 +65,20 @@ class IndianSalaryCalculator:
         self.regime_var = tk.StringVar(value="new")  # new, old, new_post_2025
         self.in_hand_var = tk.DoubleVar()
         
+        # Breakup model that only recomputes what an edited field affects
+        self.model = salary_engine.IncrementalSalary()
+        self.input_vars = {
+            "basic": self.basic_var,
+            "hra": self.hra_var,
+            "special_allowance": self.special_allowance_var,
+            "bonus": self.bonus_var,
+            "pf_employer": self.pf_employer_var,
+            "gratuity": self.gratuity_var,
+            "medical": self.medical_var,
+            "other_allowances": self.other_allowances_var
+        }
+        self.shown_rows = {}
+        
         # Create main container
         self.main_frame = ttk.Frame(self.root, padding="10")
         self.main_frame.pack(fill=tk.BOTH, expand=True)
@@ -49,6 +103,12 @@ class IndianSalaryCalculator:
             ttk.Label(input_frame, text=label).grid(row=i, column=0, sticky=tk.W, padx=5, pady=2)
             ttk.Entry(input_frame, textvariable=var).grid(row=i, column=1, sticky=tk.EW, padx=5, pady=2)
         
+        # CTC to split into Basic, HRA, Special Allowance and PF
+        ctc_row = len(components)
+        ttk.Label(input_frame, text="CTC (Annual):").grid(row=ctc_row, column=0, sticky=tk.W, padx=5, pady=2)
+        ttk.Entry(input_frame, textvariable=self.ctc_var).grid(row=ctc_row, column=1, sticky=tk.EW, padx=5, pady=2)
+        ttk.Button(input_frame, text="Split CTC", command=self.split_ctc).grid(row=ctc_row, column=2, padx=5, pady=2)
+        
         # Tax Regime Selection
         regime_frame = ttk.LabelFrame(self.main_frame, text="Tax Regime", padding="10")
         regime_frame.pack(fill=tk.X, pady=5)
@@ -81,194 +141,125 @@ class IndianSalaryCalculator:
         ttk.Label(summary_frame, text="Monthly In-Hand Salary:", font=self.title_font).pack(side=tk.LEFT, padx=5)
         self.in_hand_label = ttk.Label(summary_frame, text="₹0", font=('Arial', 12, 'bold'))
         self.in_hand_label.pack(side=tk.LEFT, padx=5)
+        self.best_regime_label = ttk.Label(summary_frame, text="")
+        self.best_regime_label.pack(side=tk.RIGHT, padx=5)
         
         # Action Buttons
         button_frame = ttk.Frame(self.main_frame)
         button_frame.pack(fill=tk.X, pady=5)
         
         ttk.Button(button_frame, text="Share Results", command=self.share_results).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Compare Regimes", command=self.compare_regimes).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Reset", command=self.reset_fields).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Formulas", command=self.show_formulas).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Help", command=self.show_help).pack(side=tk.RIGHT, padx=5)
+        
+        # Recalculate live on every keystroke once results are shown
+        for var in self.input_vars.values():
+            var.trace_add("write", self.on_input_change)
+        self.regime_var.trace_add("write", self.on_input_change)
+    
+    def update_model(self):
+        """Copies the input fields into the model; raises on a malformed field"""
+        inputs = {name: var.get() for name, var in self.input_vars.items()}
+        self.model.set(regime=self.regime_var.get(), **inputs)
     
     def calculate_salary(self):
         try:
-            # Get monthly components
-            monthly_basic = self.basic_var.get()
-            monthly_hra = self.hra_var.get()
-            monthly_special_allowance = self.special_allowance_var.get()
-            monthly_bonus = self.bonus_var.get() / 12  # Convert annual bonus to monthly
-            monthly_pf_employer = self.pf_employer_var.get()
-            monthly_gratuity = self.gratuity_var.get()
-            monthly_medical = self.medical_var.get()
-            monthly_other_allowances = self.other_allowances_var.get()
-            
-            # Calculate annual values
-            annual_basic = monthly_basic * 12
-            annual_hra = monthly_hra * 12
-            annual_special_allowance = monthly_special_allowance * 12
-            annual_bonus = self.bonus_var.get()
-            annual_pf_employer = monthly_pf_employer * 12
-            annual_gratuity = monthly_gratuity * 12
-            annual_medical = monthly_medical * 12
-            annual_other_allowances = monthly_other_allowances * 12
-            
-            # Calculate gross salary
-            monthly_gross = (monthly_basic + monthly_hra + monthly_special_allowance + 
-                            monthly_bonus + monthly_medical + monthly_other_allowances)
-            annual_gross = monthly_gross * 12
-            
-            # Standard Deduction (₹50,000 as per Indian tax laws)
-            annual_standard_deduction = 50000
-            
-            # Professional Tax (₹200 per month in most states)
-            annual_professional_tax = 2400
-            monthly_professional_tax = 200
-            
-            # Calculate taxable income based on regime
-            regime = self.regime_var.get()
-            
-            if regime == "old":
-                # Old regime deductions
-                taxable_income = annual_gross - annual_standard_deduction
-                
-                # HRA exemption calculation
-                hra_exemption = self.calculate_hra_exemption(
-                    annual_basic, annual_hra, 
-                    min(monthly_hra*12, 0.5*(annual_gross - annual_basic)))  # For metro cities
-                taxable_income -= hra_exemption
-                
-                # Standard deduction already subtracted
-                # Section 80C deductions (PF, LIC, etc.)
-                section_80c = min(annual_pf_employer + 150000, 150000)  # Max ₹1.5L
-                taxable_income -= section_80c
-                
-                # Medical insurance deduction (Section 80D)
-                section_80d = min(annual_medical, 25000)  # For individuals <60 years
-                taxable_income -= section_80d
-                
-                # Calculate tax as per old regime slabs
-                annual_income_tax = self.calculate_old_regime_tax(taxable_income)
-                
-            elif regime == "new":
-                # New regime (current)
-                taxable_income = annual_gross - annual_standard_deduction
-                annual_income_tax = self.calculate_new_regime_tax(taxable_income)
-                
-            else:  # new_post_2025
-                # New regime post 2025-26 budget
-                taxable_income = annual_gross - annual_standard_deduction
-                annual_income_tax = self.calculate_new_post_2025_regime_tax(taxable_income)
-            
-            # Cess (4% of income tax)
-            annual_income_tax *= 1.04
-            monthly_income_tax = annual_income_tax / 12
-            
-            # Calculate in-hand salary
-            monthly_deductions = monthly_professional_tax + monthly_income_tax
-            monthly_in_hand = monthly_gross - monthly_deductions
-            
-            # Update treeview
-            self.update_treeview(
-                monthly_basic, annual_basic,
-                monthly_hra, annual_hra,
-                monthly_special_allowance, annual_special_allowance,
-                monthly_bonus, annual_bonus,
-                monthly_medical, annual_medical,
-                monthly_other_allowances, annual_other_allowances,
-                monthly_pf_employer, annual_pf_employer,
-                monthly_gratuity, annual_gratuity,
-                monthly_professional_tax, annual_professional_tax,
-                monthly_income_tax, annual_income_tax,
-                monthly_in_hand, monthly_in_hand * 12
-            )
-            
-            # Update summary
-            self.in_hand_label.config(text=f"₹{monthly_in_hand:,.2f}")
-            
+            self.update_model()
+            self.show_results()
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
     
-    def calculate_hra_exemption(self, basic, hra, rent_paid):
-        """Calculate HRA exemption as per old regime rules"""
-        # Least of:
-        # 1. Actual HRA received
-        # 2. Rent paid - 10% of basic salary
-        # 3. 50% of basic (metro) or 40% (non-metro)
-        exemption1 = hra
-        exemption2 = rent_paid - (0.1 * basic)
-        exemption3 = 0.5 * basic  # Assuming metro city
-        
-        return min(exemption1, exemption2, exemption3)
+    def on_input_change(self, *args):
+        if not self.tree.get_children():
+            return
+        try:
+            self.update_model()
+        except (tk.TclError, ValueError):
+            # Field is mid-edit (empty, "-", "1e"); keep the last results
+            return
+        self.show_results()
     
-    def calculate_old_regime_tax(self, taxable_income):
-        """Calculate tax as per old regime slabs"""
-        if taxable_income <= 250000:
-            return 0
-        elif taxable_income <= 500000:
-            return (taxable_income - 250000) * 0.05
-        elif taxable_income <= 1000000:
-            return 12500 + (taxable_income - 500000) * 0.20
+    def show_results(self):
+        results = self.model.breakdown()
+        
+        # Update treeview
+        self.update_treeview(results)
+        
+        # Update summary
+        self.in_hand_var.set(results["in_hand_monthly"])
+        self.in_hand_label.config(text=f"₹{results['in_hand_monthly']:,.2f}")
+        
+        comparison = self.model.comparison()
+        best_regime = comparison["best_regime"]
+        if best_regime == self.regime_var.get():
+            self.best_regime_label.config(text="Lowest tax regime selected")
         else:
-            return 112500 + (taxable_income - 1000000) * 0.30
+            self.best_regime_label.config(
+                text=f"{salary_engine.REGIME_NAMES[best_regime]} saves ₹{comparison['savings_annual']:,.2f}/year")
     
-    def calculate_new_regime_tax(self, taxable_income):
-        """Calculate tax as per current new regime slabs"""
-        if taxable_income <= 300000:
-            return 0
-        elif taxable_income <= 600000:
-            return (taxable_income - 300000) * 0.05
-        elif taxable_income <= 900000:
-            return 15000 + (taxable_income - 600000) * 0.10
-        elif taxable_income <= 1200000:
-            return 45000 + (taxable_income - 900000) * 0.15
-        elif taxable_income <= 1500000:
-            return 90000 + (taxable_income - 1200000) * 0.20
-        else:
-            return 150000 + (taxable_income - 1500000) * 0.30
+    def split_ctc(self):
+        try:
+            structure = salary_engine.split_ctc(
+                self.ctc_var.get(),
+                bonus=self.bonus_var.get(),
+                gratuity=self.gratuity_var.get(),
+                medical=self.medical_var.get(),
+                other_allowances=self.other_allowances_var.get()
+            )
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            return
+        
+        if not structure["feasible"]:
+            messagebox.showerror("Error", "The CTC is too low to cover the bonus, gratuity, "
+                                 "medical and other allowances")
+            return
+        
+        self.basic_var.set(round(float(structure["basic"]), 2))
+        self.hra_var.set(round(float(structure["hra"]), 2))
+        self.special_allowance_var.set(round(float(structure["special_allowance"]), 2))
+        self.pf_employer_var.set(round(float(structure["pf_employer"]), 2))
+        self.calculate_salary()
     
-    def calculate_new_post_2025_regime_tax(self, taxable_income):
-        """Calculate tax as per new regime post 2025-26 budget"""
-        # Assuming simplified slabs (example - actual budget may vary)
-        if taxable_income <= 400000:
-            return 0
-        elif taxable_income <= 800000:
-            return (taxable_income - 400000) * 0.05
-        elif taxable_income <= 1200000:
-            return 20000 + (taxable_income - 800000) * 0.10
-        elif taxable_income <= 1600000:
-            return 60000 + (taxable_income - 1200000) * 0.15
-        elif taxable_income <= 2000000:
-            return 120000 + (taxable_income - 1600000) * 0.20
-        else:
-            return 200000 + (taxable_income - 2000000) * 0.25
+    def update_treeview(self, results):
+        # Rows are created once and then edited in place, only when they change
+        for label, key in salary_engine.BREAKDOWN:
+            values = (
+                label,
+                f"{results[key + '_monthly']:,.2f}",
+                f"{results[key + '_annual']:,.2f}"
+            )
+            if not self.tree.exists(key):
+                self.tree.insert("", tk.END, iid=key, values=values)
+            elif self.shown_rows.get(key) != values:
+                self.tree.item(key, values=values)
+            self.shown_rows[key] = values
     
-    def update_treeview(self, *args):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def compare_regimes(self):
+        try:
+            regime = self.regime_var.get()
+            self.update_model()
+            comparison = self.model.comparison()
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            return
         
-        # Add new items
-        components = [
-            ("Basic Salary", args[0], args[1]),
-            ("HRA", args[2], args[3]),
-            ("Special Allowance", args[4], args[5]),
-            ("Bonus/Ex Gratia", args[6], args[7]),
-            ("Medical Insurance", args[8], args[9]),
-            ("Other Allowances", args[10], args[11]),
-            ("Employer PF Contribution", args[12], args[13]),
-            ("Gratuity", args[14], args[15]),
-            ("Professional Tax", args[16], args[17]),
-            ("Income Tax", args[18], args[19]),
-            ("In-Hand Salary", args[20], args[21])
-        ]
+        result_text = f"{'Regime':<40}{'Income Tax (₹)':>16}{'In-Hand (₹)':>16}\n"
+        result_text += "-" * 72 + "\n"
+        for name in salary_engine.REGIMES:
+            result_text += (f"{salary_engine.REGIME_NAMES[name]:<40}"
+                            f"{comparison[name + '_income_tax_annual']:>16,.2f}"
+                            f"{comparison[name + '_in_hand_monthly']:>16,.2f}\n")
         
-        for component in components:
-            self.tree.insert("", tk.END, values=(
-                component[0],
-                f"{component[1]:,.2f}",
-                f"{component[2]:,.2f}"
-            ))
+        best_regime = comparison["best_regime"]
+        result_text += f"\nLowest tax: {salary_engine.REGIME_NAMES[best_regime]}\n"
+        if best_regime != regime:
+            result_text += (f"Switching from {salary_engine.REGIME_NAMES[regime]} saves "
+                            f"₹{comparison['savings_annual']:,.2f} a year\n")
+        
+        messagebox.showinfo("Regime Comparison", result_text)
     
     def share_results(self):
         if not self.tree.get_children():
@@ -289,16 +280,17 @@ class IndianSalaryCalculator:
         
         # Show regime used
         regime = self.regime_var.get()
-        regime_name = {
-            "old": "Old Tax Regime",
-            "new": "New Tax Regime (Current)",
-            "new_post_2025": "New Tax Regime (Post 2025-26 Budget)"
-        }.get(regime, "Unknown Regime")
+        regime_name = salary_engine.REGIME_NAMES.get(regime, "Unknown Regime")
         result_text += f"\nTax Calculation: {regime_name}\n"
         
         messagebox.showinfo("Salary Breakup", result_text)
     
     def reset_fields(self):
+        # Clear results first so resetting the fields doesn't recalculate
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        self.shown_rows = {}
+        
         # Reset all input fields
         self.basic_var.set(0)
         self.hra_var.set(0)
@@ -310,11 +302,9 @@ class IndianSalaryCalculator:
         self.other_allowances_var.set(0)
         self.regime_var.set("new")
         
-        # Clear results
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
+        self.in_hand_var.set(0)
         self.in_hand_label.config(text="₹0")
+        self.best_regime_label.config(text="")
     
     def show_formulas(self):
         formulas_text = """
@@ -336,13 +326,17 @@ class IndianSalaryCalculator:
         
         7. Standard Deduction: ₹50,000 (applied before tax calculation)
         
-        8. HRA Exemption (Old Regime Only):
+        8. CTC Split ('Split CTC'):
+           Basic = 40% of CTC, HRA = 50% of Basic, PF as above,
+           Special Allowance = CTC - Bonus - all other components
+        
+        9. HRA Exemption (Old Regime Only):
            Least of:
            - Actual HRA received
            - Rent paid - 10% of Basic Salary
            - 50% of Basic (metro) or 40% (non-metro)
         
-        9. Tax Calculations:
+        10. Tax Calculations:
         
            Old Regime:
            - Up to ₹2.5L: 0%
@@ -366,9 +360,9 @@ class IndianSalaryCalculator:
            - ₹16L-20L: 20%
            - Above ₹20L: 25%
         
-        10. Cess: 4% of income tax
+        11. Cess: 4% of income tax
         
-        11. In-Hand Salary:
+        12. In-Hand Salary:
             Gross Salary - (Professional Tax + Income Tax + Employee PF)
         """
         messagebox.showinfo("Calculation Formulas", formulas_text)
@@ -387,7 +381,8 @@ class IndianSalaryCalculator:
            - New Regime (current)
            - New Regime (Post 2025-26 Budget) - projected
         
-        3. Click 'Calculate Salary' to see detailed breakup
+        3. Click 'Calculate Salary' to see detailed breakup; after that,
+           results update as you type
         
         4. The calculator will show:
            - Monthly and annual values for each component
@@ -397,13 +392,550 @@ class IndianSalaryCalculator:
         5. Use 'Share Results' to get a text version of your salary breakup
         6. 'Reset' clears all fields for a new calculation
         7. 'Formulas' shows all calculation methods used
+        8. Enter an annual CTC and click 'Split CTC' to fill in
+           Basic, HRA, Special Allowance and Employer PF
         
         Note: This calculator provides estimates based on standard Indian tax laws.
         Actual salary structure may vary based on company policies and location.
         """
         messagebox.showinfo("Help", help_text)
 
-if __name__ == "__main__":
-    root = tk.Tk()
+def _to_float_array(values, blank=0.0):
+    """Converts a column of CSV strings to floats, reading blanks as blank"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        return np.array([value.strip() or blank for value in values], dtype=np.float64)
+
+
+def read_employee_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE,
+                         numeric_columns=salary_engine.INPUT_COLUMNS, nullable_columns=()):
+    """
+    Streams an employee CSV, Parquet or employee table (.etab) file in
+    fixed-size chunks.
+
+    Columns named in numeric_columns are returned as float arrays; any other
+    columns (employee IDs, names) are passed through unchanged as lists.
+    Blank CSV fields and Parquet nulls in numeric columns are read as zero,
+    or as NaN in the columns named in nullable_columns.
+    Numeric columns of an employee table are views into the memory-mapped
+    file, so they are read from disk only as they are calculated.
+
+    Blank lines of a CSV are skipped. A CSV with a header but no rows
+    yields one empty chunk, so its columns are still known.
+
+    Yields:
+        dict[str, sequence]: One chunk of columns, at most chunk_size rows.
+
+    Raises:
+        ValueError: If a CSV row has more or fewer fields than the header.
+    """
+    if path.lower().endswith(salary_store.TABLE_EXTENSION):
+        table = salary_store.EmployeeTable.open(path)
+        for columns in table.iter_chunks(chunk_size):
+            yield {name: values if name in numeric_columns else values.tolist()
+                   for name, values in columns.items()}
+        return
+
+    if path.lower().endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files needs pyarrow: pip install pyarrow")
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            chunk = {}
+            for name, column in zip(batch.schema.names, batch.columns):
+                if name in numeric_columns:
+                    fill = np.nan if name in nullable_columns else 0
+                    chunk[name] = column.fill_null(fill).to_numpy(zero_copy_only=False).astype(np.float64)
+                else:
+                    chunk[name] = column.to_pylist()
+            yield chunk
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [name.strip() for name in header]
+
+        def checked_rows():
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) != len(header):
+                    raise ValueError(f"{path}, line {reader.line_num}: {len(row)} fields, "
+                                     f"expected {len(header)} as in the header")
+                yield row
+
+        rows_iter = checked_rows()
+        first = True
+        while True:
+            rows = list(itertools.islice(rows_iter, chunk_size))
+            if not rows and not first:
+                break
+            first = False
+            # Transposed per header column, so a chunk without rows still has every column
+            columns = list(zip(*rows)) if rows else [()] * len(header)
+            chunk = {}
+            for name, values in zip(header, columns):
+                if name in numeric_columns:
+                    chunk[name] = _to_float_array(values, np.nan if name in nullable_columns else 0.0)
+                else:
+                    chunk[name] = list(values)
+            yield chunk
+
+
+def _passthrough_columns(chunk):
+    """Names of the columns that are copied from input to output unchanged"""
+    return [name for name, values in chunk.items() if not isinstance(values, np.ndarray)]
+
+
+class CsvBreakupWriter:
+    """
+    Writes salary breakups to a CSV file one chunk at a time.
+    """
+    def __init__(self, path, passthrough_columns, output_columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        csv.writer(self.file).writerow(passthrough_columns + output_columns)
+
+    @staticmethod
+    def encode(chunk, results, output_columns):
+        """Formats one chunk as CSV text; runs in the worker processes"""
+        columns = [chunk[name] for name in _passthrough_columns(chunk)]
+        for name in output_columns:
+            values = results[name]
+            if values.dtype.kind == "f":
+                columns.append(list(map("%.2f".__mod__, values.tolist())))
+            elif values.dtype.kind == "i":
+                # Exact mode: integer paise
+                columns.append(salary_engine.format_paise(values))
+            else:
+                columns.append(values.tolist())
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(zip(*columns))
+        return buffer.getvalue()
+
+    def write(self, chunk, encoded):
+        self.file.write(encoded)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetBreakupWriter:
+    """
+    Writes salary breakups to a Parquet file, one row group per chunk.
+    """
+    def __init__(self, path, passthrough_columns, output_columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Writing Parquet files needs pyarrow: pip install pyarrow")
+
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.passthrough_columns = passthrough_columns
+        self.writer = None
+
+    @staticmethod
+    def encode(chunk, results, output_columns):
+        """Selects the output columns of one chunk; runs in the worker processes"""
+        return {name: results[name] for name in output_columns}
+
+    def write(self, chunk, encoded):
+        arrays = {name: chunk[name] for name in self.passthrough_columns}
+        for name, values in encoded.items():
+            if values.dtype.kind == "i":
+                # Exact mode: integer paise become decimal rupees
+                arrays[name] = self.decimal_array(values)
+            else:
+                arrays[name] = values
+        table = self.pa.table(arrays)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def decimal_array(self, paise):
+        """Wraps int64 paise as an exact decimal128(20, 2) rupee array without copying through floats"""
+        words = np.empty((len(paise), 2), dtype="<i8")
+        words[:, 0] = paise
+        words[:, 1] = np.where(paise < 0, -1, 0)
+        return self.pa.Array.from_buffers(self.pa.decimal128(20, 2), len(paise),
+                                          [None, self.pa.py_buffer(words.tobytes())])
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _process_chunk(chunk, calculate, encode, output_columns):
+    """Calculates and encodes one chunk of employees"""
+    results = calculate(chunk)
+    return len(results[output_columns[0]]), encode(chunk, results, output_columns)
+
+
+def _run_chunks(input_path, output_path, calculate, output_columns, numeric_columns,
+                chunk_size, workers, nullable_columns=()):
+    """Streams input_path through calculate and writes output_columns to output_path"""
+    writer_class = ParquetBreakupWriter if output_path.lower().endswith(".parquet") else CsvBreakupWriter
+    function = functools.partial(_process_chunk, calculate=calculate,
+                                 encode=writer_class.encode, output_columns=output_columns)
+    chunks = read_employee_chunks(input_path, chunk_size, numeric_columns, nullable_columns)
+    writer = None
+    total_rows = 0
+    try:
+        for chunk, (rows, encoded) in salary_engine.iter_parallel(function, chunks, workers):
+            if writer is None:
+                writer = writer_class(output_path, _passthrough_columns(chunk), output_columns)
+            writer.write(chunk, encoded)
+            total_rows += rows
+        if writer is None:
+            # An input without even a header still gets an output with one
+            chunk = {name: np.empty(0) for name in numeric_columns}
+            writer = writer_class(output_path, [], output_columns)
+            writer.write(chunk, function(chunk)[1])
+    finally:
+        if writer is not None:
+            writer.close()
+    return total_rows
+
+
+def _calculate_breakup(chunk, regime, compare, exact):
+    if exact:
+        results = salary_engine.calculate_salary_batch_paise(chunk, regime)
+        if compare:
+            results.update(salary_engine.compare_regimes_paise(chunk, baseline=regime))
+    else:
+        results = salary_engine.calculate_salary_batch(chunk, regime)
+        if compare:
+            results.update(salary_engine.compare_regimes(chunk, baseline=regime))
+    return results
+
+
+def run_batch(input_path, output_path, regime="new", chunk_size=DEFAULT_CHUNK_SIZE, workers=1,
+              compare=False, exact=False):
+    """
+    Calculates salary breakups for every employee in input_path.
+
+    The input is processed chunk_size rows at a time, so memory use does not
+    depend on the size of the file. With more than one worker, chunks are
+    calculated and formatted in a process pool and written in input order.
+    With compare, the tax under every regime, the cheapest regime and the
+    savings against regime are added to each row. With exact, amounts are
+    calculated in integer paise with statutory rounding (see
+    salary_engine.calculate_salary_batch_paise) instead of binary floats.
+
+    Returns:
+        int: Number of employees processed.
+    """
+    output_columns = BREAKUP_COLUMNS + (salary_engine.comparison_columns() if compare else [])
+    calculate = functools.partial(_calculate_breakup, regime=regime, compare=compare, exact=exact)
+    return _run_chunks(input_path, output_path, calculate, output_columns,
+                       salary_engine.INPUT_COLUMNS, chunk_size, workers)
+
+
+def _table_column(name, values, dtype=None):
+    """Converts a passthrough column to dtype, or to int64 or float64 when dtype is None"""
+    for candidate in [dtype] if dtype is not None else [np.int64, np.float64]:
+        try:
+            return np.array(values, dtype=candidate)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    if dtype is not None:
+        raise ValueError(f"Column {name!r} has a value that is not {np.dtype(dtype).name}")
+    return None
+
+
+def run_convert(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Converts an employee CSV or Parquet file to an employee table (.etab).
+
+    The salary inputs are stored as float64. Other columns are kept if every
+    value in the first chunk is an integer (int64) or a number (float64);
+    text columns such as names are dropped.
+
+    Returns:
+        tuple[int, list[str]]: Number of employees and the dropped columns.
+    """
+    writer = None
+    dropped = []
+    total_rows = 0
+    try:
+        for chunk in read_employee_chunks(input_path, chunk_size):
+            if writer is None:
+                dtypes = {}
+                for name, values in chunk.items():
+                    if isinstance(values, np.ndarray):
+                        dtypes[name] = np.float64
+                        continue
+                    column = _table_column(name, values)
+                    if column is None:
+                        dropped.append(name)
+                    else:
+                        dtypes[name] = column.dtype
+                writer = salary_store.EmployeeTableWriter(output_path, dtypes)
+            writer.append({name: values if isinstance(values, np.ndarray)
+                           else _table_column(name, values, writer.dtypes[name])
+                           for name, values in chunk.items() if name in writer.dtypes})
+            total_rows += len(next(iter(chunk.values())))
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is None:
+        writer = salary_store.EmployeeTableWriter(
+            output_path, dict.fromkeys(salary_engine.INPUT_COLUMNS, np.float64))
+    writer.close()
+    return total_rows, dropped
+
+
+def _solve_structure(chunk, regime, basic_ratio, hra_ratio):
+    """Splits the rows that give a ctc and solves those that give only a target_in_hand"""
+    given = {name: chunk[name] for name in SOLVE_TARGET_COLUMNS if name in chunk}
+    if not given:
+        raise ValueError("Input needs a 'ctc' or 'target_in_hand' column")
+    rows = len(next(iter(given.values())))
+    has_ctc = ~np.isnan(given["ctc"]) if "ctc" in given else np.zeros(rows, dtype=bool)
+    has_target = (~np.isnan(given["target_in_hand"]) & ~has_ctc if "target_in_hand" in given
+                  else np.zeros(rows, dtype=bool))
+
+    # Rows that give neither stay zero and infeasible
+    structure = {name: np.zeros(rows) for name in SOLVE_COLUMNS}
+    structure["feasible"] = np.zeros(rows, dtype=bool)
+    for mask in (has_ctc, has_target):
+        if not mask.any():
+            continue
+        fixed = {name: chunk[name][mask] for name in ("bonus", "gratuity", "medical", "other_allowances")
+                 if name in chunk}
+        if mask is has_ctc:
+            part = salary_engine.split_ctc(given["ctc"][mask], basic_ratio=basic_ratio,
+                                           hra_ratio=hra_ratio, **fixed)
+            part["in_hand_monthly"] = salary_engine.calculate_salary_batch(part, regime)["in_hand_monthly"]
+        else:
+            part = salary_engine.solve_for_in_hand(given["target_in_hand"][mask], regime,
+                                                   basic_ratio=basic_ratio, hra_ratio=hra_ratio, **fixed)
+        for name in SOLVE_COLUMNS:
+            structure[name][mask] = part[name]
+    return structure
+
+
+def run_solve(input_path, output_path, regime="new", basic_ratio=salary_engine.DEFAULT_BASIC_RATIO,
+              hra_ratio=salary_engine.DEFAULT_HRA_RATIO, chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+    """
+    Finds the salary structure for every row of input_path.
+
+    Rows give either an annual "ctc" to split or a monthly "target_in_hand" to
+    reach, plus optional fixed bonus, gratuity, medical and other allowances.
+    A row with a ctc is split even if it also has a target; a row with
+    neither is written as zero and not feasible.
+
+    Returns:
+        int: Number of rows processed.
+    """
+    calculate = functools.partial(_solve_structure, regime=regime, basic_ratio=basic_ratio,
+                                  hra_ratio=hra_ratio)
+    return _run_chunks(input_path, output_path, calculate, SOLVE_COLUMNS,
+                       SOLVE_INPUT_COLUMNS, chunk_size, workers, SOLVE_TARGET_COLUMNS)
+
+
+def parse_sweep_values(text):
+    """
+    Parses the values of a swept input: a number, a comma-separated list or
+    an inclusive start:stop:step range such as "20000:500000:100".
+    """
+    try:
+        if ":" in text:
+            start, stop, step = (float(part) for part in text.split(":"))
+            if step <= 0 or stop < start:
+                raise ValueError
+            count = math.floor((stop - start) / step + 1e-9) + 1
+            return start + step * np.arange(count)
+        values = [float(part) for part in text.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected a number, a list like 0,100000 or a range like 20000:500000:100, got {text!r}")
+    return values[0] if len(values) == 1 else np.array(values)
+
+
+def _sweep_block(block, grid, outputs, encode, output_columns):
+    """Evaluates and encodes one block of a sweep"""
+    table = grid.table(block, outputs)
+    return len(table["regime"]), encode(table, table, output_columns)
+
+
+def run_sweep(output_path, grid, regimes=salary_engine.REGIMES, outputs=salary_engine.SWEEP_OUTPUTS,
+              chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+    """
+    Tabulates in-hand salary and tax over every combination of input values.
+
+    The swept input with the most values is evaluated along each grid row
+    (see salary_engine.SweepGrid); the table lists one row per regime and
+    grid point.
+
+    Returns:
+        int: Number of rows written.
+    """
+    # Longest axis last, where slab segments are evaluated a run at a time
+    grid = salary_engine.SweepGrid(dict(sorted(grid.items(), key=lambda item: np.size(item[1]))))
+    writer_class = ParquetBreakupWriter if output_path.lower().endswith(".parquet") else CsvBreakupWriter
+    output_columns = grid.names + list(outputs)
+    function = functools.partial(_sweep_block, grid=grid, outputs=outputs,
+                                 encode=writer_class.encode, output_columns=output_columns)
+    writer = writer_class(output_path, ["regime"], output_columns)
+    total_rows = 0
+    try:
+        for (regime, _, _), (rows, encoded) in salary_engine.iter_parallel(
+                function, grid.blocks(regimes, chunk_size), workers):
+            writer.write({"regime": [regime] * rows}, encoded)
+            total_rows += rows
+    finally:
+        writer.close()
+    return total_rows
+
+
+def _output_columns(text):
+    outputs = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in outputs if name not in salary_engine.RESULT_COLUMNS]
+    if unknown or not outputs:
+        raise argparse.ArgumentTypeError(
+            f"unknown output column {unknown[0]!r}" if unknown else "no output columns given")
+    return outputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indian Salary Calculator (Detailed)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Calculate salary breakups for a CSV or Parquet file of employees")
+    batch_parser.add_argument("input", help="Employee file (.csv, .parquet or .etab) with columns: "
+                              + ", ".join(salary_engine.INPUT_COLUMNS))
+    batch_parser.add_argument("output", help="Breakup file to write (.csv or .parquet)")
+    batch_parser.add_argument("--regime", choices=salary_engine.REGIMES, default="new",
+                              help="Tax regime (default: new)")
+    batch_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                              help=f"Rows processed at a time (default: {DEFAULT_CHUNK_SIZE})")
+    batch_parser.add_argument("--compare", action="store_true",
+                              help="Also report tax under every regime and the cheapest one")
+    batch_parser.add_argument("--exact", action="store_true",
+                              help="Calculate in exact integer paise with statutory rounding "
+                                   "(default: fast floating point)")
+    batch_parser.add_argument("--workers", type=int, default=1,
+                              help="Worker processes, 0 for one per CPU (default: 1)")
+
+    solve_parser = subparsers.add_parser(
+        "solve", help="Find the salary structure for a target CTC or monthly in-hand salary")
+    solve_parser.add_argument("input", help="File (.csv or .parquet) with a 'ctc' (annual) or "
+                              "'target_in_hand' (monthly) column, and optionally "
+                              "bonus, gratuity, medical and other_allowances")
+    solve_parser.add_argument("output", help="Structure file to write (.csv or .parquet)")
+    solve_parser.add_argument("--regime", choices=salary_engine.REGIMES, default="new",
+                              help="Tax regime (default: new)")
+    solve_parser.add_argument("--basic-ratio", type=float, default=salary_engine.DEFAULT_BASIC_RATIO,
+                              help=f"Basic as a share of CTC (default: {salary_engine.DEFAULT_BASIC_RATIO})")
+    solve_parser.add_argument("--hra-ratio", type=float, default=salary_engine.DEFAULT_HRA_RATIO,
+                              help=f"HRA as a share of Basic (default: {salary_engine.DEFAULT_HRA_RATIO})")
+    solve_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                              help=f"Rows processed at a time (default: {DEFAULT_CHUNK_SIZE})")
+    solve_parser.add_argument("--workers", type=int, default=1,
+                              help="Worker processes, 0 for one per CPU (default: 1)")
+
+    sweep_parser = subparsers.add_parser(
+        "sweep", help="Tabulate in-hand salary and tax over a grid of salary inputs")
+    sweep_parser.add_argument("output", help="Table to write (.csv or .parquet)")
+    for name in salary_engine.INPUT_COLUMNS:
+        sweep_parser.add_argument("--" + name.replace("_", "-"), dest=name, type=parse_sweep_values,
+                                  metavar="VALUES",
+                                  help=f"{'Annual' if name == 'bonus' else 'Monthly'} {name.replace('_', ' ')}: "
+                                       "a number, a list like 0,100000 or a range like 20000:500000:100 "
+                                       "(default: 0)")
+    sweep_parser.add_argument("--regime", action="append", choices=salary_engine.REGIMES,
+                              help="Tax regime to include; repeat for several (default: all)")
+    sweep_parser.add_argument("--outputs", type=_output_columns, default=list(salary_engine.SWEEP_OUTPUTS),
+                              help="Comma-separated result columns "
+                                   f"(default: {','.join(salary_engine.SWEEP_OUTPUTS)})")
+    sweep_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                              help=f"Grid points processed at a time (default: {DEFAULT_CHUNK_SIZE})")
+    sweep_parser.add_argument("--workers", type=int, default=1,
+                              help="Worker processes, 0 for one per CPU (default: 1)")
+
+    convert_parser = subparsers.add_parser(
+        "convert", help="Convert a CSV or Parquet file of employees to a memory-mapped employee table")
+    convert_parser.add_argument("input", help="Employee file (.csv or .parquet)")
+    convert_parser.add_argument("output", help=f"Employee table to write ({salary_store.TABLE_EXTENSION})")
+    convert_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                                help=f"Rows read at a time (default: {DEFAULT_CHUNK_SIZE})")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        if args.chunk_size < 1:
+            parser.error("--chunk-size must be at least 1")
+        if not os.path.exists(args.input):
+            parser.error(f"Input file not found: {args.input}")
+        start = time.perf_counter()
+        try:
+            rows, dropped = run_convert(args.input, args.output, args.chunk_size)
+        except (ImportError, ValueError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        elapsed = time.perf_counter() - start
+        if dropped:
+            print(f"Dropped non-numeric columns: {', '.join(dropped)}", file=sys.stderr)
+        print(f"Converted {rows:,} rows in {elapsed:.2f}s -> {args.output}", file=sys.stderr)
+        return 0
+
+    if args.command == "sweep":
+        if args.chunk_size < 1:
+            parser.error("--chunk-size must be at least 1")
+        if args.workers < 0:
+            parser.error("--workers must not be negative")
+        grid = {name: getattr(args, name) for name in salary_engine.INPUT_COLUMNS
+                if getattr(args, name) is not None}
+        start = time.perf_counter()
+        try:
+            rows = run_sweep(args.output, grid, args.regime or salary_engine.REGIMES, args.outputs,
+                             args.chunk_size, args.workers)
+        except (ImportError, ValueError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        elapsed = time.perf_counter() - start
+        print(f"Wrote {rows:,} rows in {elapsed:.2f}s -> {args.output}", file=sys.stderr)
+        return 0
+
+    if args.command in ("batch", "solve"):
+        if args.chunk_size < 1:
+            parser.error("--chunk-size must be at least 1")
+        if args.workers < 0:
+            parser.error("--workers must not be negative")
+        if not os.path.exists(args.input):
+            parser.error(f"Input file not found: {args.input}")
+        start = time.perf_counter()
+        try:
+            if args.command == "batch":
+                rows = run_batch(args.input, args.output, args.regime, args.chunk_size, args.workers,
+                                 args.compare, args.exact)
+            else:
+                rows = run_solve(args.input, args.output, args.regime, args.basic_ratio,
+                                 args.hra_ratio, args.chunk_size, args.workers)
+        except (ImportError, ValueError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        elapsed = time.perf_counter() - start
+        print(f"Processed {rows:,} rows in {elapsed:.2f}s -> {args.output}", file=sys.stderr)
+        return 0
+
+    root = load_tk().Tk()
     app = IndianSalaryCalculator(root)
     root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
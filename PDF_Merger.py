@@ -1,17 +1,53 @@
+import argparse
+import functools
+import json
 import os
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-from PyPDF2 import PdfMerger
+import queue
+import sys
+import threading
+import time
+
+import parallel
+import pdf_merge
+
+# Milliseconds between checks of a running merge for progress
+POLL_INTERVAL_MS = 100
+
+# tkinter is imported by load_tk() only when the GUI is opened, so batch
+# runs on servers without a display never need the GUI stack
+tk = filedialog = messagebox = simpledialog = ttk = None
+
+
+def load_tk():
+    """Imports tkinter for the GUI and returns the tkinter module"""
+    global tk, filedialog, messagebox, simpledialog, ttk
+    if tk is None:
+        import tkinter as tk
+        from tkinter import filedialog, messagebox, simpledialog, ttk
+    return tk
+
+
+def format_duration(seconds):
+    """Seconds as m:ss, or h:mm:ss from an hour up"""
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
 
 class PDFMergerApp:
     def __init__(self, root):
+        load_tk()
         self.root = root
         self.root.title("PDF Merger")
         self.root.geometry("600x400")
         
         # Variables
         self.pdf_files = []
+        # Page selections like "1-3,7,-1", by file; files without one are merged whole
+        self.page_ranges = {}
         self.output_filename = tk.StringVar(value="merged.pdf")
+        self.deduplicate = tk.BooleanVar(value=True)
+        self.bookmarks = tk.BooleanVar(value=False)
         
         # Create UI
         self.create_widgets()
@@ -47,6 +83,9 @@ class PDFMergerApp:
         move_down_btn = tk.Button(control_frame, text="Move Down", command=self.move_down)
         move_down_btn.pack(side=tk.LEFT, padx=5)
         
+        pages_btn = tk.Button(control_frame, text="Pages...", command=self.set_pages)
+        pages_btn.pack(side=tk.LEFT, padx=5)
+        
         # Output file frame
         output_frame = tk.LabelFrame(self.root, text="Output File", padx=5, pady=5)
         output_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -58,9 +97,17 @@ class PDFMergerApp:
         browse_btn = tk.Button(output_frame, text="Browse...", command=self.browse_output)
         browse_btn.pack(side=tk.RIGHT, padx=5)
         
+        # Write fonts and images shared by the inputs only once
+        dedup_check = tk.Checkbutton(self.root, text="Share identical fonts and images between files",
+                                     variable=self.deduplicate)
+        dedup_check.pack(anchor=tk.W, padx=10)
+        
+        bookmarks_check = tk.Checkbutton(self.root, text="Add a bookmark for each file", variable=self.bookmarks)
+        bookmarks_check.pack(anchor=tk.W, padx=10)
+        
         # Merge button
-        merge_btn = tk.Button(self.root, text="Merge PDFs", command=self.merge_pdfs, bg="#4CAF50", fg="white")
-        merge_btn.pack(fill=tk.X, padx=10, pady=10)
+        self.merge_btn = tk.Button(self.root, text="Merge PDFs", command=self.merge_pdfs, bg="#4CAF50", fg="white")
+        self.merge_btn.pack(fill=tk.X, padx=10, pady=10)
         
     def add_pdfs(self):
         files = filedialog.askopenfilenames(
@@ -72,14 +119,45 @@ class PDFMergerApp:
             for file in files:
                 if file not in self.pdf_files:
                     self.pdf_files.append(file)
-                    self.listbox.insert(tk.END, os.path.basename(file))
+                    self.listbox.insert(tk.END, self.list_label(file))
+    
+    def list_label(self, path):
+        pages = self.page_ranges.get(path)
+        return f"{os.path.basename(path)} [{pages}]" if pages else os.path.basename(path)
     
     def remove_pdf(self):
         selection = self.listbox.curselection()
         if selection:
             index = selection[0]
             self.listbox.delete(index)
-            self.pdf_files.pop(index)
+            self.page_ranges.pop(self.pdf_files.pop(index), None)
+    
+    def set_pages(self):
+        """Asks which pages of the selected file to merge"""
+        selection = self.listbox.curselection()
+        if not selection:
+            messagebox.showinfo("Pages", "Select a PDF file first.")
+            return
+        index = selection[0]
+        path = self.pdf_files[index]
+        pages = simpledialog.askstring(
+            "Pages", f"Pages of {os.path.basename(path)} to merge, e.g. 1-3,7,-1\n(leave empty for all pages):",
+            initialvalue=self.page_ranges.get(path, ""), parent=self.root)
+        if pages is None:
+            return
+        pages = pages.strip()
+        if pages:
+            try:
+                pdf_merge.parse_page_ranges(pages)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            self.page_ranges[path] = pages
+        else:
+            self.page_ranges.pop(path, None)
+        self.listbox.delete(index)
+        self.listbox.insert(index, self.list_label(path))
+        self.listbox.selection_set(index)
     
     def move_up(self):
         selection = self.listbox.curselection()
@@ -129,44 +207,190 @@ class PDFMergerApp:
             messagebox.showerror("Error", "Please specify an output file!")
             return
         
+        # Add a progress bar
+        self.progress = tk.Toplevel(self.root)
+        self.progress.title("Merging PDFs...")
+        self.progress.geometry("340x150")
+        # Closing the window cancels the merge
+        self.progress.protocol("WM_DELETE_WINDOW", self.cancel_merge)
+        
+        self.progress_label = tk.Label(self.progress, text="Merging PDF files...")
+        self.progress_label.pack(pady=5)
+        
+        self.progress_bar = ttk.Progressbar(self.progress, orient="horizontal", length=250, mode="determinate")
+        self.progress_bar.pack(pady=5)
+        
+        self.rate_label = tk.Label(self.progress, text="")
+        self.rate_label.pack(pady=2)
+        
+        self.cancel_btn = tk.Button(self.progress, text="Cancel", command=self.cancel_merge)
+        self.cancel_btn.pack(pady=5)
+        self.merge_btn.config(state=tk.DISABLED)
+        
+        # Merge on a background thread; it reports back through the queue
+        self.merge_events = queue.Queue()
+        self.merge_cancel = threading.Event()
+        threading.Thread(target=self.run_merge,
+                         args=([pdf_merge.MergeInput(path, self.page_ranges.get(path)) for path in self.pdf_files],
+                               output_path, self.deduplicate.get(), self.bookmarks.get(), self.merge_cancel,
+                               self.merge_events),
+                         daemon=True).start()
+        self.root.after(POLL_INTERVAL_MS, self.poll_merge)
+    
+    def cancel_merge(self):
+        """Asks the merge thread to stop after the file it is on"""
+        self.merge_cancel.set()
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.progress_label.config(text="Cancelling...")
+    
+    @staticmethod
+    def run_merge(inputs, output_path, deduplicate, bookmarks, cancel, events):
+        """Runs on the merge thread; never touches Tk"""
         try:
-            merger = PdfMerger()
-            
-            # Add a progress bar
-            progress = tk.Toplevel(self.root)
-            progress.title("Merging PDFs...")
-            progress.geometry("300x100")
-            
-            label = tk.Label(progress, text="Merging PDF files...")
-            label.pack(pady=5)
-            
-            progress_bar = ttk.Progressbar(progress, orient="horizontal", length=250, mode="determinate")
-            progress_bar.pack(pady=5)
-            
-            self.root.update()
-            
-            # Add each PDF to the merger
-            for i, pdf in enumerate(self.pdf_files):
-                merger.append(pdf)
-                progress_bar["value"] = (i + 1) / len(self.pdf_files) * 100
-                progress.update()
-            
-            # Write the merged PDF
-            with open(output_path, "wb") as f:
-                merger.write(f)
+            pages = pdf_merge.merge_pdfs(
+                inputs, output_path,
+                progress=lambda status: events.put(("progress", status)),
+                deduplicate=deduplicate, bookmarks=bookmarks, cancel=cancel)
+            events.put(("done", output_path, pages))
+        except pdf_merge.MergeCancelled:
+            events.put(("cancelled",))
+        except Exception as e:
+            events.put(("error", str(e)))
+    
+    def poll_merge(self):
+        """Applies the merge thread's events to the window"""
+        while True:
+            try:
+                event = self.merge_events.get_nowait()
+            except queue.Empty:
+                self.root.after(POLL_INTERVAL_MS, self.poll_merge)
+                return
             
-            progress.destroy()
-            messagebox.showinfo("Success", f"PDFs merged successfully!\nSaved to: {output_path}")
+            if event[0] == "progress":
+                status = event[1]
+                self.progress_bar["value"] = status.files_done / status.files_total * 100
+                if not self.merge_cancel.is_set():
+                    self.progress_label.config(
+                        text=f"Merged {status.files_done} of {status.files_total} files ({status.pages} pages)")
+                eta = status.eta
+                self.rate_label.config(
+                    text=f"{status.pages_per_second:,.0f} pages/s, {status.bytes_written / 1024 / 1024:,.1f} MB "
+                         f"written" + ("" if eta is None else f", {format_duration(eta)} left"))
+                continue
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to merge PDFs:\n{str(e)}")
-            if 'progress' in locals():
-                progress.destroy()
+            self.progress.destroy()
+            self.merge_btn.config(state=tk.NORMAL)
+            if event[0] == "done":
+                messagebox.showinfo("Success", f"PDFs merged successfully!\nSaved to: {event[1]}")
+            elif event[0] == "cancelled":
+                messagebox.showinfo("Cancelled", "The merge was cancelled and no output was written.")
+            else:
+                messagebox.showerror("Error", f"Failed to merge PDFs:\n{event[1]}")
+            return
+
+def run_batch(manifest_path, summary_path=None, workers=None, deduplicate=False, bookmarks=False,
+              log_format="text"):
+    """
+    Runs every merge job of a manifest (see pdf_merge.read_manifest).
+
+    Jobs run in a pool of workers, each job in one worker, and a line is
+    printed to stderr as each one finishes. The summary, with one result
+    per job in manifest order, is written as JSON to summary_path ("-" for
+    stdout). With deduplicate, identical streams within each job's output
+    are written once, and with bookmarks each input gets a bookmark (see
+    pdf_merge.merge_pdfs).
+
+    With log_format "json", stderr gets structured records instead, one
+    JSON object per line: "batch_start", "progress" while jobs run (pages
+    per second, bytes written and time left, see pdf_merge.MergeProgress),
+    "job" as each finishes and "batch_done".
+
+    Returns:
+        dict: The summary.
+    """
+    jobs = pdf_merge.read_manifest(manifest_path)
+    structured = log_format == "json"
+    if structured:
+        pdf_merge.log_record("batch_start", manifest=manifest_path, jobs=len(jobs))
+    start = time.perf_counter()
+    results = []
+    run_job = functools.partial(pdf_merge.run_job, deduplicate=deduplicate, bookmarks=bookmarks,
+                                log_progress=structured)
+    for done, (_, result) in enumerate(parallel.iter_parallel(run_job, jobs, workers), 1):
+        results.append(result)
+        if structured:
+            pdf_merge.log_record("job", jobs_done=done, jobs=len(jobs), **result)
+            continue
+        detail = (f"{result['pages']} pages" if result["status"] == "ok" else result["error"])
+        print(f"[{done}/{len(jobs)}] {result['status']} {result['output']}: {detail} "
+              f"({result['seconds']:.2f}s)", file=sys.stderr)
+
+    failed = sum(result["status"] != "ok" for result in results)
+    summary = {
+        "manifest": manifest_path,
+        "jobs": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "pages": sum(result["pages"] for result in results),
+        "seconds": round(time.perf_counter() - start, 3),
+        "results": results,
+    }
+    if structured:
+        pdf_merge.log_record("batch_done", **{key: value for key, value in summary.items() if key != "results"})
+    if summary_path == "-":
+        json.dump(summary, sys.stdout, indent=1)
+        sys.stdout.write("\n")
+    elif summary_path:
+        with open(summary_path, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=1)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF Merger")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Run the merge jobs listed in a CSV or JSON manifest")
+    batch_parser.add_argument("manifest", help="CSV with one job per row (output file, then input files "
+                              "or glob patterns, optionally with pages like report.pdf[1-3,-1]), "
+                              "or JSON list of {\"output\": ..., \"inputs\": [...]}")
+    batch_parser.add_argument("--summary", help="Write a JSON summary of every job here ('-' for stdout)")
+    batch_parser.add_argument("--deduplicate", action="store_true",
+                              help="Write identical fonts, images and other streams once per output")
+    batch_parser.add_argument("--bookmarks", action="store_true",
+                              help="Add a bookmark for each input, keeping its own bookmarks beneath it")
+    batch_parser.add_argument("--workers", type=int, default=0,
+                              help="Worker processes, 0 for one per CPU (default: 0)")
+    batch_parser.add_argument("--log-format", choices=("text", "json"), default="text",
+                              help="Progress on stderr as text lines, or as JSON records with pages/s, "
+                                   "bytes written and time left (default: text)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "batch":
+        if args.workers < 0:
+            parser.error("--workers must not be negative")
+        if not os.path.exists(args.manifest):
+            parser.error(f"Manifest not found: {args.manifest}")
+        try:
+            summary = run_batch(args.manifest, args.summary, args.workers, args.deduplicate, args.bookmarks,
+                                args.log_format)
+        except (ValueError, OSError) as e:
+            if args.log_format == "json":
+                pdf_merge.log_record("error", error=str(e))
+            else:
+                print(f"Error: {e}", file=sys.stderr)
+            return 1
+        if args.log_format == "text":
+            print(f"Merged {summary['succeeded']:,} of {summary['jobs']:,} jobs, {summary['pages']:,} pages "
+                  f"in {summary['seconds']:.2f}s", file=sys.stderr)
+        return 1 if summary["failed"] else 0
 
-def main():
-    root = tk.Tk()
+    root = load_tk().Tk()
     app = PDFMergerApp(root)
     root.mainloop()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,7 +1,62 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox, simpledialog
-import PyPDF2
+import argparse
+import getpass
+import glob
+import json
 import os
+import queue
+import signal
+import sys
+import threading
+
+import pdf_unlock
+import pdf_watch
+
+# Milliseconds between checks of a running batch for progress
+POLL_INTERVAL_MS = 100
+# Where the GUI remembers which candidate password opened which file
+HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".pdf_password_history.json")
+
+# tkinter is imported by load_tk() only when the GUI is opened, so batch
+# runs on servers without a display never need the GUI stack
+tk = filedialog = messagebox = simpledialog = None
+
+
+def load_tk():
+    """Imports tkinter for the GUI and returns the tkinter module"""
+    global tk, filedialog, messagebox, simpledialog
+    if tk is None:
+        import tkinter as tk
+        from tkinter import filedialog, messagebox, simpledialog
+    return tk
+
+
+def summary_message(summary, total_files=None):
+    """
+    Describes the outcome of pdf_unlock.unlock_pdfs for the user.
+
+    Args:
+        total_files (int, optional): Files the user selected, if more than
+            were processed (the rest were cancelled).
+    """
+    total_files = total_files or summary["total"]
+    successful_count = summary[pdf_unlock.UNLOCKED] + summary[pdf_unlock.NOT_ENCRYPTED]
+    message = f"Operation Complete!\n\nSuccessfully unlocked: {successful_count}/{total_files}\n"
+    if summary[pdf_unlock.NOT_ENCRYPTED]:
+        message += f"(of which {summary[pdf_unlock.NOT_ENCRYPTED]} were not encrypted)\n"
+    wrong_password = [os.path.basename(result["path"]) for result in summary["failed"]
+                      if result["status"] == pdf_unlock.WRONG_PASSWORD]
+    unsupported = [f"{os.path.basename(result['path'])}: {result['error']}" for result in summary["failed"]
+                   if result["status"] == pdf_unlock.UNSUPPORTED]
+    errors = [f"{os.path.basename(result['path'])}: {result['error']}" for result in summary["failed"]
+              if result["status"] == pdf_unlock.ERROR]
+    if wrong_password:
+        message += "\nFailed to unlock (check passwords):\n- " + "\n- ".join(wrong_password)
+    if unsupported:
+        message += "\nEncryption not supported:\n- " + "\n- ".join(unsupported)
+    if errors:
+        message += "\nCould not be read:\n- " + "\n- ".join(errors)
+    return message
+
 
 class PasswordRemoverApp:
     """
@@ -11,9 +66,10 @@ class PasswordRemoverApp:
         """
         Initializes the application window and its widgets.
         """
+        load_tk()
         self.root = root
         self.root.title("PDF Password Remover")
-        self.root.geometry("500x250")
+        self.root.geometry("500x300")
         self.root.configure(bg="#f0f0f0")
 
         self.file_paths = []
@@ -37,7 +93,11 @@ class PasswordRemoverApp:
 
         # Button to start the password removal process
         self.remove_button = tk.Button(main_frame, text="Remove Passwords", command=self.start_removal_process, font=("Helvetica", 12, "bold"), bg="#50e3c2", fg="white", relief=tk.FLAT, padx=10, pady=5, state=tk.DISABLED)
-        self.remove_button.pack(pady=20)
+        self.remove_button.pack(pady=(20, 5))
+
+        # Button to try a list of candidate passwords and password rules on every file
+        self.list_button = tk.Button(main_frame, text="Try Password List...", command=self.process_with_password_list, font=("Helvetica", 10), relief=tk.FLAT, padx=10, pady=3, state=tk.DISABLED)
+        self.list_button.pack(pady=5)
 
     def select_files(self):
         """
@@ -52,10 +112,12 @@ class PasswordRemoverApp:
         # Update the status label with the number of selected files
         if self.file_paths:
             self.status_label.config(text=f"{len(self.file_paths)} file(s) selected.")
-            self.remove_button.config(state=tk.NORMAL) # Enable the remove button
+            self.remove_button.config(state=tk.NORMAL) # Enable the remove buttons
+            self.list_button.config(state=tk.NORMAL)
         else:
             self.status_label.config(text="No files selected.")
             self.remove_button.config(state=tk.DISABLED) # Disable if no files are selected
+            self.list_button.config(state=tk.DISABLED)
 
     def start_removal_process(self):
         """
@@ -84,107 +146,372 @@ class PasswordRemoverApp:
             messagebox.showinfo("Cancelled", "Operation cancelled.")
             return
 
-        successful_unlocks = 0
-        failed_files = []
-
         # Try to unlock each file with the provided password
-        for file_path in self.file_paths:
-            if self.remove_password(file_path, password):
-                successful_unlocks += 1
-            else:
-                failed_files.append(os.path.basename(file_path))
-        
-        self.show_summary(successful_unlocks, failed_files)
+        self.start_unlocking([(file_path, password) for file_path in self.file_paths])
 
     def process_with_different_passwords(self):
         """
-        Handles the case where each PDF has a different password.
+        Handles the case where each PDF has a different password. The files
+        are scanned on a background thread first, so that only the
+        encrypted ones are asked for a password.
         """
-        successful_unlocks = 0
-        failed_files = []
+        self.select_button.config(state=tk.DISABLED)
+        self.remove_button.config(state=tk.DISABLED)
+        self.list_button.config(state=tk.DISABLED)
+        self.status_label.config(text=f"Checking {len(self.file_paths)} file(s)...")
+        self.scan_events = queue.Queue()
+        threading.Thread(target=self.run_scan, args=(list(self.file_paths), self.scan_events), daemon=True).start()
+        self.root.after(POLL_INTERVAL_MS, self.poll_scan)
+
+    @staticmethod
+    def run_scan(paths, events):
+        """Runs on the background thread; never touches Tk"""
+        try:
+            events.put(("done", list(pdf_unlock.scan_pdfs(paths))))
+        except Exception as e:
+            events.put(("error", str(e)))
 
-        # Loop through each file and ask for its specific password
-        for file_path in self.file_paths:
-            filename = os.path.basename(file_path)
-            password = simpledialog.askstring("Password", f"Enter password for:\n{filename}", show='*')
-            
-            if password is None: # User cancelled the dialog
-                messagebox.showinfo("Cancelled", "Operation cancelled for remaining files.")
-                break
+    def poll_scan(self):
+        """Asks for the password of each encrypted file once the scan is in"""
+        try:
+            event = self.scan_events.get_nowait()
+        except queue.Empty:
+            self.root.after(POLL_INTERVAL_MS, self.poll_scan)
+            return
+
+        if event[0] == "error":
+            messagebox.showerror("Error", f"An error occurred while checking the files:\n{event[1]}")
+            self.select_button.config(state=tk.NORMAL)
+            self.remove_button.config(state=tk.NORMAL)
+            self.list_button.config(state=tk.NORMAL)
+            return
+
+        items = []
+        scans = []
+        # Loop through each encrypted file and ask for its specific password;
+        # the rest are settled by their scan without one
+        for scan in event[1]:
+            file_path = scan["path"]
+            if scan["status"] == pdf_unlock.ENCRYPTED:
+                filename = os.path.basename(file_path)
+                password = simpledialog.askstring("Password", f"Enter password for:\n{filename}", show='*')
 
-            if self.remove_password(file_path, password):
-                successful_unlocks += 1
+                if password is None: # User cancelled the dialog
+                    messagebox.showinfo("Cancelled", "Operation cancelled for remaining files.")
+                    break
             else:
-                failed_files.append(filename)
-                
-        self.show_summary(successful_unlocks, failed_files)
+                password = ""
 
-    def remove_password(self, file_path, password):
+            items.append((file_path, password))
+            scans.append(scan)
+
+        self.start_unlocking(items, scans=scans)
+
+    def process_with_password_list(self):
+        """
+        Tries candidate passwords from a list, and optionally passwords
+        derived from a details CSV by a template, on every file.
         """
-        Attempts to decrypt a single PDF file and save an unlocked version.
+        list_path = filedialog.askopenfilename(
+            title="Select candidate passwords (one per line), or cancel to skip",
+            filetypes=(("Text files", "*.txt"), ("All files", "*.*"))
+        )
+        details_path = template = None
+        if messagebox.askyesno("Password Rule", "Also derive passwords from a details CSV?\n"
+                               "(one row per file name, e.g. with PAN and date of birth)"):
+            details_path = filedialog.askopenfilename(
+                title="Select details CSV", filetypes=(("CSV files", "*.csv"), ("All files", "*.*"))
+            )
+            template = simpledialog.askstring(
+                "Password Rule", "Password template, using the CSV's columns:\n"
+                "e.g. {pan|upper}{dob|date:%d%m%Y} or {name|lower|first:4}{dob|date:%d%m}")
+        if not list_path and not (details_path and template):
+            messagebox.showinfo("Cancelled", "Operation cancelled.")
+            return
 
-        Args:
-            file_path (str): The path to the PDF file.
-            password (str): The password to try for decryption.
+        try:
+            passwords = pdf_unlock.read_candidates(list_path) if list_path else []
+            details, templates = None, []
+            if details_path and template:
+                pdf_unlock.check_template(template)
+                details, templates = pdf_unlock.read_details(details_path), [template]
+            history = pdf_unlock.PasswordHistory(HISTORY_PATH)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.start_unlocking([(file_path, pdf_unlock.candidate_passwords(file_path, passwords, templates,
+                                                                         details, history))
+                              for file_path in self.file_paths], history)
 
-        Returns:
-            bool: True if successful, False otherwise.
+    def start_unlocking(self, items, history=None, scans=True):
+        """
+        Unlocks the (path, password) pairs in a process pool on a background
+        thread, so the window stays responsive; progress comes back through
+        a queue polled from the Tk thread. scans is passed on to unlock_pdfs
+        as its scan: True, or the items' results from an earlier scan.
         """
+        self.select_button.config(state=tk.DISABLED)
+        self.remove_button.config(state=tk.DISABLED)
+        self.list_button.config(state=tk.DISABLED)
+        self.status_label.config(text=f"Unlocking 0 of {len(items)} file(s)...")
+        self.unlock_events = queue.Queue()
+        threading.Thread(target=self.run_unlock, args=(items, history, scans, self.unlock_events), daemon=True).start()
+        self.root.after(POLL_INTERVAL_MS, self.poll_unlock)
+
+    @staticmethod
+    def run_unlock(items, history, scans, events):
+        """Runs on the background thread; never touches Tk"""
         try:
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                
-                # Check if the PDF is actually encrypted
-                if not reader.is_encrypted:
-                    messagebox.showinfo("Not Encrypted", f"The file '{os.path.basename(file_path)}' is not encrypted.")
-                    # We can consider this a "success" as the goal is an unlocked PDF
-                    return True
-
-                # Attempt to decrypt with the password
-                if reader.decrypt(password):
-                    writer = PyPDF2.PdfWriter()
-                    # Add all pages from the decrypted reader to the writer
-                    for page in reader.pages:
-                        writer.add_page(page)
-                    
-                    # Create the new filename for the unlocked PDF
-                    directory, filename = os.path.split(file_path)
-                    new_filename = filename.replace(".pdf", "_unlocked.pdf")
-                    new_filepath = os.path.join(directory, new_filename)
-                    
-                    # Save the new, unlocked PDF
-                    with open(new_filepath, 'wb') as new_file:
-                        writer.write(new_file)
-                    return True
-                else:
-                    # Password was incorrect
-                    return False
+            summary = pdf_unlock.unlock_pdfs(
+                items, progress=lambda done, total, result: events.put(("progress", done, total)),
+                history=history, scan=scans)
+            if history is not None:
+                history.save()
+            events.put(("done", summary))
         except Exception as e:
-            messagebox.showerror("Error", f"An error occurred with file {os.path.basename(file_path)}:\n{e}")
-            return False
+            events.put(("error", str(e)))
+
+    def poll_unlock(self):
+        """Applies the background thread's events to the window"""
+        while True:
+            try:
+                event = self.unlock_events.get_nowait()
+            except queue.Empty:
+                self.root.after(POLL_INTERVAL_MS, self.poll_unlock)
+                return
+
+            if event[0] == "progress":
+                _, done, total = event
+                self.status_label.config(text=f"Unlocking {done} of {total} file(s)...")
+                continue
 
-    def show_summary(self, successful_count, failed_list):
+            self.select_button.config(state=tk.NORMAL)
+            if event[0] == "done":
+                self.show_summary(event[1])
+            else:
+                messagebox.showerror("Error", f"An error occurred while unlocking:\n{event[1]}")
+                self.remove_button.config(state=tk.NORMAL)
+                self.list_button.config(state=tk.NORMAL)
+            return
+
+    def show_summary(self, summary):
         """
         Displays a summary of the password removal operation.
+
+        Args:
+            summary (dict): As returned by pdf_unlock.unlock_pdfs.
         """
-        total_files = len(self.file_paths)
-        summary_message = f"Operation Complete!\n\nSuccessfully unlocked: {successful_count}/{total_files}\n"
-        
-        if failed_list:
-            summary_message += "\nFailed to unlock (check passwords):\n- " + "\n- ".join(failed_list)
-            
-        messagebox.showinfo("Summary", summary_message)
+        messagebox.showinfo("Summary", summary_message(summary, len(self.file_paths)))
         # Reset the state after the operation
         self.file_paths = []
         self.status_label.config(text="No files selected.")
         self.remove_button.config(state=tk.DISABLED)
+        self.list_button.config(state=tk.DISABLED)
 
 
-if __name__ == "__main__":
-    # To run this script, you need to have PyPDF2 installed.
+def expand_paths(patterns):
+    """
+    File paths, directories and glob patterns as a list of files, each
+    pattern's matches sorted; directories are walked for PDFs (see
+    pdf_unlock.find_pdfs).
+    """
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+        elif os.path.isdir(pattern):
+            paths.extend(pdf_unlock.find_pdfs(pattern))
+        else:
+            paths.append(pattern)
+    return paths
+
+
+def add_password_arguments(parser):
+    """The options choosing where passwords come from, shared by unlock and watch"""
+    parser.add_argument("--password-env", metavar="NAME",
+                        help="Read the password from this environment variable instead of prompting")
+    parser.add_argument("--candidates", metavar="FILE",
+                        help="Try each password in this file, one per line, on every PDF")
+    parser.add_argument("--details", metavar="CSV",
+                        help="Per-file details (one row per file name) for --template")
+    parser.add_argument("--key-column", default="filename",
+                        help="Column of --details holding the file names (default: filename)")
+    parser.add_argument("--template", action="append", default=[],
+                        help="Password derived from a file's --details row, e.g. "
+                             "'{pan|upper}{dob|date:%%d%%m%%Y}'; filters: upper, lower, digits, "
+                             "first:N, last:N, date:FORMAT. May be repeated")
+    parser.add_argument("--history", metavar="FILE",
+                        help="Remember which candidate opened each file here, and try it first next time")
+
+
+def password_source(args, password):
+    """
+    Reads the candidate files named by the password options.
+
+    Args:
+        password (str): The single password given, if any; with candidates
+            it is tried first.
+
+    Returns:
+        tuple: (function giving the password or candidates for a path,
+        PasswordHistory or None).
+
+    Raises:
+        OSError, ValueError: If a file cannot be read or a template is invalid.
+    """
+    if not (args.candidates or args.template):
+        return (lambda path: password), None
+    passwords = pdf_unlock.read_candidates(args.candidates) if args.candidates else []
+    for template in args.template:
+        pdf_unlock.check_template(template)
+    details = pdf_unlock.read_details(args.details, args.key_column) if args.details else None
+    history = pdf_unlock.PasswordHistory(args.history) if args.history else None
+    if password is not None:
+        passwords.insert(0, password)
+    return (lambda path: pdf_unlock.candidate_passwords(path, passwords, args.template, details, history)), history
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF Password Remover")
+    subparsers = parser.add_subparsers(dest="command")
+
+    unlock_parser = subparsers.add_parser(
+        "unlock", help="Unlock PDF files, writing name_unlocked.pdf next to each")
+    unlock_parser.add_argument("files", nargs="+",
+                               help="PDF files, directories or glob patterns, e.g. 'statements/**/*.pdf'")
+    add_password_arguments(unlock_parser)
+    unlock_parser.add_argument("--summary", help="Write a JSON summary here ('-' for stdout)")
+    unlock_parser.add_argument("--workers", type=int, default=0,
+                               help="Worker processes, 0 for one per CPU (default: 0)")
+
+    scan_parser = subparsers.add_parser(
+        "scan", help="Report which PDF files are encrypted, reading only the end of each file")
+    scan_parser.add_argument("files", nargs="+", help="PDF files, directories or glob patterns")
+    scan_parser.add_argument("--only", action="append",
+                             choices=(pdf_unlock.ENCRYPTED, pdf_unlock.NOT_ENCRYPTED, pdf_unlock.CORRUPT,
+                                      pdf_unlock.UNSUPPORTED),
+                             help="List only files with this status (may be repeated)")
+    scan_parser.add_argument("--workers", type=int, default=0,
+                             help="Worker processes, 0 for one per CPU (default: 0)")
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="Keep unlocking the PDFs that arrive in a directory tree, until stopped")
+    watch_parser.add_argument("inbox", help="Directory tree to watch")
+    watch_parser.add_argument("--output", required=True, metavar="DIR",
+                              help="Where to write name_unlocked.pdf, in the inbox's subdirectories")
+    add_password_arguments(watch_parser)
+    watch_parser.add_argument("--journal", metavar="FILE",
+                              help="Record of the files already unlocked, so a restart skips them "
+                                   "(default: .unlock_journal.jsonl in --output)")
+    watch_parser.add_argument("--settle", type=float, default=pdf_watch.DEFAULT_SETTLE_SECONDS,
+                              help="Seconds a file must stay unchanged before it is unlocked "
+                                   f"(default: {pdf_watch.DEFAULT_SETTLE_SECONDS:g})")
+    watch_parser.add_argument("--poll", type=float, default=pdf_watch.DEFAULT_POLL_SECONDS,
+                              help="Seconds between walks of the inbox where inotify is unavailable "
+                                   f"(default: {pdf_watch.DEFAULT_POLL_SECONDS:g})")
+    watch_parser.add_argument("--workers", type=int, default=0,
+                              help="Worker processes, 0 for one per CPU (default: 0)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "watch":
+        if args.workers < 0:
+            parser.error("--workers must not be negative")
+        if args.template and not args.details:
+            parser.error("--template needs --details")
+        if not os.path.isdir(args.inbox):
+            parser.error(f"{args.inbox} is not a directory")
+        password = None
+        if args.password_env:
+            password = os.environ.get(args.password_env)
+            if password is None:
+                parser.error(f"Environment variable {args.password_env} is not set")
+        elif not (args.candidates or args.template):
+            # A daemon has no terminal to prompt on
+            parser.error("watch needs --password-env, --candidates or --template")
+        try:
+            passwords_for, history = password_source(args, password)
+            os.makedirs(args.output, exist_ok=True)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        journal_path = args.journal or os.path.join(args.output, ".unlock_journal.jsonl")
+
+        # Stop cleanly on SIGTERM as on Ctrl+C; the journal keeps what was finished
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            pdf_watch.watch_folder(args.inbox, args.output, passwords_for, journal_path, args.workers,
+                                   settle=args.settle, poll_interval=args.poll, history=history,
+                                   log=lambda message: print(message, file=sys.stderr, flush=True))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.command == "scan":
+        if args.workers < 0:
+            parser.error("--workers must not be negative")
+        paths = expand_paths(args.files)
+        if not paths:
+            parser.error("No PDF files matched")
+        counts = {}
+        # One tab-separated "status path" line per file on stdout, for grep and cut
+        for result in pdf_unlock.scan_pdfs(paths, args.workers):
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            if not args.only or result["status"] in args.only:
+                print(f"{result['status']}\t{result['path']}"
+                      + (f"\t{result['error']}" if "error" in result else ""))
+        print(", ".join(f"{status}: {count}" for status, count in sorted(counts.items())), file=sys.stderr)
+        return 0
+
+    if args.command == "unlock":
+        if args.workers < 0:
+            parser.error("--workers must not be negative")
+        if args.template and not args.details:
+            parser.error("--template needs --details")
+        password = None
+        if args.password_env:
+            password = os.environ.get(args.password_env)
+            if password is None:
+                parser.error(f"Environment variable {args.password_env} is not set")
+        elif not (args.candidates or args.template):
+            password = getpass.getpass("Password for all PDFs: ")
+        paths = expand_paths(args.files)
+        if not paths:
+            parser.error("No PDF files matched")
+
+        try:
+            passwords_for, history = password_source(args, password)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        items = [(path, passwords_for(path)) for path in paths]
+
+        summary = pdf_unlock.unlock_pdfs(
+            items, args.workers,
+            progress=lambda done, total, result: print(
+                f"[{done}/{total}] {result['status']} {result['path']}"
+                + (f" ({result['matched']}, attempt {result['attempts']})" if "matched" in result else "")
+                + (f": {result['error']}" if "error" in result else ""), file=sys.stderr),
+            history=history)
+        if history is not None:
+            history.save()
+        if args.summary == "-":
+            json.dump(summary, sys.stdout, indent=1)
+            sys.stdout.write("\n")
+        elif args.summary:
+            with open(args.summary, "w", encoding="utf-8") as file:
+                json.dump(summary, file, indent=1)
+        print(summary_message(summary), file=sys.stderr)
+        return 1 if summary["failed"] else 0
+
+    # To run the GUI, you need to have PyPDF2 installed.
     # You can install it using pip:
     # pip install PyPDF2
-    
-    root = tk.Tk()
+    root = load_tk().Tk()
     app = PasswordRemoverApp(root)
     root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Bounded process pool shared by the salary and PDF engines.
+
+Both feed streams of work (payroll chunks, PDF files) through worker
+processes without holding the whole stream in memory; this module holds the
+one generator that does it, so the two do not drift apart.
+"""
+
+import collections
+import os
+
+
+def iter_parallel(function, items, workers=None, max_pending=None, initializer=None, initargs=()):
+    """
+    Applies function to every item in a process pool.
+
+    Items are consumed lazily and at most max_pending (default: two per
+    worker) are in flight at once, so an input stream of any size can be fed
+    through with bounded memory. Closing the generator early cancels the
+    items not yet started.
+
+    Args:
+        function (callable): A picklable, module-level function of one item.
+        items (iterable): Items to process, e.g. chunks of salary columns
+            or PDF paths.
+        workers (int, optional): Number of processes, defaults to the CPU
+            count. 1 runs everything in the calling process.
+        initializer (callable, optional): Called as initializer(*initargs)
+            once in every worker process, or once in the calling process
+            when workers is 1.
+
+    Yields:
+        tuple: (item, function(item)) pairs, in input order.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            yield item, function(item)
+        return
+
+    # Imported here because multiprocessing is slow to import and most callers never need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(workers, initializer=initializer, initargs=initargs) as executor:
+        pending = collections.deque()
+        try:
+            for item in items:
+                if len(pending) >= max_pending:
+                    done_item, future = pending.popleft()
+                    yield done_item, future.result()
+                pending.append((item, executor.submit(function, item)))
+            while pending:
+                done_item, future = pending.popleft()
+                yield done_item, future.result()
+        finally:
+            # Closed early: drop the items not started rather than wait for them
+            for _, future in pending:
+                future.cancel()
@@ -0,0 +1,290 @@
+"""
+Benchmarks for the PDF merger and password remover.
+
+Runs headless against a synthetic PDF, or a real one given with --input, e.g.
+
+    python pdf_benchmark.py input --size-mb 1024
+    python pdf_benchmark.py unlock --size-mb 500
+    python pdf_benchmark.py scan
+
+Every measurement runs in a fresh process, so the peak RSS reported is that
+of the measurement alone. The input is read once beforehand, so timings
+are with the file in the OS page cache. Peak RSS includes the pages of a
+memory-mapped input, which stay in that cache and are shared by every
+process mapping the file; private memory is what the process holds alone.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from PyPDF2 import PdfReader, PdfWriter
+
+import pdf_merge
+import pdf_unlock
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZE_MB = 1024
+# Size of the synthetic encrypted statement; PyPDF2's RC4 runs at a few MB/s, both ways
+DEFAULT_UNLOCK_SIZE_MB = 500
+SYNTHETIC_PASSWORD = "benchmark"
+# Files in the synthetic inbox for scan, one in three encrypted, each with SCAN_FILE_PAGES pages
+DEFAULT_SCAN_FILES = 600
+SCAN_FILE_PAGES = 100
+# Pages of the synthetic PDF; each draws its own image, which makes up the bulk of the file
+SYNTHETIC_PAGES = 200
+SYNTHETIC_IMAGE_WIDTH = 1000
+# Ways of handing a file to PdfReader, as used before and after memory-mapped input
+INPUT_METHODS = {
+    # PdfReader reads the whole file into memory, as PdfMerger.append(path) does
+    "path": lambda path: contextlib.nullcontext(path),
+    "file": lambda path: open(path, "rb"),
+    "mmap": pdf_merge.map_pdf,
+}
+
+
+def synthetic_pdf(path, size, pages=SYNTHETIC_PAGES, seed=0):
+    """Writes a PDF of about size bytes whose pages each draw a different random grayscale image"""
+    rng = random.Random(seed)
+    height = max(size // pages // SYNTHETIC_IMAGE_WIDTH, 1)
+    contents = b"q 540 0 0 720 36 36 cm /Im0 Do Q"
+    offsets = []
+    with open(path, "wb", buffering=pdf_merge.WRITE_BUFFER_SIZE) as file:
+        def write_object(data):
+            offsets.append(file.tell())
+            file.write(b"%d 0 obj\n" % len(offsets))
+            file.write(data)
+            file.write(b"\nendobj\n")
+
+        file.write(pdf_merge.PDF_HEADER)
+        # Page i is object 3 + 3i, followed by its contents and its image
+        kids = b" ".join(b"%d 0 R" % (3 + 3 * i) for i in range(pages))
+        write_object(b"<< /Type /Catalog /Pages 2 0 R >>")
+        write_object(b"<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 612 792] >>" % (kids, pages))
+        for i in range(pages):
+            page = 3 + 3 * i
+            write_object(b"<< /Type /Page /Parent 2 0 R /Contents %d 0 R "
+                         b"/Resources << /XObject << /Im0 %d 0 R >> >> >>" % (page + 1, page + 2))
+            write_object(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(contents), contents))
+            image = rng.randbytes(SYNTHETIC_IMAGE_WIDTH * height)
+            write_object(b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                         b"/BitsPerComponent 8 /Length %d >>\nstream\n" % (SYNTHETIC_IMAGE_WIDTH, height, len(image))
+                         + image + b"\nendstream")
+        xref = file.tell()
+        file.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        for offset in offsets:
+            file.write(b"%010d 00000 n \n" % offset)
+        file.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+
+
+def _memory():
+    """Peak RSS, and resident private (anonymous) and file-backed memory now, in MiB"""
+    fields = {}
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                name, _, value = line.partition(":")
+                if name in ("VmHWM", "RssAnon", "RssFile"):
+                    fields[name] = int(value.split()[0]) / 1024
+    except OSError:
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        fields["VmHWM"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return {"peak_rss": fields["VmHWM"], "anonymous": fields.get("RssAnon"), "file": fields.get("RssFile")}
+
+
+def _measure_input(task, method, path):
+    """Runs in the child process: one task on one input method, printing the measurements as JSON"""
+    start = time.perf_counter()
+    with INPUT_METHODS[method](path) as source:
+        reader = PdfReader(source)
+        if task == "merge":
+            # What merging the file does: a worker parses it into a segment and the writer writes that
+            mapped = source if method == "mmap" else None
+            segment = pdf_merge._SegmentBuilder(reader, source=mapped).build(pdf_merge.MergeInput(path))
+            with open(os.devnull, "wb") as output:
+                writer = pdf_merge.PdfStreamWriter(output)
+                writer.add_segment(segment)
+                writer.close()
+        else:
+            # What the password remover does once the file is decrypted
+            writer = PdfWriter()
+            for page in reader.pages:
+                writer.add_page(page)
+            with open(os.devnull, "wb") as output:
+                writer.write(output)
+        seconds = time.perf_counter() - start
+        print(json.dumps({"seconds": seconds, **_memory()}))
+
+
+def _measure_unlock(method, path):
+    """Runs in the child process: decrypts path by one method, printing the measurements as JSON"""
+    start = time.perf_counter()
+    with pdf_merge.map_pdf(path) as source:
+        reader = PdfReader(source)
+        reader.decrypt(SYNTHETIC_PASSWORD)
+        with open(os.devnull, "wb") as output:
+            if method == "pages":
+                # The password remover before streaming: every page copied into a PdfWriter
+                writer = PdfWriter()
+                for page in reader.pages:
+                    writer.add_page(page)
+                writer.write(output)
+            else:
+                pdf_unlock.write_decrypted(reader, output)
+        seconds = time.perf_counter() - start
+        print(json.dumps({"seconds": seconds, **_memory()}))
+
+
+def _run_child(function, *args):
+    process = subprocess.run(
+        [sys.executable, "-c", f"import sys, pdf_benchmark; pdf_benchmark.{function}(*sys.argv[1:])", *args],
+        cwd=BENCHMARK_DIRECTORY, capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(f"{' '.join(args[:-1])} failed:\n{process.stderr}")
+    return json.loads(process.stdout)
+
+
+def _warm(path):
+    """Reads path once, so the first method measured is not the only one reading from disk"""
+    with open(path, "rb") as file:
+        while file.read(pdf_merge.WRITE_BUFFER_SIZE):
+            pass
+
+
+def _megabytes(value):
+    return "-" if value is None else f"{value:.0f}"
+
+
+def bench_input(args):
+    """Reading a large PDF through a path, a buffered file and a memory map"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.input
+        if path is None:
+            path = os.path.join(directory, "synthetic.pdf")
+            synthetic_pdf(path, (args.size_mb or DEFAULT_SIZE_MB) * 1024 * 1024)
+        size = os.path.getsize(path)
+        _warm(path)
+        print(f"  {os.path.basename(path)}: {size / 1024 / 1024:.0f} MiB")
+        print(f"  {'task':8} {'input':6} {'seconds':>8} {'peak RSS':>9} {'private':>8} {'mapped':>7}  (MiB)")
+        for task in ("merge", "rewrite"):
+            for method in INPUT_METHODS:
+                best = min((_run_child("_measure_input", task, method, path) for _ in range(args.repeat)),
+                           key=lambda result: result["seconds"])
+                print(f"  {task:8} {method:6} {best['seconds']:8.2f} {_megabytes(best['peak_rss']):>9} "
+                      f"{_megabytes(best['anonymous']):>8} {_megabytes(best['file']):>7}")
+
+
+def bench_unlock(args):
+    """Decrypting a large statement page by page into a PdfWriter versus object by object"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.input
+        if path is None:
+            plain_path = os.path.join(directory, "plain.pdf")
+            synthetic_pdf(plain_path, (args.size_mb or DEFAULT_UNLOCK_SIZE_MB) * 1024 * 1024)
+            path = os.path.join(directory, "encrypted.pdf")
+            _encrypt_copy(plain_path, path)
+            os.remove(plain_path)
+        _warm(path)
+        print(f"  {os.path.basename(path)}: {os.path.getsize(path) / 1024 / 1024:.0f} MiB, "
+              f"password {SYNTHETIC_PASSWORD!r}")
+        print(f"  {'method':8} {'seconds':>8} {'peak RSS':>9} {'private':>8}  (MiB)")
+        for method in ("pages", "stream"):
+            best = min((_run_child("_measure_unlock", method, path) for _ in range(args.repeat)),
+                       key=lambda result: result["seconds"])
+            print(f"  {method:8} {best['seconds']:8.2f} {_megabytes(best['peak_rss']):>9} "
+                  f"{_megabytes(best['anonymous']):>8}")
+
+
+def _encrypt_copy(path, output_path):
+    writer = PdfWriter()
+    for page in PdfReader(path).pages:
+        writer.add_page(page)
+    writer.encrypt(SYNTHETIC_PASSWORD)
+    with open(output_path, "wb") as file:
+        writer.write(file)
+
+
+def _parse_status(path):
+    """What settling a file took before the scan: PyPDF2 reading its cross-reference table"""
+    try:
+        with pdf_merge.map_pdf(path) as source:
+            encrypted = PdfReader(source).is_encrypted
+    except Exception:
+        return pdf_unlock.CORRUPT
+    return pdf_unlock.ENCRYPTED if encrypted else pdf_unlock.NOT_ENCRYPTED
+
+
+def bench_scan(args):
+    """Telling encrypted from unencrypted files by their tail versus by parsing them"""
+    with tempfile.TemporaryDirectory() as directory:
+        if args.input is None:
+            plain_path = os.path.join(directory, "plain.pdf")
+            synthetic_pdf(plain_path, SCAN_FILE_PAGES * 1024, pages=SCAN_FILE_PAGES)
+            encrypted_path = os.path.join(directory, "encrypted.pdf")
+            _encrypt_copy(plain_path, encrypted_path)
+            for index in range(DEFAULT_SCAN_FILES):
+                os.link(encrypted_path if index % 3 == 0 else plain_path,
+                        os.path.join(directory, f"statement_{index:05d}.pdf"))
+            paths = sorted(pdf_unlock.find_pdfs(directory))
+            paths = [path for path in paths if os.path.basename(path).startswith("statement_")]
+        else:
+            paths = list(pdf_unlock.find_pdfs(args.input)) if os.path.isdir(args.input) else [args.input]
+        print(f"  {len(paths)} files")
+        print(f"  {'method':8} {'seconds':>8}  ms/file by status")
+        for method in ("parse", "tail"):
+            best = None
+            for _ in range(args.repeat):
+                times = {}
+                for path in paths:
+                    start = time.perf_counter()
+                    status = _parse_status(path) if method == "parse" else pdf_unlock.scan_pdf(path)["status"]
+                    times.setdefault(status, []).append(time.perf_counter() - start)
+                seconds = sum(map(sum, times.values()))
+                if best is None or seconds < best[0]:
+                    best = seconds, times
+            seconds, times = best
+            by_status = ", ".join(f"{status} {len(values)} x {sum(values) * 1000 / len(values):.3f}"
+                                  for status, values in sorted(times.items()))
+            print(f"  {method:8} {seconds:8.3f}  {by_status}")
+
+
+BENCHMARKS = {
+    "input": bench_input,
+    "unlock": bench_unlock,
+    "scan": bench_scan,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF tool benchmarks")
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--input", help=f"PDF to benchmark instead of a synthetic one (for unlock, "
+                                        f"encrypted with the password {SYNTHETIC_PASSWORD!r}; "
+                                        f"for scan, a PDF or a directory of them)")
+    parser.add_argument("--size-mb", type=int,
+                        help=f"Size of the synthetic PDF in MiB (default: {DEFAULT_SIZE_MB}, "
+                             f"{DEFAULT_UNLOCK_SIZE_MB} for unlock)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per measurement, best is kept")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    status = 0
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"== {name}: {BENCHMARKS[name].__doc__}")
+        status = BENCHMARKS[name](args) or status
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
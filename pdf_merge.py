@@ -0,0 +1,1035 @@
+"""
+Tk-free streaming merge engine for the PDF merger.
+
+Input files are parsed in a process pool. Each worker turns one file into a
+Segment: its pages and every object they use, serialized with file-local
+object numbers. The merging process numbers the segments in input order
+and writes them straight to the output file, so only the segments in flight
+and one 8-byte offset per output object are held in memory, however large
+the merged document gets. Inputs are memory-mapped, and large streams such
+as images are copied from the mapping to the output by the merging process
+rather than passed to it from the worker.
+"""
+import bisect
+import collections
+import contextlib
+import csv
+import functools
+import glob
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject,
+                            create_string_object)
+
+import parallel
+
+PDF_HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+# Offsets past this do not fit a classic xref table; an xref stream is written instead
+MAX_XREF_TABLE_OFFSET = 10 ** 10 - 1
+# Output is buffered in blocks of this many bytes
+WRITE_BUFFER_SIZE = 1024 * 1024
+# Local number standing for the output's page tree root in segment references
+PAGES_ROOT = 0
+# Streams at least this long are left in the memory-mapped input and copied
+# from there by the writer, instead of being passed along with the segment
+SOURCE_SPAN_MIN_LENGTH = 64 * 1024
+# Most distinct streams remembered for deduplication; the least recently
+# shared are forgotten first (about 200 bytes each)
+DEDUPLICATE_TABLE_SIZE = 250000
+# References followed from a stream when matching it; streams leading further are not matched
+DEDUPLICATE_MAX_DEPTH = 32
+# One item of a page selection: "7", "-1", "1-3", "5-" or "-3--1"
+PAGE_RANGE_PATTERN = re.compile(r"(-?\d+)(-(-?\d+)?)?")
+# A manifest input with a page selection: "report.pdf[1-3,-1]"
+MANIFEST_PAGES_PATTERN = re.compile(r"(.+)\[([-\d, ]+)\]")
+# Page attributes a page takes from its page tree ancestors when it has none itself
+INHERITABLE_PAGE_ATTRIBUTES = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+# Least number of seconds between progress records logged for a batch job
+PROGRESS_LOG_INTERVAL = 1.0
+
+
+class Segment:
+    """
+    One input file's pages and the objects they use, ready to be numbered.
+
+    Objects are numbered 1..object_count in the order they appear in data,
+    and the first len(pages) of them are the pages. References are not in
+    data; each one is inserted at ref_positions[i] as a reference to local
+    object ref_targets[i]. When digests were requested, digests[i] is a
+    hash of stream object i + 1 as serialized here, None for other objects.
+    When bookmarks were requested, outline holds them as [title, local page
+    number or None, destination view, children] items.
+
+    The data of large streams is not in data either: span_lengths[i] bytes
+    at span_offsets[i] in the file at path go at span_positions[i].
+    """
+    __slots__ = ("path", "pages", "data", "starts", "ref_positions", "ref_targets", "digests", "outline",
+                 "span_positions", "span_offsets", "span_lengths")
+
+    def __init__(self, path, pages, data, starts, ref_positions, ref_targets, digests=None, outline=None,
+                 span_positions=None, span_offsets=None, span_lengths=None):
+        self.path = path
+        self.pages = pages
+        self.data = data
+        self.starts = starts
+        self.ref_positions = ref_positions
+        self.ref_targets = ref_targets
+        self.digests = digests
+        self.outline = outline
+        self.span_positions = array("q") if span_positions is None else span_positions
+        self.span_offsets = array("q") if span_offsets is None else span_offsets
+        self.span_lengths = array("q") if span_lengths is None else span_lengths
+
+    @property
+    def object_count(self):
+        return len(self.starts) - 1
+
+
+def parse_page_ranges(text):
+    """
+    Parses a page selection like "1-3,7,-1".
+
+    Pages are numbered from 1; negative numbers count from the end, so -1 is
+    the last page. "A-B" is an inclusive range (backwards if A > B), "A-"
+    runs to the last page and "-3--1" selects the last three pages.
+
+    Returns:
+        list[tuple[int, int]]: (first, last) page numbers of each range.
+
+    Raises:
+        ValueError: If the text is not a page selection.
+    """
+    ranges = []
+    for item in text.replace(" ", "").split(","):
+        match = PAGE_RANGE_PATTERN.fullmatch(item)
+        if match is not None:
+            first = int(match[1])
+            last = first if not match[2] else int(match[3]) if match[3] else -1
+        if match is None or first == 0 or last == 0:
+            raise ValueError(f"Invalid page range {item!r} in {text!r}")
+        ranges.append((first, last))
+    return ranges
+
+
+def select_pages(ranges, page_count):
+    """Page indexes (from 0) selected by parse_page_ranges ranges in a document of page_count pages"""
+    indexes = []
+    for first, last in ranges:
+        first, last = (page - 1 if page > 0 else page_count + page for page in (first, last))
+        if not (0 <= first < page_count and 0 <= last < page_count):
+            raise ValueError(f"page range out of bounds for {page_count} pages")
+        step = 1 if last >= first else -1
+        indexes.extend(range(first, last + step, step))
+    return indexes
+
+
+class MergeInput:
+    """
+    One input of a merge: a PDF file, optionally with a page selection and a
+    bookmark title.
+
+    Args:
+        pages (str, optional): Pages to merge, like "1-3,7,-1" (see
+            parse_page_ranges). Defaults to every page.
+        title (str, optional): Title of the file's bookmark, defaults to the
+            file name without extension.
+    """
+    __slots__ = ("path", "pages", "ranges", "title")
+
+    def __init__(self, path, pages=None, title=None):
+        self.path = path
+        self.pages = pages
+        self.ranges = parse_page_ranges(pages) if pages else None
+        self.title = title or os.path.splitext(os.path.basename(path))[0]
+
+    def __repr__(self):
+        return f"MergeInput({self.path!r}, pages={self.pages!r}, title={self.title!r})"
+
+
+def _page_count(node):
+    return node["/Count"] if "/Kids" in node else 1
+
+
+def _find_pages(reader, indexes):
+    """
+    Finds the pages at indexes, loading only the page tree nodes on the way
+    to them.
+
+    Subtrees are skipped by their /Count, and kids are scanned from the
+    nearer end, so the first or last page of a long flat tree costs one
+    lookup instead of loading every page as reader.pages does.
+
+    Returns:
+        dict: {index: (page reference, attributes inherited from the tree)}.
+    """
+    found = {}
+    # Nodes on the way down to the current one; a node met again there is its own ancestor
+    ancestors = set()
+
+    def visit(ref, start, wanted, inherited):
+        key = (ref.idnum, ref.generation)
+        if key in ancestors:
+            raise ValueError("page tree has a cycle")
+        node = ref.get_object()
+        if "/Kids" not in node:
+            found[start] = (ref, inherited)
+            return
+        inherited = dict(inherited)
+        inherited.update((NameObject(key), node.raw_get(key)) for key in INHERITABLE_PAGE_ATTRIBUTES if key in node)
+        kids = node["/Kids"]
+        middle = start + node["/Count"] / 2
+        front = [index for index in wanted if index < middle]
+        # Each kid is given all the wanted indexes it holds, and entered once:
+        # the front scan takes whole kids, the back scan what lies past them
+        visits = []
+        position = start
+        scanned = 0
+        for kid in kids:
+            if not front or position > front[-1]:
+                break
+            count = _page_count(kid.get_object())
+            inside = [index for index in wanted if position <= index < position + count]
+            if inside:
+                visits.append((kid, position, inside))
+            position += count
+            scanned += 1
+        back = [index for index in wanted if index >= position]
+        position = start + node["/Count"]
+        for kid in reversed(kids[scanned:]):
+            if not back or position <= back[0]:
+                break
+            count = _page_count(kid.get_object())
+            position -= count
+            inside = [index for index in back if position <= index < position + count]
+            if inside:
+                visits.append((kid, position, inside))
+        ancestors.add(key)
+        for kid, position, inside in visits:
+            visit(kid, position, inside, inherited)
+        ancestors.discard(key)
+
+    visit(reader.trailer["/Root"].raw_get("/Pages"), 0, sorted(set(indexes)), {})
+    return found
+
+
+class _SegmentBuilder:
+    """
+    Serializes the selected pages of a reader, and everything they reference.
+
+    With source, the memory map the reader parses, large streams found there
+    byte for byte are recorded as spans of the file instead of copied.
+    """
+    def __init__(self, reader, digests=False, source=None):
+        self.reader = reader
+        self.source = source
+        self.buffer = io.BytesIO()
+        self.digests = [] if digests else None
+        self.numbers = {}
+        self.pending = collections.deque()
+        self.starts = array("q")
+        self.ref_positions = array("q")
+        self.ref_targets = array("q")
+        self.span_positions = array("q")
+        self.span_offsets = array("q")
+        self.span_lengths = array("q")
+        self.named_destinations = None
+
+    def number(self, ref, key=None, inherited=None):
+        """Local number of ref, queuing it for writing the first time it is seen"""
+        key = key or (ref.idnum, ref.generation)
+        number = self.numbers.get(key)
+        if number is None:
+            number = self.numbers[key] = len(self.numbers) + 1
+            self.pending.append((ref, inherited))
+        return number
+
+    def add_page(self, ref, inherited):
+        key = (ref.idnum, ref.generation)
+        if key in self.numbers:
+            # A page selected twice is written twice, as a page has one parent
+            key = key + (len(self.numbers),)
+        return self.number(ref, key, inherited)
+
+    def write_value(self, value):
+        buffer = self.buffer
+        if isinstance(value, IndirectObject):
+            if (value.idnum, value.generation) not in self.numbers:
+                target = value.get_object()
+                if isinstance(target, DictionaryObject) and target.get("/Type") in ("/Page", "/Pages"):
+                    # Links to pages and page tree nodes that are not merged
+                    buffer.write(b"null")
+                    return
+                if self.source is not None and isinstance(target, StreamObject) \
+                        and len(target._data) >= SOURCE_SPAN_MIN_LENGTH:
+                    # Parsed again when written, so that large streams are not all held at once
+                    self.reader.resolved_objects.pop((value.generation, value.idnum), None)
+            self.ref_positions.append(buffer.tell())
+            self.ref_targets.append(self.number(value))
+        elif isinstance(value, DictionaryObject):
+            self.write_dictionary(value)
+        elif isinstance(value, ArrayObject):
+            buffer.write(b"[")
+            for index, item in enumerate(value):
+                if index:
+                    buffer.write(b" ")
+                self.write_value(item)
+            buffer.write(b"]")
+        else:
+            value.write_to_stream(buffer, None)
+
+    def write_dictionary(self, dictionary):
+        self.buffer.write(b"<<")
+        self.write_entries(dictionary)
+        self.buffer.write(b">>")
+
+    def write_entries(self, dictionary, skip=()):
+        buffer = self.buffer
+        for key, value in dictionary.items():
+            if key in skip:
+                continue
+            key.write_to_stream(buffer, None)
+            buffer.write(b" ")
+            self.write_value(value)
+            buffer.write(b"\n")
+
+    def write_object(self, ref, inherited):
+        buffer = self.buffer
+        start = buffer.tell()
+        first_ref = len(self.ref_positions)
+        self.starts.append(start)
+        obj = ref.get_object()
+        digest = None
+        if inherited is not None:
+            # Pages hang off the output's page tree instead of their own, so
+            # they take along what they inherited from it
+            buffer.write(b"<<")
+            self.write_entries(obj, skip=("/Parent",))
+            self.write_entries({key: value for key, value in inherited.items() if key not in obj})
+            buffer.write(b"/Parent ")
+            self.ref_positions.append(buffer.tell())
+            self.ref_targets.append(PAGES_ROOT)
+            buffer.write(b">>")
+        elif isinstance(obj, StreamObject):
+            # Stream data is copied as stored, still encoded with its filters
+            data = obj._data
+            buffer.write(b"<<")
+            self.write_entries(obj, skip=("/Length",))
+            buffer.write(b"/Length %d>>\nstream\n" % len(data))
+            data_position = buffer.tell()
+            offset = self.locate_stream(ref, data)
+            if offset is None:
+                buffer.write(data)
+            else:
+                self.span_positions.append(data_position)
+                self.span_offsets.append(offset)
+                self.span_lengths.append(len(data))
+                # The writer copies the data from the file, so the parsed copy can go
+                self.reader.resolved_objects.pop((ref.generation, ref.idnum), None)
+            buffer.write(b"\nendstream")
+            if self.digests is not None:
+                # Where the references go is part of the content, their targets are not
+                digest = hashlib.blake2b(digest_size=16)
+                with buffer.getbuffer() as view:
+                    if offset is None:
+                        digest.update(view[start:])
+                    else:
+                        digest.update(view[start:data_position])
+                        digest.update(data)
+                        digest.update(view[data_position:])
+                digest.update(array("q", (position - start for position in self.ref_positions[first_ref:])))
+                digest = digest.digest()
+        else:
+            self.write_value(obj)
+        if self.digests is not None:
+            self.digests.append(digest)
+        # Objects end with a newline, so no reference sits on the boundary with the next
+        buffer.write(b"\n")
+
+    def locate_stream(self, ref, data):
+        """Offset of a large stream's data in the source, if stored there as parsed (not encrypted)"""
+        if self.source is None or len(data) < SOURCE_SPAN_MIN_LENGTH:
+            return None
+        # Streams are never inside object streams, so the xref has their offset
+        offset = self.reader.xref.get(ref.generation, {}).get(ref.idnum)
+        if offset is None:
+            return None
+        keyword = self.source.find(b"stream", offset)
+        if keyword < 0:
+            return None
+        start = keyword + len(b"stream")
+        if self.source[start:start + 2] == b"\r\n":
+            start += 2
+        elif self.source[start:start + 1] in (b"\n", b"\r"):
+            start += 1
+        # A search confined to the data's own place compares without copying
+        return start if self.source.find(data, start, start + len(data)) == start else None
+
+    def destination(self, node):
+        """(local page number or None, view bytes) of an outline item's destination"""
+        dest = node.get("/Dest")
+        if dest is None and "/A" in node and node["/A"].get("/S") == "/GoTo":
+            dest = node["/A"].get("/D")
+        if isinstance(dest, (str, bytes)):
+            if self.named_destinations is None:
+                self.named_destinations = self.reader.named_destinations
+            named = self.named_destinations.get(dest)
+            dest = named.dest_array if named is not None else None
+        if isinstance(dest, DictionaryObject):
+            dest = dest.get("/D")
+        if not isinstance(dest, ArrayObject) or not dest:
+            return None, b"/Fit"
+        page = dest[0]
+        if isinstance(page, IndirectObject):
+            page = self.numbers.get((page.idnum, page.generation))
+        else:
+            page = None
+        view = io.BytesIO()
+        for index, item in enumerate(dest[1:] or [NameObject("/Fit")]):
+            if index:
+                view.write(b" ")
+            item.write_to_stream(view, None)
+        return page, view.getvalue()
+
+    def outline(self):
+        """The reader's outline as [title, local page number or None, view bytes, children] items"""
+        catalog = self.reader.trailer["/Root"]
+        if "/Outlines" not in catalog or "/First" not in catalog["/Outlines"]:
+            return []
+        root = []
+        seen = set()
+        stack = [(catalog["/Outlines"].raw_get("/First"), root)]
+        while stack:
+            ref, items = stack.pop()
+            # Siblings are followed with /Next here and children pushed for later
+            while isinstance(ref, IndirectObject) and (ref.idnum, ref.generation) not in seen:
+                seen.add((ref.idnum, ref.generation))
+                node = ref.get_object()
+                page, view = self.destination(node)
+                item = [str(node.get("/Title", "")), page, view, []]
+                if "/First" in node:
+                    stack.append((node.raw_get("/First"), item[3]))
+                if page is not None or "/First" in node:
+                    items.append(item)
+                ref = node.raw_get("/Next") if "/Next" in node else None
+        return _prune_outline(root)
+
+    def build(self, merge_input, bookmarks=False):
+        page_count = self.reader.trailer["/Root"]["/Pages"]["/Count"]
+        if merge_input.ranges is None:
+            indexes = list(range(page_count))
+        else:
+            indexes = select_pages(merge_input.ranges, page_count)
+        pages = _find_pages(self.reader, indexes)
+        if len(pages) < len(set(indexes)):
+            # /Count does not match the tree, so fall back to reading all of it;
+            # PyPDF2 copies inherited attributes into the pages it returns
+            all_pages = self.reader.pages
+            pages = {index: (all_pages[index].indirect_ref, {}) for index in set(indexes)}
+        page_numbers = array("q", (self.add_page(*pages[index]) for index in indexes))
+
+        outline = None
+        if bookmarks:
+            first_page = page_numbers[0] if page_numbers else None
+            outline = [[merge_input.title, first_page, b"/Fit", self.outline()]]
+        while self.pending:
+            self.write_object(*self.pending.popleft())
+        self.starts.append(self.buffer.tell())
+        return Segment(merge_input.path, page_numbers, self.buffer.getvalue(), self.starts,
+                       self.ref_positions, self.ref_targets, self.digests, outline,
+                       self.span_positions, self.span_offsets, self.span_lengths)
+
+
+def _prune_outline(items):
+    """Drops outline items pointing at pages that were not merged, unless they have children left"""
+    kept = []
+    for title, page, view, children in items:
+        children = _prune_outline(children)
+        if page is not None or children:
+            kept.append([title, page, view, children])
+    return kept
+
+
+@contextlib.contextmanager
+def map_pdf(path):
+    """
+    Opens a file for PdfReader as a read-only memory map.
+
+    The OS reads in the parts of the file the parser touches, on demand, and
+    keeps them in the page cache every process shares, so workers reading
+    the same large file neither copy it into their own buffers nor read it
+    twice. Empty files, which cannot be mapped, are opened as ordinary files.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield file
+        else:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+
+def read_segment(merge_input, digests=False, bookmarks=False):
+    """
+    Parses the selected pages of one PDF file into a Segment.
+
+    Only the cross-reference table, the page tree nodes leading to the
+    selected pages and the objects those pages use are read. The file is
+    memory-mapped, and its large streams stay there for the writer to copy,
+    so the file must not change until the segment has been written.
+
+    Args:
+        merge_input (MergeInput or str): The file, with its page selection.
+        digests (bool): Also hash every stream object, for PdfStreamWriter
+            deduplication. Hashing here spreads the cost over the workers.
+        bookmarks (bool): Give the segment a bookmark for the file, holding
+            the file's own outline items that point at merged pages.
+
+    Raises:
+        ValueError: If the file cannot be read, is password protected or
+            has fewer pages than selected.
+    """
+    if isinstance(merge_input, str):
+        merge_input = MergeInput(merge_input)
+    try:
+        with map_pdf(merge_input.path) as file:
+            reader = PdfReader(file)
+            if reader.is_encrypted and not reader.decrypt(""):
+                raise ValueError("the file is password protected")
+            source = file if isinstance(file, mmap.mmap) else None
+            return _SegmentBuilder(reader, digests, source).build(merge_input, bookmarks)
+    except Exception as e:
+        raise ValueError(f"{os.path.basename(merge_input.path)}: {e}") from e
+
+
+class PdfStreamWriter:
+    """
+    Writes a PDF document segment by segment.
+
+    Objects are written as soon as a segment is added; only their offsets
+    and the page numbers are kept until close() writes the page tree, the
+    catalog and the cross-reference section.
+
+    With deduplicate, a stream object (font, image, ICC profile, form
+    XObject) identical to one already written is not written again, and
+    references to it point at the first copy. Streams match when their
+    dictionary, data and references, after numbering, are the same, which
+    needs segments read with digests. Bookmarks of segments read with
+    bookmarks are collected and written as the document outline.
+    """
+    def __init__(self, file, deduplicate=False):
+        self.file = file
+        self.position = file.write(PDF_HEADER)
+        # Byte offset of every output object, indexed by object number
+        self.offsets = array("q", [0])
+        self.page_numbers = array("q")
+        self.pages_root = self.reserve()
+        self.shared = collections.OrderedDict() if deduplicate else None
+        self.shared_objects = 0
+        self.shared_bytes = 0
+        self.outline = []
+
+    def reserve(self, count=1):
+        """Allocates count consecutive object numbers and returns the first"""
+        first = len(self.offsets)
+        self.offsets.extend(bytes(count))
+        return first
+
+    def write(self, data):
+        self.position += self.file.write(data)
+
+    def begin_object(self, number):
+        self.offsets[number] = self.position
+        self.write(b"%d 0 obj\n" % number)
+
+    def share_streams(self, segment, numbers):
+        """
+        Numbers the segment's stream objects, reusing the number of an
+        identical stream already written. Returns the indexes not to write.
+
+        A stream matches on its own digest and the targets of its
+        references. A referenced stream is numbered, and so shared, first;
+        any other referenced object stands for its content, hashed the same
+        way. Streams that lead to a page, or round a reference cycle, are
+        never matched.
+        """
+        starts, positions, targets = segment.starts, segment.ref_positions, segment.ref_targets
+        data = segment.data
+        duplicates = set()
+        # Hashes of the non-stream objects, None for those that cannot be matched
+        contents = {}
+        visiting = set()
+
+        def references(index):
+            """Slice of positions and targets holding the references of object index"""
+            return slice(bisect.bisect_left(positions, starts[index]),
+                         bisect.bisect_left(positions, starts[index + 1]))
+
+        def target_key(target, depth):
+            """What a reference to local object target contributes to its referrer's key"""
+            if target == PAGES_ROOT:
+                return b"r"
+            index = target - 1
+            if index < len(segment.pages) or index in visiting or depth > DEDUPLICATE_MAX_DEPTH:
+                return None
+            if segment.digests[index] is not None:
+                share(index, depth + 1)
+                return b"n" + numbers[target].to_bytes(8, "little")
+            if index not in contents:
+                visiting.add(index)
+                refs = references(index)
+                content = hashlib.blake2b(data[starts[index]:starts[index + 1]], digest_size=16)
+                content.update(array("q", (position - starts[index] for position in positions[refs])))
+                for referenced in targets[refs]:
+                    key = target_key(referenced, depth + 1)
+                    if key is None:
+                        content = None
+                        break
+                    content.update(key)
+                contents[index] = None if content is None else b"o" + content.digest()
+                visiting.discard(index)
+            return contents[index]
+
+        def share(index, depth=0):
+            if numbers[index + 1]:
+                return
+            visiting.add(index)
+            key = hashlib.blake2b(segment.digests[index], digest_size=16)
+            for target in targets[references(index)]:
+                target_part = target_key(target, depth)
+                if target_part is None:
+                    key = None
+                    break
+                key.update(target_part)
+            visiting.discard(index)
+            if key is None:
+                numbers[index + 1] = self.reserve()
+                return
+            key = key.digest()
+            number = self.shared.get(key)
+            if number is None:
+                number = self.shared[key] = self.reserve()
+                if len(self.shared) > DEDUPLICATE_TABLE_SIZE:
+                    self.shared.popitem(last=False)
+            else:
+                self.shared.move_to_end(key)
+                duplicates.add(index)
+                self.shared_objects += 1
+                self.shared_bytes += starts[index + 1] - starts[index] + sum(
+                    segment.span_lengths[bisect.bisect_left(segment.span_positions, starts[index]):
+                                         bisect.bisect_left(segment.span_positions, starts[index + 1])])
+            numbers[index + 1] = number
+
+        # Referenced objects are usually found after their referrers, so going
+        # backwards mostly finds them numbered already
+        for index in reversed(range(segment.object_count)):
+            if segment.digests[index] is not None:
+                share(index)
+        return duplicates
+
+    def add_segment(self, segment):
+        """Numbers a segment's objects after those already written and writes them"""
+        numbers = array("q", [self.pages_root])
+        duplicates = ()
+        if self.shared is not None and segment.digests is not None:
+            numbers.extend(bytes(segment.object_count))
+            duplicates = self.share_streams(segment, numbers)
+            for index in range(1, len(numbers)):
+                if not numbers[index]:
+                    numbers[index] = self.reserve()
+        else:
+            first = self.reserve(segment.object_count)
+            numbers.extend(range(first, first + segment.object_count))
+
+        data = memoryview(segment.data)
+        starts, positions, targets = segment.starts, segment.ref_positions, segment.ref_targets
+        span_positions = segment.span_positions
+        ref = span = 0
+        with map_pdf(segment.path) if span_positions else contextlib.nullcontext() as source:
+            for index in range(segment.object_count):
+                start, end = starts[index], starts[index + 1]
+                if index in duplicates:
+                    ref = bisect.bisect_left(positions, end, ref)
+                    span = bisect.bisect_left(span_positions, end, span)
+                    continue
+                self.begin_object(numbers[index + 1])
+                while True:
+                    next_ref = positions[ref] if ref < len(positions) else end
+                    next_span = span_positions[span] if span < len(span_positions) else end
+                    position = min(next_ref, next_span, end)
+                    self.write(data[start:position])
+                    start = position
+                    if position == end:
+                        break
+                    if position == next_ref:
+                        self.write(b"%d 0 R" % numbers[targets[ref]])
+                        ref += 1
+                    else:
+                        self.write_span(source, segment.span_offsets[span], segment.span_lengths[span])
+                        span += 1
+                self.write(b"endobj\n")
+        self.page_numbers.extend(numbers[local] for local in segment.pages)
+        if segment.outline is not None:
+            self.outline.extend(_number_outline(segment.outline, numbers))
+
+    def write_span(self, source, offset, length):
+        """Copies bytes of a memory-mapped input straight to the output"""
+        with memoryview(source) as view:
+            if offset + length > len(view):
+                raise ValueError("the file changed while it was being merged")
+            self.write(view[offset:offset + length])
+
+    def close(self):
+        """Writes the page tree, catalog and cross-reference section"""
+        self.begin_object(self.pages_root)
+        self.write(b"<< /Type /Pages /Count %d /Kids [" % len(self.page_numbers))
+        for start in range(0, len(self.page_numbers), 10000):
+            self.write(b"".join(b"%d 0 R\n" % number for number in self.page_numbers[start:start + 10000]))
+        self.write(b"] >>\nendobj\n")
+
+        outline = b""
+        if self.outline:
+            outline = b" /Outlines %d 0 R /PageMode /UseOutlines" % self.write_outline()
+
+        catalog = self.reserve()
+        self.begin_object(catalog)
+        self.write(b"<< /Type /Catalog /Pages %d 0 R%s >>\nendobj\n" % (self.pages_root, outline))
+
+        if self.position > MAX_XREF_TABLE_OFFSET:
+            self.write_xref_stream(catalog)
+        else:
+            self.write_xref_table(catalog)
+
+    def write_outline(self):
+        """Writes the collected bookmarks and returns the outline's object number"""
+        root = self.reserve()
+        first, last = self.write_outline_items(self.outline, root)
+        self.begin_object(root)
+        self.write(b"<< /Type /Outlines /First %d 0 R /Last %d 0 R /Count %d >>\nendobj\n"
+                   % (first, last, len(self.outline)))
+        return root
+
+    def write_outline_items(self, items, parent):
+        """Writes sibling outline items and returns the numbers of the first and last"""
+        first = self.reserve(len(items))
+        for index, (title, page, view, children) in enumerate(items):
+            number = first + index
+            entries = io.BytesIO()
+            entries.write(b"/Title ")
+            create_string_object(title).write_to_stream(entries, None)
+            entries.write(b" /Parent %d 0 R" % parent)
+            if index:
+                entries.write(b" /Prev %d 0 R" % (number - 1))
+            if index < len(items) - 1:
+                entries.write(b" /Next %d 0 R" % (number + 1))
+            if children:
+                # Items start closed, which keeps long outlines readable
+                entries.write(b" /First %d 0 R /Last %d 0 R /Count -%d"
+                              % (*self.write_outline_items(children, number), len(children)))
+            if page is not None:
+                entries.write(b" /Dest [%d 0 R %s]" % (page, view))
+            self.begin_object(number)
+            self.write(b"<< %s >>\nendobj\n" % entries.getvalue())
+        return first, first + len(items) - 1
+
+    def write_xref_table(self, catalog):
+        start = self.position
+        self.write(b"xref\n0 %d\n0000000000 65535 f \n" % len(self.offsets))
+        for first in range(1, len(self.offsets), 10000):
+            self.write(b"".join(b"%010d 00000 n \n" % offset if offset else b"0000000000 00001 f \n"
+                                for offset in self.offsets[first:first + 10000]))
+        self.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                   % (len(self.offsets), catalog, start))
+
+    def write_xref_stream(self, catalog):
+        number = self.reserve()
+        self.offsets[number] = self.position
+        compressor = zlib.compressobj()
+        entries = [compressor.compress(struct.pack(">BQB", 0, 0, 255))]
+        for first in range(1, len(self.offsets), 10000):
+            entries.append(compressor.compress(b"".join(
+                struct.pack(">BQB", 1, offset, 0) if offset else struct.pack(">BQB", 0, 0, 1)
+                for offset in self.offsets[first:first + 10000])))
+        entries.append(compressor.flush())
+        data = b"".join(entries)
+        self.write(b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 8 1] /Root %d 0 R /Filter /FlateDecode "
+                   b"/Length %d >>\nstream\n" % (number, len(self.offsets), catalog, len(data)))
+        self.write(data)
+        self.write(b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % self.offsets[number])
+
+
+def _number_outline(items, numbers):
+    """Outline items with local page numbers replaced by output object numbers"""
+    return [[title, None if page is None else numbers[page], view, _number_outline(children, numbers)]
+            for title, page, view, children in items]
+
+
+class MergeCancelled(Exception):
+    """Raised by merge_pdfs when its cancel event is set"""
+
+
+class MergeProgress:
+    """
+    How far a merge has got, as passed to merge_pdfs' progress callback.
+
+    The estimate of the time left assumes the rest of the input goes at the
+    rate so far, by input file size.
+    """
+    __slots__ = ("files_done", "files_total", "pages", "bytes_written", "input_bytes_done",
+                 "input_bytes_total", "seconds")
+
+    def __init__(self, files_done, files_total, pages, bytes_written, input_bytes_done, input_bytes_total,
+                 seconds):
+        self.files_done = files_done
+        self.files_total = files_total
+        self.pages = pages
+        self.bytes_written = bytes_written
+        self.input_bytes_done = input_bytes_done
+        self.input_bytes_total = input_bytes_total
+        self.seconds = seconds
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes_written / self.seconds if self.seconds else 0.0
+
+    @property
+    def eta(self):
+        """Seconds left, or None before there is anything to go by"""
+        if self.input_bytes_total:
+            fraction = self.input_bytes_done / self.input_bytes_total
+        else:
+            fraction = self.files_done / self.files_total
+        if not fraction:
+            return None
+        return self.seconds * (1 - fraction) / fraction
+
+    def as_dict(self):
+        """The progress as a flat dict, for structured logs"""
+        eta = self.eta
+        return {
+            "files_done": self.files_done,
+            "files_total": self.files_total,
+            "pages": self.pages,
+            "bytes_written": self.bytes_written,
+            "seconds": round(self.seconds, 3),
+            "pages_per_second": round(self.pages_per_second, 1),
+            "bytes_per_second": round(self.bytes_per_second),
+            "eta_seconds": None if eta is None else round(eta, 1),
+        }
+
+
+def _file_size(path):
+    """Size of path, 0 if it cannot be read (read_segment reports why)"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def merge_pdfs(inputs, output_path, workers=None, progress=None, deduplicate=False, bookmarks=False,
+               cancel=None):
+    """
+    Merges PDF files, or selected pages of them, into output_path, in order.
+
+    Files are parsed in a pool of workers and written to the output as soon
+    as every file before them has been written, so memory use depends on the
+    size of the files in flight, not on the size of the merged document. The
+    output is written under a temporary name and renamed into place when
+    complete; a merge that fails or is cancelled leaves no output behind.
+
+    Document-level features of the inputs (forms, named destinations) are
+    not carried over; pages keep their content, resources and annotations.
+
+    Args:
+        inputs (iterable): File paths or MergeInputs, which can select pages.
+        workers (int, optional): Parser processes, defaults to the CPU count.
+        progress (callable, optional): Called with a MergeProgress after
+            each file is written.
+        deduplicate (bool): Write identical fonts, images and other streams
+            once and share them between inputs (see PdfStreamWriter).
+        bookmarks (bool): Add a bookmark for each input, holding the input's
+            own bookmarks to the merged pages.
+        cancel (threading.Event, optional): Checked after each file; once
+            set, the merge stops with MergeCancelled.
+
+    Returns:
+        int: Number of pages written.
+
+    Raises:
+        ValueError: If there are no files, or one of them cannot be merged.
+        MergeCancelled: If cancel was set.
+    """
+    inputs = [MergeInput(item) if isinstance(item, str) else item for item in inputs]
+    if not inputs:
+        raise ValueError("No PDF files to merge")
+
+    start = time.perf_counter()
+    sizes = [_file_size(merge_input.path) for merge_input in inputs] if progress is not None else []
+    input_bytes_done, input_bytes_total = 0, sum(sizes)
+    temp_path = output_path + ".part"
+    try:
+        with open(temp_path, "wb", buffering=WRITE_BUFFER_SIZE) as file:
+            writer = PdfStreamWriter(file, deduplicate)
+            read = functools.partial(read_segment, digests=deduplicate, bookmarks=bookmarks)
+            with contextlib.closing(parallel.iter_parallel(read, inputs, workers)) as segments:
+                for done, (_, segment) in enumerate(segments, 1):
+                    if cancel is not None and cancel.is_set():
+                        raise MergeCancelled("The merge was cancelled")
+                    writer.add_segment(segment)
+                    if progress is not None:
+                        input_bytes_done += sizes[done - 1]
+                        progress(MergeProgress(done, len(inputs), len(writer.page_numbers), writer.position,
+                                               input_bytes_done, input_bytes_total, time.perf_counter() - start))
+            writer.close()
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, output_path)
+    return len(writer.page_numbers)
+
+
+def read_manifest(path):
+    """
+    Reads merge jobs from a CSV or JSON manifest.
+
+    A CSV manifest has one job per row: the output file, then the input
+    files or glob patterns in merge order. An input can end with a page
+    selection in brackets, like "report.pdf[1-3,-1]" (see
+    parse_page_ranges). Blank rows and rows whose first cell starts with #
+    are skipped. A JSON manifest is a list of {"output": ..., "inputs":
+    [...]} objects, or an object mapping each output file to its inputs,
+    where an input is a string as in CSV or a {"path", "pages", "title"}
+    object. Relative paths are taken relative to the manifest's directory.
+
+    Returns:
+        list[dict]: Jobs as {"output": path, "inputs": [{"path": path or
+        pattern, "pages": selection or None, "title": title or None}, ...]}.
+
+    Raises:
+        ValueError: If the manifest is malformed or lists an output twice.
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as file:
+            try:
+                entries = json.load(file)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path} is not valid JSON: {e}") from e
+        if isinstance(entries, dict):
+            entries = [{"output": output, "inputs": inputs} for output, inputs in entries.items()]
+        if not isinstance(entries, list):
+            raise ValueError(f"{path} must hold a list of jobs or an object of outputs")
+        rows = []
+        for number, entry in enumerate(entries, 1):
+            if not isinstance(entry, dict) or not isinstance(entry.get("output"), str) \
+                    or not isinstance(entry.get("inputs"), list) \
+                    or not all(isinstance(item, str) or isinstance(item, dict) and isinstance(item.get("path"), str)
+                               for item in entry["inputs"]):
+                raise ValueError(f"Job {number}: expected an output file and a list of input files")
+            rows.append((number, [entry["output"]] + entry["inputs"]))
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            rows = [(number, [cell.strip() for cell in row if cell.strip()])
+                    for number, row in enumerate(csv.reader(file), 1)]
+        rows = [(number, row) for number, row in rows if row and not row[0].startswith("#")]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    outputs = set()
+    for number, row in rows:
+        if len(row) < 2:
+            raise ValueError(f"Job {number}: expected an output file and at least one input")
+        output = os.path.join(directory, row[0])
+        if output in outputs:
+            raise ValueError(f"Job {number}: output {row[0]} is already written by another job")
+        outputs.add(output)
+        inputs = []
+        for item in row[1:]:
+            if isinstance(item, str):
+                match = MANIFEST_PAGES_PATTERN.fullmatch(item)
+                item = {"path": match[1], "pages": match[2]} if match else {"path": item}
+            item = {"path": os.path.join(directory, item["path"]), "pages": item.get("pages") or None,
+                    "title": item.get("title") or None}
+            if item["pages"] is not None:
+                try:
+                    parse_page_ranges(item["pages"])
+                except ValueError as e:
+                    raise ValueError(f"Job {number}: {e}") from e
+            inputs.append(item)
+        jobs.append({"output": output, "inputs": inputs})
+    return jobs
+
+
+def expand_inputs(inputs):
+    """
+    MergeInputs for manifest inputs, expanding glob patterns in sorted order.
+    The page selection and title of a pattern apply to every file it matches.
+    """
+    merge_inputs = []
+    for item in inputs:
+        if glob.has_magic(item["path"]):
+            paths = sorted(glob.glob(item["path"]))
+            if not paths:
+                raise ValueError(f"No files match {item['path']}")
+        else:
+            paths = [item["path"]]
+        merge_inputs.extend(MergeInput(path, item["pages"], item["title"]) for path in paths)
+    return merge_inputs
+
+
+def log_record(event, **fields):
+    """Writes a structured log record to stderr, as one line of JSON"""
+    print(json.dumps({"time": round(time.time(), 3), "event": event, **fields}), file=sys.stderr, flush=True)
+
+
+def run_job(job, deduplicate=False, bookmarks=False, log_progress=False):
+    """
+    Runs one manifest job in the calling process.
+
+    A failed job is reported in the result rather than raised, so one bad
+    input does not stop a batch. With log_progress, a "progress" record
+    (see log_record and MergeProgress.as_dict) is logged at most every
+    PROGRESS_LOG_INTERVAL seconds while the job runs, and after its last file.
+
+    Returns:
+        dict: {"output", "status" ("ok" or "error"), "inputs", "pages",
+        "seconds"}, plus "error" with the reason when the job failed.
+    """
+    start = time.perf_counter()
+    result = {"output": job["output"], "status": "ok", "inputs": 0, "pages": 0}
+    try:
+        inputs = expand_inputs(job["inputs"])
+        result["inputs"] = len(inputs)
+        directory = os.path.dirname(job["output"])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        progress = None
+        if log_progress:
+            last_logged = [0.0]
+
+            def progress(status):
+                if status.files_done == status.files_total or \
+                        status.seconds - last_logged[0] >= PROGRESS_LOG_INTERVAL:
+                    last_logged[0] = status.seconds
+                    log_record("progress", output=job["output"], **status.as_dict())
+
+        result["pages"] = merge_pdfs(inputs, job["output"], workers=1, progress=progress,
+                                     deduplicate=deduplicate, bookmarks=bookmarks)
+    except (ValueError, OSError) as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
@@ -0,0 +1,625 @@
+"""
+Tk-free batch engine for the PDF password remover.
+
+Files are unlocked in a process pool, as decryption in PyPDF2 (RC4, or AES
+through PyCryptodome) is CPU-bound. Each worker reads, decrypts and writes
+one file at a time and sends back only a small result, and at most two
+files per worker are in flight, so memory use does not grow with the
+number of files. Within a file, objects are decrypted and written one at
+a time (see write_decrypted), so the whole document, with its outline,
+forms and metadata, is kept while memory follows the largest object.
+
+Instead of one password, a file can be given candidates to try: a list of
+passwords, and templates that derive a password from the file's row in a
+details CSV, such as "{pan|upper}{dob|date:%d%m%Y}". All candidates are
+tried against one parsed reader, so each attempt only re-runs the key
+derivation. A PasswordHistory remembers which candidate opened each file
+so that the next run tries it first.
+
+Before anything is decrypted, every file is scanned (see scan_pdf): its
+tail says whether it is encrypted at all, so the files that are not, and
+those that are corrupt or use encryption PyPDF2 cannot undo, are settled
+without a full parse.
+"""
+import csv
+import datetime
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import struct
+import time
+import zlib
+from array import array
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import IndirectObject, StreamObject
+
+import parallel
+import pdf_merge
+
+# Added to a file's name for its unlocked copy: statement.pdf -> statement_unlocked.pdf
+UNLOCKED_SUFFIX = "_unlocked"
+
+# Result statuses; unlocked and not_encrypted both leave an unlocked PDF behind
+UNLOCKED = "unlocked"
+NOT_ENCRYPTED = "not_encrypted"
+WRONG_PASSWORD = "wrong_password"
+ERROR = "error"
+# Scan statuses (see scan_pdf); unsupported is also the result of unlocking such a file
+ENCRYPTED = "encrypted"
+CORRUPT = "corrupt"
+UNSUPPORTED = "unsupported"
+
+# Bytes read from the end of a file to find startxref, which should be in the last 1024
+SCAN_TAIL_SIZE = 4096
+# Bytes read at a time while following startxref to the newest trailer
+SCAN_CHUNK_SIZE = 4096
+# Files scanned per task when scanning in a process pool; one tail read is far cheaper than sending a task
+SCAN_BATCH_SIZE = 256
+STARTXREF_PATTERN = re.compile(rb"startxref\s+(\d+)")
+# A subsection header of a cross-reference table, "first count", followed by count 20-byte entries
+XREF_SUBSECTION_PATTERN = re.compile(rb"\s*(\d+) +(\d+)[ \t]*(?:\r\n|\r|\n)")
+XREF_STREAM_PATTERN = re.compile(rb"\s*\d+\s+\d+\s+obj\s*<<")
+XREF_TYPE_PATTERN = re.compile(rb"/Type\s*/XRef(?![^\s/<>\[\]()%])")
+# The /Encrypt key, not a longer name such as /EncryptMetadata
+ENCRYPT_KEY_PATTERN = re.compile(rb"/Encrypt(?![^\s/<>\[\]()%])")
+# Crypt filter methods PyPDF2 implements, and those of them that need PyCryptodome
+CRYPT_METHODS = ("/Identity", "/V2", "/AESV2", "/AESV3")
+AES_METHODS = ("/AESV2", "/AESV3")
+
+# A template field: "{name}" or "{name|filter|filter...}"
+TEMPLATE_FIELD_PATTERN = re.compile(r"\{([^{}|]+)((?:\|[^{}|]+)*)\}")
+# Date layouts accepted in details CSVs for the date filter
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y%m%d", "%d%m%Y")
+
+
+def unlocked_path(path):
+    """Where the unlocked copy of path is written, next to it"""
+    root, extension = os.path.splitext(path)
+    if extension.lower() != ".pdf":
+        root, extension = path, ".pdf"
+    return root + UNLOCKED_SUFFIX + extension
+
+
+def find_pdfs(directory):
+    """
+    Yields the PDFs under directory, walking it in sorted order.
+
+    Unlocked copies and the partial files of a running unlock are left out,
+    so a tree can be unlocked in place more than once.
+    """
+    for root, directories, names in os.walk(directory):
+        directories.sort()
+        for name in sorted(names):
+            if is_unlock_input(name):
+                yield os.path.join(root, name)
+
+
+def is_unlock_input(name):
+    """Whether a file name is a PDF to unlock, rather than an unlocked copy or not a PDF"""
+    lower = name.lower()
+    return lower.endswith(".pdf") and not lower.endswith(UNLOCKED_SUFFIX + ".pdf")
+
+
+def _read_trailer(file):
+    """
+    The dictionary of the newest trailer, as raw bytes, found by following
+    startxref from the end of the file: a trailer after a cross-reference
+    table, or the dictionary of a cross-reference stream.
+
+    Returns None when the tail does not lead to one the way the format
+    describes, e.g. for files PyPDF2 would have to repair.
+    """
+    size = os.fstat(file.fileno()).st_size
+    file.seek(max(size - SCAN_TAIL_SIZE, 0))
+    tail = file.read()
+    marker = tail.rfind(b"startxref")
+    match = STARTXREF_PATTERN.match(tail, marker) if marker >= 0 else None
+    if match is None:
+        return None
+    offset = int(match.group(1))
+    if not 0 < offset < size:
+        return None
+
+    file.seek(offset)
+    chunk = file.read(SCAN_CHUNK_SIZE)
+    stripped = chunk.lstrip()
+    if stripped.startswith(b"xref"):
+        # Skip the entries subsection by subsection rather than read them;
+        # in a linearized file this is the first-page table at the start
+        position = offset + len(chunk) - len(stripped) + len(b"xref")
+        while True:
+            file.seek(position)
+            chunk = file.read(SCAN_CHUNK_SIZE)
+            match = XREF_SUBSECTION_PATTERN.match(chunk)
+            if match is None:
+                break
+            position += match.end() + 20 * int(match.group(2))
+        chunk = chunk.lstrip()
+        if not chunk.startswith(b"trailer"):
+            return None
+        end = chunk.find(b"startxref")
+        return chunk[:end] if end >= 0 else chunk
+
+    if XREF_STREAM_PATTERN.match(chunk):
+        end = chunk.find(b"stream")
+        dictionary = chunk[:end] if end >= 0 else chunk
+        if XREF_TYPE_PATTERN.search(dictionary):
+            return dictionary
+    return None
+
+
+def _unsupported_encryption(encrypt):
+    """Why PyPDF2 cannot decrypt a file with this encryption dictionary, or None if it can"""
+    handler = encrypt.get("/Filter")
+    if handler != "/Standard" or "/SubFilter" in encrypt:
+        return f"{handler} security handler (only password security is supported)"
+    version = encrypt.get("/V", 0)
+    if version not in (1, 2, 3, 4, 5):
+        return f"encryption version {version} is not supported"
+    methods = set()
+    if version >= 4:
+        filters = encrypt.get("/CF")
+        filters = filters.get_object() if filters is not None else {}
+        for key in ("/StmF", "/StrF", "/EFF"):
+            name = encrypt.get(key, "/Identity")
+            if name != "/Identity":
+                crypt_filter = filters.get(name)
+                methods.add(crypt_filter.get_object().get("/CFM") if crypt_filter is not None else name)
+    unknown = methods - set(CRYPT_METHODS)
+    if unknown:
+        return f"crypt filter {', '.join(sorted(map(str, unknown)))} is not supported"
+    if (version == 5 or methods & set(AES_METHODS)) and importlib.util.find_spec("Crypto") is None:
+        return "AES encryption needs PyCryptodome (pip install pycryptodome)"
+    return None
+
+
+def scan_pdf(path):
+    """
+    Finds out whether a PDF is encrypted, without parsing it.
+
+    Only the end of the file, and the newest trailer startxref points to,
+    are read; most files are settled by those few kilobytes. Encrypted
+    files, and files whose tail cannot be followed, have their
+    cross-reference table parsed by PyPDF2 to read the encryption
+    dictionary, or to tell a damaged but readable file from a corrupt one.
+
+    Returns:
+        dict: {"path", "status"}, the status being encrypted, not_encrypted,
+        corrupt (unreadable) or unsupported (encrypted in a way PyPDF2
+        cannot decrypt), plus "error" with the reason for the last two.
+    """
+    result = {"path": path, "status": NOT_ENCRYPTED}
+    try:
+        with open(path, "rb") as file:
+            trailer = _read_trailer(file)
+    except OSError as e:
+        result.update(status=CORRUPT, error=str(e))
+        return result
+    if trailer is not None and not ENCRYPT_KEY_PATTERN.search(trailer):
+        return result
+
+    try:
+        with pdf_merge.map_pdf(path) as file:
+            reader = PdfReader(file)
+            if "/Encrypt" not in reader.trailer:
+                return result
+            result["status"] = ENCRYPTED
+            reason = _unsupported_encryption(reader.trailer["/Encrypt"].get_object())
+    except NotImplementedError as e:
+        # PdfReader itself refuses some encryption dictionaries, e.g. certificate security
+        status = UNSUPPORTED if trailer is not None else CORRUPT
+        result.update(status=status, error=str(e) or type(e).__name__)
+        return result
+    except Exception as e:
+        result.update(status=CORRUPT, error=str(e) or type(e).__name__)
+        return result
+    if reason is not None:
+        result.update(status=UNSUPPORTED, error=reason)
+    return result
+
+
+def _scan_batch(paths):
+    return [scan_pdf(path) for path in paths]
+
+
+def scan_pdfs(paths, workers=None):
+    """
+    Scans PDFs (see scan_pdf) in a pool of worker processes, a batch of
+    files per task.
+
+    Args:
+        paths (sequence): PDF paths.
+        workers (int, optional): Worker processes, defaults to the CPU
+            count. A single batch is always scanned in the calling process.
+
+    Yields:
+        dict: The result of scan_pdf for each path, in input order.
+    """
+    batches = [paths[start:start + SCAN_BATCH_SIZE] for start in range(0, len(paths), SCAN_BATCH_SIZE)]
+    if len(batches) <= 1:
+        workers = 1
+    for _, results in parallel.iter_parallel(_scan_batch, batches, workers):
+        yield from results
+
+
+def _object_generations(reader):
+    """{object number: generation} of every object in use in the file"""
+    generations = {}
+    for generation, table in reader.xref.items():
+        free = reader.xref_free_entry.get(generation, {})
+        for number in table:
+            if number and not free.get(number) and generation >= generations.get(number, 0):
+                generations[number] = generation
+    for number in reader.xref_objStm:
+        generations.setdefault(number, 0)
+    return generations
+
+
+def write_decrypted(reader, file):
+    """
+    Writes the document of a decrypted reader to file without encryption.
+
+    The object table is walked once: each object is read, decrypted by
+    PyPDF2, written out under its own number and dropped from the reader's
+    cache, so memory use follows the largest object rather than the
+    document. As numbers are kept, references need no rewriting. Objects
+    packed in object streams are written on their own; the object streams,
+    cross-reference streams and the encryption dictionary are left out, and
+    a new cross-reference section is written.
+
+    Returns:
+        int: Number of objects written.
+    """
+    trailer = reader.trailer
+    encrypt = trailer.raw_get("/Encrypt") if "/Encrypt" in trailer else None
+    skip = encrypt.idnum if isinstance(encrypt, IndirectObject) else None
+    generations = _object_generations(reader)
+    size = max(generations, default=0) + 1
+    offsets = array("q", bytes(8 * size))
+    file.write(reader.pdf_header.encode("latin-1") + b"\n%\xe2\xe3\xcf\xd3\n")
+    written = 0
+    for number in sorted(generations):
+        if number == skip:
+            continue
+        generation = generations[number]
+        obj = reader.get_object(IndirectObject(number, generation, reader))
+        if isinstance(obj, StreamObject) and obj.get("/Type") in ("/ObjStm", "/XRef"):
+            # Their contents are written as objects of their own; object
+            # streams stay cached for the objects still to be read from them
+            continue
+        offsets[number] = file.tell()
+        file.write(b"%d %d obj\n" % (number, generation))
+        obj.write_to_stream(file, None)
+        file.write(b"\nendobj\n")
+        reader.resolved_objects.pop((generation, number), None)
+        written += 1
+
+    position = file.tell()
+    entries = {key: trailer.raw_get(key) for key in ("/Root", "/Info", "/ID") if key in trailer}
+    if position > pdf_merge.MAX_XREF_TABLE_OFFSET:
+        _write_xref_stream(file, position, offsets, generations, entries)
+    else:
+        file.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for first in range(1, size, 10000):
+            file.write(b"".join(b"%010d %05d n \n" % (offsets[number], generations[number]) if offsets[number]
+                                else b"0000000000 00001 f \n" for number in range(first, min(first + 10000, size))))
+        file.write(b"trailer\n")
+        _write_trailer(file, size, entries, b"")
+        file.write(b"\nstartxref\n%d\n%%%%EOF\n" % position)
+    return written
+
+
+def _write_trailer(file, size, entries, extra):
+    file.write(b"<< /Size %d" % size)
+    for key, value in entries.items():
+        file.write(b" %s " % key.encode("latin-1"))
+        value.write_to_stream(file, None)
+    file.write(extra + b" >>")
+
+
+def _write_xref_stream(file, position, offsets, generations, entries):
+    """Cross-reference stream, for outputs with offsets too large for a table (see pdf_merge)"""
+    number = len(offsets)
+    compressor = zlib.compressobj()
+    data = [compressor.compress(struct.pack(">BQH", 0, 0, 65535))]
+    for first in range(1, number, 10000):
+        data.append(compressor.compress(b"".join(
+            struct.pack(">BQH", 1, offsets[index], generations[index]) if offsets[index]
+            else struct.pack(">BQH", 0, 0, 1) for index in range(first, min(first + 10000, number)))))
+    data.append(compressor.compress(struct.pack(">BQH", 1, position, 0)))
+    data.append(compressor.flush())
+    data = b"".join(data)
+    file.write(b"%d 0 obj\n" % number)
+    _write_trailer(file, number + 1, entries,
+                   b" /Type /XRef /W [1 8 2] /Filter /FlateDecode /Length %d" % len(data))
+    file.write(b"\nstream\n")
+    file.write(data)
+    file.write(b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % position)
+
+
+def _apply_filter(value, name):
+    """Applies one template filter to a field value"""
+    name, _, argument = name.partition(":")
+    if name == "upper":
+        return value.upper()
+    if name == "lower":
+        return value.lower()
+    if name == "digits":
+        return "".join(character for character in value if character.isdigit())
+    if name in ("first", "last") and argument.isdigit():
+        count = int(argument)
+        return value[:count] if name == "first" else value[len(value) - count:]
+    if name == "date" and argument:
+        for layout in DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(value, layout).strftime(argument)
+            except ValueError:
+                continue
+        raise ValueError(f"{value!r} is not a date")
+    raise ValueError(f"Unknown template filter {name!r}")
+
+
+def check_template(template):
+    """Raises ValueError if template has no fields or an unknown filter"""
+    fields = TEMPLATE_FIELD_PATTERN.findall(template)
+    if not fields:
+        raise ValueError(f"Template {template!r} has no {{field}}")
+    for _, filters in fields:
+        for name in filters.split("|")[1:]:
+            try:
+                # A date, so that every known filter applies to it
+                _apply_filter("2000-01-31", name.strip())
+            except ValueError as e:
+                raise ValueError(f"{e} in {template!r}") from None
+
+
+def expand_template(template, row):
+    """
+    Fills a password template from a details row.
+
+    Fields are column names, optionally followed by filters: upper, lower,
+    digits, first:N, last:N and date:FORMAT (strftime, for dates written
+    like 2024-03-31 or 31/03/2024), e.g. "{name|lower|first:4}{dob|date:%d%m}".
+
+    Returns:
+        str: The password, or None if the row lacks a field or a date.
+    """
+    def replace(match):
+        value = (row.get(match.group(1).strip()) or "").strip()
+        if not value:
+            raise LookupError(match.group(1))
+        for name in match.group(2).split("|")[1:]:
+            value = _apply_filter(value, name.strip())
+        return value
+
+    try:
+        return TEMPLATE_FIELD_PATTERN.sub(replace, template)
+    except (LookupError, ValueError):
+        return None
+
+
+def read_candidates(path):
+    """Candidate passwords, one per line; blank lines are skipped"""
+    with open(path, encoding="utf-8") as file:
+        return [line.rstrip("\r\n") for line in file if line.strip()]
+
+
+def read_details(path, key_column="filename"):
+    """
+    Reads a details CSV into {file name: row}, for password templates.
+
+    The key column holds file names; matching ignores directories and case.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        if key_column not in (reader.fieldnames or ()):
+            raise ValueError(f"{os.path.basename(path)} has no {key_column!r} column")
+        return {os.path.basename(row[key_column].strip()).lower(): row for row in reader}
+
+
+def candidate_label(password):
+    """
+    Names a listed candidate without storing it: a short hash of the password.
+
+    Passwords derived from templates are named by their template instead.
+    """
+    return "candidate:" + hashlib.blake2b(password.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def candidate_passwords(path, passwords=(), templates=(), details=None, history=None):
+    """
+    Lists the (label, password) candidates to try on a file, best first.
+
+    The candidate that opened this file last time comes first, then the
+    others by how many files they have opened, then in the order given:
+    templates before listed passwords. Duplicates are tried once.
+    """
+    candidates = []
+    row = details.get(os.path.basename(path).lower()) if details else None
+    if row is not None:
+        for template in templates:
+            password = expand_template(template, row)
+            if password is not None:
+                candidates.append(("template:" + template, password))
+    candidates.extend((candidate_label(password), password) for password in passwords)
+
+    seen = set()
+    candidates = [candidate for candidate in candidates
+                  if candidate[1] not in seen and not seen.add(candidate[1])]
+    if history is not None:
+        candidates = history.order(path, candidates)
+    return candidates
+
+
+class PasswordHistory:
+    """
+    Which candidate opened which file, kept in a JSON file between runs.
+
+    Files are remembered by name, so a statement that keeps its name from
+    month to month is opened at the first attempt. Only labels are stored:
+    template text, or a short hash for listed passwords, never a password.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.hits = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                saved = json.load(file)
+            self.files = saved.get("files", {})
+            self.hits = saved.get("hits", {})
+
+    def order(self, path, candidates):
+        last = self.files.get(os.path.basename(path).lower())
+        # sorted() is stable, so candidates that tie keep their given order
+        return sorted(candidates, key=lambda candidate: (candidate[0] != last, -self.hits.get(candidate[0], 0)))
+
+    def record(self, path, label):
+        self.files[os.path.basename(path).lower()] = label
+        self.hits[label] = self.hits.get(label, 0) + 1
+
+    def save(self):
+        """Writes the history under a temporary name and renames it into place"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"files": self.files, "hits": self.hits}, file, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+def unlock_pdf(item):
+    """
+    Decrypts one PDF and writes an unlocked copy next to it.
+
+    The copy is written under a temporary name and renamed into place, so
+    an interrupted run never leaves a truncated file.
+
+    Args:
+        item (tuple): (path, password), or (path, candidates) where
+            candidates are (label, password) pairs to try in order (see
+            candidate_passwords). The file is parsed once for all of them.
+            A third element, if given, is where to write the copy instead
+            of unlocked_path(path); its directory is created as needed.
+
+    Returns:
+        dict: {"path", "status", "output", "pages", "seconds"}, plus
+        "error" with the reason when the status is "error", and with
+        candidates, "matched" (the label that opened the file) and
+        "attempts". The output is None unless a copy was written.
+    """
+    path, candidates = item[:2]
+    output_path = item[2] if len(item) > 2 else None
+    start = time.perf_counter()
+    result = {"path": path, "status": UNLOCKED, "output": None, "pages": 0}
+    try:
+        with pdf_merge.map_pdf(path) as file:
+            reader = PdfReader(file)
+            if not reader.is_encrypted:
+                result["status"] = NOT_ENCRYPTED
+            elif not _try_passwords(reader, candidates, result):
+                result["status"] = WRONG_PASSWORD
+            else:
+                pages = int(reader.trailer["/Root"]["/Pages"]["/Count"])
+                if output_path is None:
+                    output_path = unlocked_path(path)
+                else:
+                    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                temp_path = output_path + ".part"
+                try:
+                    with open(temp_path, "wb", buffering=pdf_merge.WRITE_BUFFER_SIZE) as output:
+                        write_decrypted(reader, output)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+                os.replace(temp_path, output_path)
+                result["output"] = output_path
+                result["pages"] = pages
+    except Exception as e:
+        result["status"] = ERROR
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _try_passwords(reader, candidates, result):
+    """Decrypts reader with a password or the first working candidate, noting which in result"""
+    if isinstance(candidates, str):
+        return bool(reader.decrypt(candidates))
+    # The encryption dictionary is parsed once; each attempt only derives and checks a key
+    for attempts, (label, password) in enumerate(candidates, 1):
+        if reader.decrypt(password):
+            result["matched"] = label
+            result["attempts"] = attempts
+            return True
+    result["attempts"] = len(candidates)
+    return False
+
+
+def _scanned_result(scan):
+    """The unlock result of a file its scan rules out: nothing to decrypt, or nothing that can be"""
+    result = {"path": scan["path"], "status": scan["status"], "output": None, "pages": 0, "seconds": 0}
+    if scan["status"] == CORRUPT:
+        result["status"] = ERROR
+    if "error" in scan:
+        result["error"] = scan["error"]
+    return result
+
+
+def _unlock_results(items, workers, scan):
+    """Yields the result of each item; with scan, only the files it finds encrypted are decrypted"""
+    if scan:
+        scans = scan_pdfs([item[0] for item in items], workers) if scan is True else scan
+        encrypted = []
+        for item, result in zip(items, scans):
+            if result["status"] == ENCRYPTED:
+                encrypted.append(item)
+            else:
+                yield _scanned_result(result)
+        items = encrypted
+    for _, result in parallel.iter_parallel(unlock_pdf, items, workers):
+        yield result
+
+
+def unlock_pdfs(items, workers=None, progress=None, history=None, scan=True):
+    """
+    Unlocks PDFs in a pool of worker processes.
+
+    Args:
+        items (sequence): (path, password) or (path, candidates) pairs,
+            optionally with an output path, as taken by unlock_pdf.
+        workers (int, optional): Worker processes, defaults to the CPU
+            count. 1 unlocks everything in the calling process.
+        progress (callable, optional): Called as progress(files_done,
+            files_total, result) as each file is settled: first those the
+            scan rules out, then those decrypted, each in input order.
+        history (PasswordHistory, optional): Records the candidate that
+            opened each file; saving it is up to the caller.
+        scan (bool or sequence): Scan every file first (see scan_pdfs), so
+            that only encrypted files are parsed and decrypted; or the
+            results of an earlier scan_pdfs over the items' paths, in order.
+
+    Returns:
+        dict: Summary with "total", "unlocked", "not_encrypted" (counts),
+        "pages", "seconds", "matched" (files opened per candidate label)
+        and "failed", the results of the files that could not be unlocked
+        (wrong password, unsupported encryption or error).
+    """
+    start = time.perf_counter()
+    summary = {"total": len(items), UNLOCKED: 0, NOT_ENCRYPTED: 0, "pages": 0, "matched": {}, "failed": []}
+    for done, result in enumerate(_unlock_results(items, workers, scan), 1):
+        if result["status"] in (UNLOCKED, NOT_ENCRYPTED):
+            summary[result["status"]] += 1
+            summary["pages"] += result["pages"]
+        else:
+            summary["failed"].append(result)
+        if "matched" in result:
+            summary["matched"][result["matched"]] = summary["matched"].get(result["matched"], 0) + 1
+            if history is not None:
+                history.record(result["path"], result["matched"])
+        if progress is not None:
+            progress(done, len(items), result)
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
@@ -0,0 +1,347 @@
+"""
+Tk-free watch-folder engine for the PDF password remover.
+
+watch_folder keeps an inbox directory tree unlocked: every PDF that
+appears in it, or changes, is decrypted into an output directory that
+mirrors the inbox, as name_unlocked.pdf. On Linux the tree is watched
+through inotify, so an idle inbox costs nothing however many files it
+holds; elsewhere, or when the kernel runs out of watches, the tree is
+walked every poll interval instead.
+
+A file is only taken once its size and modification time have stayed
+the same for the settle time, so files still being copied in are left
+alone. Settled files are unlocked in batches in a process pool (see
+pdf_unlock.unlock_pdfs), and every outcome is appended to a journal,
+keyed by path, size and modification time. On restart the journal is
+read back: files unlocked, not encrypted or unsupported are skipped
+until they change, and only files that failed are tried again.
+"""
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import select
+import struct
+import sys
+import time
+
+import pdf_unlock
+
+# Seconds a file's size and modification time must stay the same before it is unlocked
+DEFAULT_SETTLE_SECONDS = 2.0
+# Seconds between walks of the inbox when it cannot be watched through inotify
+DEFAULT_POLL_SECONDS = 30.0
+# Files unlocked per batch; the journal and password history are saved between batches
+WATCH_BATCH_SIZE = 500
+# Statuses a restart does not retry until the file changes; wrong passwords and errors are retried
+SETTLED_STATUSES = (pdf_unlock.UNLOCKED, pdf_unlock.NOT_ENCRYPTED, pdf_unlock.UNSUPPORTED)
+# The journal is rewritten on open once it holds this many lines more than files
+JOURNAL_COMPACT_SLACK = 10000
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+# Files finished writing or moved in, and directories created or moved in, which are watched in turn
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+INOTIFY_EVENT = struct.Struct("iIII")
+INOTIFY_READ_SIZE = 64 * 1024
+
+
+def file_signature(path):
+    """(size, modification time in ns) of path, or None if it is gone"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class UnlockJournal:
+    """
+    Append-only record of the files a watch has unlocked or given up on.
+
+    Each outcome is one JSON line, {"path", "size", "mtime_ns", "status",
+    "output"}, flushed as soon as it is known, so a crash loses at most the
+    files in flight. Later lines for a path replace earlier ones.
+    """
+    def __init__(self, path):
+        self.path = path
+        # path -> (size, mtime_ns, status, recorded by this process)
+        self.files = {}
+        lines = 0
+        try:
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line torn by a crash mid-write
+                        continue
+                    self.files[entry["path"]] = (entry["size"], entry["mtime_ns"], entry["status"], False)
+                    lines += 1
+        except FileNotFoundError:
+            pass
+        if lines > len(self.files) + JOURNAL_COMPACT_SLACK:
+            self._compact()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def _compact(self):
+        """Rewrites the journal with one line per file, under a temporary name"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for path, (size, mtime_ns, status, _) in self.files.items():
+                file.write(json.dumps({"path": path, "size": size, "mtime_ns": mtime_ns, "status": status}) + "\n")
+        os.replace(temp_path, self.path)
+
+    def is_done(self, path, signature):
+        """
+        Whether path, as it is now, needs no unlocking: settled by an earlier
+        run, or tried by this one whatever the outcome.
+        """
+        entry = self.files.get(path)
+        return entry is not None and entry[:2] == signature and (entry[3] or entry[2] in SETTLED_STATUSES)
+
+    def record(self, path, signature, result):
+        self.files[path] = (*signature, result["status"], True)
+        self.file.write(json.dumps({"path": path, "size": signature[0], "mtime_ns": signature[1],
+                                    "status": result["status"], "output": result["output"]}) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class InotifyWatcher:
+    """
+    Reports PDFs written, moved or linked into a directory tree, through
+    Linux inotify; every directory of the tree gets a watch.
+
+    Raises:
+        OSError: If inotify is unavailable, or a directory cannot be
+            watched, e.g. when fs.inotify.max_user_watches is reached.
+    """
+    def __init__(self, root):
+        library = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_init1: {os.strerror(ctypes.get_errno())}")
+        # watch descriptor -> directory
+        self.directories = {}
+        try:
+            self.add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def add_tree(self, directory):
+        """Watches directory and every directory below it; returns the PDFs already there"""
+        paths = []
+        for root, directories, names in os.walk(directory):
+            descriptor = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if descriptor < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOENT:
+                    continue
+                raise OSError(error, f"Cannot watch {root}: {os.strerror(error)}")
+            self.directories[descriptor] = root
+            paths.extend(os.path.join(root, name) for name in names if pdf_unlock.is_unlock_input(name))
+        return paths
+
+    def changes(self, timeout):
+        """
+        Waits up to timeout seconds (None: indefinitely) for events and
+        returns the PDFs they concern. After an event queue overflow, every
+        PDF in the tree is returned.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        data = os.read(self.fd, INOTIFY_READ_SIZE)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b"\0"))
+            offset += INOTIFY_EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; every directory is still watched, so a walk catches up
+                roots = sorted(set(self.directories.values()))
+                return [path for root in roots for path in _directory_pdfs(root)]
+            if mask & IN_IGNORED:
+                self.directories.pop(descriptor, None)
+                continue
+            directory = self.directories.get(descriptor)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                paths.extend(self.add_tree(path))
+            elif pdf_unlock.is_unlock_input(name):
+                paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _directory_pdfs(directory):
+    """The PDFs directly in directory"""
+    try:
+        with os.scandir(directory) as entries:
+            return [entry.path for entry in entries if entry.is_file() and pdf_unlock.is_unlock_input(entry.name)]
+    except OSError:
+        return []
+
+
+class PollingWatcher:
+    """Reports every PDF in a directory tree each poll interval, for callers to compare"""
+    def __init__(self, root, interval=DEFAULT_POLL_SECONDS):
+        self.root = root
+        self.interval = interval
+        self.next_poll = time.monotonic() + interval
+
+    def changes(self, timeout):
+        """Waits up to timeout seconds (None: indefinitely) or until the next poll is due"""
+        wait = self.next_poll - time.monotonic()
+        if timeout is not None and timeout < wait:
+            time.sleep(max(timeout, 0))
+            return []
+        time.sleep(max(wait, 0))
+        self.next_poll = time.monotonic() + self.interval
+        return list(pdf_unlock.find_pdfs(self.root))
+
+    def close(self):
+        pass
+
+
+def open_watcher(root, poll_interval=DEFAULT_POLL_SECONDS, log=None):
+    """An InotifyWatcher for root where inotify works, otherwise a PollingWatcher"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except OSError as e:
+            if log is not None:
+                log(f"inotify unavailable ({e}), polling every {poll_interval:g}s")
+    return PollingWatcher(root, poll_interval)
+
+
+def output_path(inbox, output_directory, path):
+    """Where the unlocked copy of a file in inbox goes: the same place under output_directory"""
+    return os.path.join(output_directory, pdf_unlock.unlocked_path(os.path.relpath(path, inbox)))
+
+
+def watch_folder(inbox, output_directory, passwords, journal_path, workers=None,
+                 settle=DEFAULT_SETTLE_SECONDS, poll_interval=DEFAULT_POLL_SECONDS, history=None,
+                 log=None, stop=None):
+    """
+    Unlocks the PDFs in inbox, and those that arrive later, until stopped.
+
+    Args:
+        inbox (str): Directory tree to watch.
+        output_directory (str): Where the unlocked copies go, in the same
+            subdirectories as in the inbox. May be inside the inbox, as
+            unlocked copies are never unlocked again.
+        passwords (callable): Gives the password, or candidates, for a
+            path, as taken by pdf_unlock.unlock_pdf.
+        journal_path (str): The UnlockJournal, created if missing.
+        workers (int, optional): Worker processes, defaults to the CPU count.
+        settle (float): Seconds a file must stay unchanged before it is
+            unlocked.
+        poll_interval (float): Seconds between walks of the tree when
+            inotify cannot be used.
+        history (PasswordHistory, optional): Updated with the candidate
+            that opened each file, and saved after each batch.
+        log (callable, optional): Called with a line of text for each file
+            unlocked or failed, and for changes of watcher.
+        stop (threading.Event, optional): Checked between batches and
+            waits; the watch returns once it is set.
+    """
+    inbox = os.path.abspath(inbox)
+    output_directory = os.path.abspath(output_directory)
+    log = log or (lambda message: None)
+    journal = UnlockJournal(journal_path)
+    # path -> (signature, time it was first seen with that signature)
+    pending = {}
+
+    def consider(path, now):
+        signature = file_signature(path)
+        if signature is None or journal.is_done(path, signature):
+            pending.pop(path, None)
+        elif path not in pending or pending[path][0] != signature:
+            # A file last modified long ago, e.g. one left from before a restart, is settled already
+            pending[path] = (signature, min(now, signature[1] / 1e9))
+
+    watcher = open_watcher(inbox, poll_interval, log)
+    try:
+        # Files that arrived while no watch was running
+        now = time.time()
+        for path in pdf_unlock.find_pdfs(inbox):
+            consider(path, now)
+        log(f"Watching {inbox} ({type(watcher).__name__}), {len(pending)} file(s) to unlock")
+
+        while stop is None or not stop.is_set():
+            now = time.time()
+            ready = []
+            for path, (signature, since) in list(pending.items()):
+                if now - since < settle:
+                    continue
+                if file_signature(path) == signature:
+                    ready.append((path, signature))
+                else:
+                    consider(path, now)
+                if len(ready) >= WATCH_BATCH_SIZE:
+                    break
+            if ready:
+                _unlock_batch(ready, inbox, output_directory, passwords, journal, workers, history, log)
+                for path, _ in ready:
+                    pending.pop(path, None)
+                continue
+
+            # Nothing settled yet: wait for events, or until the next pending file could settle
+            timeout = None
+            if pending:
+                timeout = max(min(since for _, since in pending.values()) + settle - now, 0.05)
+            if stop is not None:
+                timeout = min(timeout, 1.0) if timeout is not None else 1.0
+            try:
+                changed = watcher.changes(timeout)
+            except OSError as e:
+                # e.g. a new directory beyond the inotify watch limit
+                log(f"inotify failed ({e}), polling every {poll_interval:g}s")
+                watcher.close()
+                watcher = PollingWatcher(inbox, poll_interval)
+                changed = list(pdf_unlock.find_pdfs(inbox))
+            now = time.time()
+            for path in changed:
+                consider(path, now)
+    finally:
+        watcher.close()
+        journal.close()
+        if history is not None:
+            history.save()
+
+
+def _unlock_batch(ready, inbox, output_directory, passwords, journal, workers, history, log):
+    """Unlocks the settled (path, signature) pairs and journals each outcome"""
+    signatures = dict(ready)
+    items = [(path, passwords(path), output_path(inbox, output_directory, path)) for path, _ in ready]
+
+    def record(done, total, result):
+        journal.record(result["path"], signatures[result["path"]], result)
+        log(f"{result['status']} {result['path']}"
+            + (f" -> {result['output']}" if result["output"] else "")
+            + (f": {result['error']}" if "error" in result else ""))
+
+    pdf_unlock.unlock_pdfs(items, workers, progress=record, history=history)
+    if history is not None:
+        history.save()
@@ -0,0 +1,608 @@
+"""
+Benchmarks and golden-value regression checks for the salary engine.
+
+Runs headless against synthetic employees, e.g.
+
+    python salary_benchmark.py golden batch --rows 10000,1000000,10000000
+
+The golden check compares every engine entry point against
+salary_golden.json, which holds breakups produced by the original
+calculator, and exits non-zero on any difference. --write-golden
+recomputes the file's expected values from original_breakup, a frozen
+copy of that calculator's formulas, never from the engine; after adding
+cases, say.
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import salary_engine
+import salary_store
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "salary_golden.json")
+SERVICE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "salary_service.py")
+CALCULATOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "In_Hand_salary_calculator.py")
+# Employees in the input of the short-lived batch job timed by the startup benchmark
+STARTUP_BATCH_ROWS = 100
+DEFAULT_POPULATIONS = (10000, 1000000, 10000000)
+# Larger populations are evaluated as repeated shards of this size to bound memory
+POPULATION_SHARD_SIZE = 1000000
+# Single-employee calls are timed on at most this many employees
+SINGLE_SAMPLE_SIZE = 10000
+# Batches posted to the HTTP service are capped at this many employees
+SERVICE_BATCH_LIMIT = 1000000
+# Employees held as Python objects when measuring memory per employee
+STORE_SAMPLE_SIZE = 100000
+
+
+def synthetic_employees(rows, seed=0):
+    """Random but plausible monthly salary components, whole rupees like real payroll inputs"""
+    rng = np.random.default_rng(seed)
+    basic = rng.integers(10000, 400000, rows).astype(np.float64)
+    return {
+        "basic": basic,
+        "hra": np.floor(basic * rng.uniform(0.3, 0.5, rows)),
+        "special_allowance": rng.integers(0, 150000, rows).astype(np.float64),
+        "bonus": rng.integers(0, 500000, rows).astype(np.float64),
+        "pf_employer": np.minimum(np.floor(basic * 0.12), 15000),
+        "gratuity": np.floor(basic * 0.0481),
+        "medical": rng.choice([0.0, 1250.0], rows),
+        "other_allowances": rng.integers(0, 20000, rows).astype(np.float64),
+    }
+
+
+def _best_of(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _population_rate(function, shard, rows, repeat):
+    """Rows/sec of function over a population of rows, evaluated shard by shard"""
+    shard_rows = len(shard["basic"])
+    full_shards, remainder = divmod(rows, shard_rows)
+    tail = {name: values[:remainder] for name, values in shard.items()}
+
+    def run():
+        for _ in range(full_shards):
+            function(shard)
+        if remainder:
+            function(tail)
+
+    elapsed, _ = _best_of(run, repeat)
+    return rows / elapsed
+
+
+def _populations(args):
+    for rows in args.rows:
+        yield rows, synthetic_employees(min(rows, POPULATION_SHARD_SIZE))
+
+
+def _print_rates(title, rates):
+    print(f"{title:<24}" + "".join(f"{rate:>16,.0f}" for rate in rates))
+
+
+def _print_header(args):
+    print(f"{'rows/sec':<24}" + "".join(f"{rows:>16,}" for rows in args.rows))
+
+
+def bench_single(args):
+    """Single-employee calculate_salary, uncached and with a warm SalaryCache"""
+    tables = salary_engine.load_tax_tables()
+    samples = synthetic_employees(min(max(args.rows), SINGLE_SAMPLE_SIZE))
+    employees = [dict(zip(samples, values)) for values in zip(*(samples[name].tolist() for name in samples))]
+    # Per-call cost does not depend on the population, so only a sample is timed
+    print(f"{'rows/sec':<24}{'uncached':>16}{'cached':>16}   ({len(employees):,} employees)")
+    for regime in salary_engine.REGIMES:
+        cache = salary_engine.SalaryCache(maxsize=len(employees), tables=tables)
+        uncached, _ = _best_of(
+            lambda: [salary_engine.calculate_salary(**employee, regime=regime, tables=tables)
+                     for employee in employees], args.repeat)
+        for employee in employees:
+            cache.calculate_salary(**employee, regime=regime)
+        cached, _ = _best_of(
+            lambda: [cache.calculate_salary(**employee, regime=regime) for employee in employees],
+            args.repeat)
+        _print_rates(regime, [len(employees) / uncached, len(employees) / cached])
+
+
+def bench_batch(args):
+    """Vectorized calculate_salary_batch pipeline, regime tax and HRA exemption"""
+    tables = salary_engine.load_tax_tables()
+    rates = {}
+    for rows, shard in _populations(args):
+        taxable = shard["basic"] * 12 + shard["bonus"]
+        basic_annual = shard["basic"] * 12
+        hra_annual = shard["hra"] * 12
+        rent_paid = hra_annual * 0.9
+        measurements = {
+            "hra_exemption": lambda columns: salary_engine.calculate_hra_exemption(
+                basic_annual[:len(columns["basic"])], hra_annual[:len(columns["basic"])],
+                rent_paid[:len(columns["basic"])]),
+        }
+        for regime in salary_engine.REGIMES:
+            measurements[f"{regime} tax"] = (
+                lambda columns, regime=regime: tables[regime].income_tax(taxable[:len(columns["basic"])]))
+            measurements[f"{regime} breakup"] = (
+                lambda columns, regime=regime: salary_engine.calculate_salary_batch(columns, regime, tables))
+        measurements["compare_regimes"] = lambda columns: salary_engine.compare_regimes(columns, tables=tables)
+        for name, function in measurements.items():
+            rates.setdefault(name, []).append(_population_rate(function, shard, rows, args.repeat))
+    _print_header(args)
+    for name, values in rates.items():
+        _print_rates(name, values)
+
+
+def bench_arithmetic(args):
+    """Floating point versus exact integer-paise breakups"""
+    tables = salary_engine.load_tax_tables()
+    print(f"{'rows':>12} {'regime':<16}{'float rows/s':>16}{'paise rows/s':>16}{'slowdown':>10}"
+          f"{'max diff':>12}")
+    for rows, shard in _populations(args):
+        for regime in salary_engine.REGIMES:
+            float_rate = _population_rate(
+                lambda columns: salary_engine.calculate_salary_batch(columns, regime, tables),
+                shard, rows, args.repeat)
+            paise_rate = _population_rate(
+                lambda columns: salary_engine.calculate_salary_batch_paise(columns, regime, tables),
+                shard, rows, args.repeat)
+            float_results = salary_engine.calculate_salary_batch(shard, regime, tables)
+            paise_results = salary_engine.calculate_salary_batch_paise(shard, regime, tables)
+            difference = np.abs(float_results["in_hand_annual"] - paise_results["in_hand_annual"] / 100)
+            print(f"{rows:>12,} {regime:<16}{float_rate:>16,.0f}{paise_rate:>16,.0f}"
+                  f"{float_rate / paise_rate:>9.2f}x{difference.max():>12.2f}")
+
+
+def bench_sweep(args):
+    """What-if sweep over Basic x bonus x regimes versus the same points through calculate_salary_batch"""
+    tables = salary_engine.load_tax_tables()
+    # Basic from 20k to 5L in 100-rupee steps, with enough bonus levels for each population
+    basic = np.arange(20000, 500001, 100, dtype=np.float64)
+    print(f"{'points':>12}{'sweep pts/s':>16}{'batch pts/s':>16}{'speedup':>10}")
+    for rows in args.rows:
+        levels = max(1, rows // (len(basic) * len(salary_engine.REGIMES)))
+        grid = {"bonus": np.linspace(0, 2000000, levels), "basic": basic, "special_allowance": 10000.0}
+        points = levels * len(basic) * len(salary_engine.REGIMES)
+        sweep_grid = salary_engine.SweepGrid(grid)
+
+        def run_sweep():
+            for block in sweep_grid.blocks(chunk_size=POPULATION_SHARD_SIZE):
+                sweep_grid.evaluate_rows(block[1], block[2], (block[0],), tables)
+
+        columns = {"bonus": np.repeat(grid["bonus"], len(basic)), "basic": np.tile(basic, levels),
+                   "special_allowance": np.full(levels * len(basic), 10000.0)}
+        sweep_time, _ = _best_of(run_sweep, args.repeat)
+        batch_time, _ = _best_of(lambda: [salary_engine.calculate_salary_batch(columns, regime, tables)
+                                          for regime in salary_engine.REGIMES], args.repeat)
+        print(f"{points:>12,}{points / sweep_time:>16,.0f}{points / batch_time:>16,.0f}"
+              f"{batch_time / sweep_time:>9.2f}x")
+
+
+def _traced_bytes(build):
+    """Bytes allocated by build() and still held by its result"""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_store(args):
+    """Memory per employee as dicts, EmployeeRecords and an EmployeeTable; saving and reopening tables"""
+    samples = synthetic_employees(STORE_SAMPLE_SIZE)
+
+    # Each layout builds its own float objects and arrays, so they are counted
+    def rows():
+        return enumerate(zip(*(samples[name].tolist() for name in samples)))
+
+    layouts = {
+        "dict": lambda: [dict(zip(samples, row), employee_id=index) for index, row in rows()],
+        "EmployeeRecord": lambda: [salary_store.EmployeeRecord(*row, employee_id=index)
+                                   for index, row in rows()],
+        "EmployeeTable": lambda: salary_store.EmployeeTable(
+            {salary_store.ID_COLUMN: np.arange(STORE_SAMPLE_SIZE),
+             **{name: values.copy() for name, values in samples.items()}}),
+    }
+    print(f"{'bytes/employee':<24}{'':>16}   ({STORE_SAMPLE_SIZE:,} employees with an employee_id)")
+    for name, build in layouts.items():
+        print(f"{name:<24}{_traced_bytes(build) / STORE_SAMPLE_SIZE:>16,.0f}")
+
+    tables = salary_engine.load_tax_tables()
+    print(f"\n{'rows':>12}{'file MB':>10}{'save s':>9}{'open ms':>9}{'first row ms':>14}{'new rows/s':>14}")
+    with tempfile.TemporaryDirectory() as temp:
+        path = os.path.join(temp, "employees" + salary_store.TABLE_EXTENSION)
+        for rows, shard in _populations(args):
+            shard_rows = len(shard["basic"])
+            dtypes = dict.fromkeys(shard, np.float64)
+
+            def save():
+                with salary_store.EmployeeTableWriter(path, dtypes, rows=rows) as writer:
+                    for start in range(0, rows, shard_rows):
+                        writer.append({name: values[:rows - start] for name, values in shard.items()})
+
+            save_time, _ = _best_of(save, 1)
+            open_time, table = _best_of(lambda: salary_store.EmployeeTable.open(path), args.repeat)
+            first_time, _ = _best_of(lambda: salary_store.EmployeeTable.open(path)[0].calculate(tables=tables), 1)
+            calculate_time, _ = _best_of(
+                lambda: [salary_engine.calculate_salary_batch(chunk, "new", tables)
+                         for chunk in table.iter_chunks(POPULATION_SHARD_SIZE)], args.repeat)
+            print(f"{rows:>12,}{os.path.getsize(path) / 1e6:>10,.0f}{save_time:>9.2f}{open_time * 1000:>9.2f}"
+                  f"{first_time * 1000:>14.2f}{rows / calculate_time:>14,.0f}")
+            del table
+
+
+def load_golden(path=GOLDEN_PATH):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+# The original calculator's tax slabs, frozen: (upper limit, rate) pairs
+# per regime, the last slab unbounded. The golden values come from these,
+# never from the engine under test.
+ORIGINAL_SLABS = {
+    "old": [(250000, 0), (500000, 0.05), (1000000, 0.20), (math.inf, 0.30)],
+    "new": [(300000, 0), (600000, 0.05), (900000, 0.10), (1200000, 0.15), (1500000, 0.20),
+            (math.inf, 0.30)],
+    "new_post_2025": [(400000, 0), (800000, 0.05), (1200000, 0.10), (1600000, 0.15),
+                      (2000000, 0.20), (math.inf, 0.25)],
+}
+
+
+def _original_slab_tax(taxable_income, regime):
+    """The original calculator's slab tax, including its rounded-off base amounts"""
+    base = 0
+    lower = 0
+    for upper, rate in ORIGINAL_SLABS[regime]:
+        if taxable_income <= upper:
+            return base + (taxable_income - lower) * rate if rate else 0
+        base += round((upper - lower) * rate)
+        lower = upper
+
+
+def original_breakup(inputs, regime):
+    """
+    The breakup of the original GUI calculator, frozen as a reference: the
+    same formulas in the same floating-point order, independent of
+    salary_engine, so a regression in the engine cannot re-baseline the
+    golden values.
+    """
+    monthly_bonus = inputs["bonus"] / 12
+    monthly_gross = (inputs["basic"] + inputs["hra"] + inputs["special_allowance"] + monthly_bonus
+                     + inputs["medical"] + inputs["other_allowances"])
+    annual_gross = monthly_gross * 12
+    annual_basic = inputs["basic"] * 12
+    annual_hra = inputs["hra"] * 12
+    taxable_income = annual_gross - 50000
+
+    breakup = {}
+    if regime == "old":
+        rent_paid = min(inputs["hra"] * 12, 0.5 * (annual_gross - annual_basic))
+        breakup["hra_exemption"] = min(annual_hra, rent_paid - (0.1 * annual_basic), 0.5 * annual_basic)
+        taxable_income -= breakup["hra_exemption"]
+        taxable_income -= min(inputs["pf_employer"] * 12 + 150000, 150000)
+        taxable_income -= min(inputs["medical"] * 12, 25000)
+    annual_income_tax = _original_slab_tax(taxable_income, regime) * 1.04
+    monthly_in_hand = monthly_gross - (200 + annual_income_tax / 12)
+
+    monthly = {"basic": inputs["basic"], "hra": inputs["hra"],
+               "special_allowance": inputs["special_allowance"], "bonus": monthly_bonus,
+               "medical": inputs["medical"], "other_allowances": inputs["other_allowances"],
+               "pf_employer": inputs["pf_employer"], "gratuity": inputs["gratuity"],
+               "professional_tax": 200, "income_tax": annual_income_tax / 12,
+               "in_hand": monthly_in_hand}
+    annual = {"bonus": inputs["bonus"], "professional_tax": 2400, "income_tax": annual_income_tax}
+    expected = {}
+    for _, key in salary_engine.BREAKDOWN:
+        expected[key + "_monthly"] = float(monthly[key])
+        expected[key + "_annual"] = float(annual[key] if key in annual else monthly[key] * 12)
+    expected.update((key, float(value)) for key, value in breakup.items())
+    return expected
+
+
+def write_golden(golden, path=GOLDEN_PATH):
+    """Recomputes the expected values of every golden case with original_breakup"""
+    for case in golden["cases"]:
+        case["expected"] = {regime: original_breakup(case["inputs"], regime)
+                            for regime in salary_engine.REGIMES}
+
+    # One case per line keeps the file reviewable in diffs
+    header = {key: value for key, value in golden.items() if key != "cases"}
+    lines = [json.dumps(header)[:-1] + ', "cases": [']
+    lines.append(",\n".join(json.dumps(case) for case in golden["cases"]))
+    lines.append("]}")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def _golden_mismatches(name, expected, actual):
+    """Yields a description of every value that is not bit-for-bit identical"""
+    for key, value in expected.items():
+        got = float(actual[key])
+        if got != value or math.copysign(1, got) != math.copysign(1, value):
+            yield f"{name}: {key} expected {value!r}, got {got!r}"
+
+
+def check_golden(golden):
+    """Returns the mismatches between the golden breakups and every engine entry point"""
+    cases = golden["cases"]
+    columns = {name: np.array([case["inputs"][name] for case in cases], dtype=np.float64)
+               for name in salary_engine.INPUT_COLUMNS}
+    tables = salary_engine.load_tax_tables(golden["financial_year"])
+    cache = salary_engine.SalaryCache(tables=tables)
+    model = salary_engine.IncrementalSalary(tables=tables)
+    comparison = salary_engine.compare_regimes(columns, tables=tables)
+    mismatches = []
+    for regime in salary_engine.REGIMES:
+        batch = salary_engine.calculate_salary_batch(columns, regime, tables)
+        parallel = salary_engine.calculate_salary_parallel(columns, regime, workers=2, shard_size=16)
+        for index, case in enumerate(cases):
+            expected = case["expected"][regime]
+            label = f"case {index} {regime}"
+            row = {key: values[index] for key, values in batch.items()}
+            parallel_row = {key: values[index] for key, values in parallel.items()}
+            model.set(**case["inputs"], regime=regime)
+            mismatches.extend(_golden_mismatches(f"{label} calculate_salary", expected,
+                              salary_engine.calculate_salary(**case["inputs"], regime=regime,
+                                                             tables=tables)))
+            mismatches.extend(_golden_mismatches(f"{label} calculate_salary_batch", expected, row))
+            mismatches.extend(_golden_mismatches(f"{label} calculate_salary_parallel", expected,
+                                                 parallel_row))
+            mismatches.extend(_golden_mismatches(f"{label} SalaryCache", expected,
+                              cache.calculate_salary(**case["inputs"], regime=regime)))
+            mismatches.extend(_golden_mismatches(f"{label} IncrementalSalary", expected,
+                                                 model.breakdown()))
+            mismatches.extend(_golden_mismatches(
+                f"{label} compare_regimes",
+                {key: expected[key] for key in ("income_tax_annual", "in_hand_monthly")},
+                {"income_tax_annual": comparison[f"{regime}_income_tax_annual"][index],
+                 "in_hand_monthly": comparison[f"{regime}_in_hand_monthly"][index]}))
+    return mismatches
+
+
+def bench_golden(args):
+    """Golden-value regression check against the original calculator's outputs"""
+    golden = load_golden(args.golden)
+    if args.write_golden:
+        write_golden(golden, args.golden)
+        print(f"Rewrote {len(golden['cases'])} golden cases in {args.golden}")
+        return 0
+    mismatches = check_golden(golden)
+    for mismatch in mismatches[:20]:
+        print(mismatch)
+    if len(mismatches) > 20:
+        print(f"... and {len(mismatches) - 20} more")
+    print(f"{len(golden['cases'])} cases x {len(salary_engine.REGIMES)} regimes: "
+          f"{'OK' if not mismatches else f'{len(mismatches)} mismatches'}")
+    return 1 if mismatches else 0
+
+
+def _start_service():
+    """Starts salary_service.py on a free localhost port, returning (process, host, port)"""
+    process = subprocess.Popen([sys.executable, SERVICE_PATH, "--port", "0"],
+                               stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline().strip()
+    if not line.startswith("Listening on http://"):
+        process.kill()
+        raise RuntimeError(f"Salary service failed to start: {line}")
+    host, port = line.rsplit("/", 1)[1].rsplit(":", 1)
+    return process, host, int(port)
+
+
+async def _load_single(host, port, path, bodies, concurrency):
+    """
+    Posts every body over concurrency keep-alive connections.
+
+    Returns:
+        tuple: (elapsed seconds, list of per-request latencies in seconds)
+    """
+    pending = iter(bodies)
+    latencies = []
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for body in pending:
+                request = (b"POST %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                           b"Content-Length: %d\r\n\r\n%s"
+                           % (path.encode(), host.encode(), len(body), body))
+                start = time.perf_counter()
+                writer.write(request)
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head.startswith(b"HTTP/1.1 200"):
+                    raise RuntimeError(f"Service error: {head.splitlines()[0].decode()}")
+                length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies
+
+
+def _ndjson_employees(columns):
+    names = list(columns)
+    for index, values in enumerate(zip(*(columns[name].tolist() for name in names))):
+        yield (json.dumps(dict(zip(names, values), id=index)) + "\n").encode()
+
+
+def _blocks(lines, size=64 * 1024):
+    """Groups lines into blocks of about size bytes, as a real upload would be sent"""
+    block, length = [], 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield b"".join(block)
+            block, length = [], 0
+    if block:
+        yield b"".join(block)
+
+
+def bench_service(args):
+    """HTTP service throughput and latency under a localhost load generator"""
+    process, host, port = _start_service()
+    try:
+        samples = synthetic_employees(args.requests)
+        bodies = list(_ndjson_employees(samples))
+        scenarios = [
+            ("single, distinct", "/salary", bodies),
+            ("single, repeated", "/salary", [bodies[index % 100] for index in range(len(bodies))]),
+            ("single, compare", "/salary?compare=true", bodies),
+        ]
+        print(f"{'scenario':<24}{'requests/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"   ({args.requests:,} requests, {args.concurrency} connections)")
+        for name, path, scenario_bodies in scenarios:
+            elapsed, latencies = asyncio.run(_load_single(host, port, path, scenario_bodies,
+                                                          args.concurrency))
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+            print(f"{name:<24}{len(latencies) / elapsed:>12,.0f}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}")
+
+        print(f"{'batch rows':<24}{'rows/s':>12}")
+        tables = salary_engine.load_tax_tables()
+        for rows in args.rows:
+            rows = min(rows, SERVICE_BATCH_LIMIT)
+            columns = synthetic_employees(rows)
+            connection = http.client.HTTPConnection(host, port)
+            start = time.perf_counter()
+            connection.request("POST", "/salary/batch", body=_blocks(_ndjson_employees(columns)),
+                               headers={"Content-Type": "application/x-ndjson"}, encode_chunked=True)
+            lines = connection.getresponse().read().splitlines()
+            elapsed = time.perf_counter() - start
+            connection.close()
+
+            expected = salary_engine.calculate_salary_batch(columns, "new", tables)["in_hand_monthly"]
+            sample = range(0, rows, max(1, rows // 100))
+            if len(lines) != rows or any(json.loads(lines[index])["in_hand_monthly"] != round(expected[index], 2)
+                                         for index in sample):
+                raise RuntimeError("Batch results do not match the engine")
+            print(f"{rows:<24,}{rows / elapsed:>12,.0f}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _import_times(stderr):
+    """
+    Parses -X importtime output.
+
+    Returns:
+        tuple: (total microseconds spent importing, set of imported module names)
+    """
+    total, modules = 0, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        # Top-level imports are not indented; their cumulative times add up to the total
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total, modules
+
+
+def bench_startup(args):
+    """Process startup and import time (-X importtime) of short-lived salary jobs"""
+    directory = os.path.dirname(CALCULATOR_PATH)
+    with tempfile.TemporaryDirectory() as temp:
+        input_path = os.path.join(temp, "employees.csv")
+        columns = synthetic_employees(STARTUP_BATCH_ROWS)
+        with open(input_path, "w", encoding="utf-8") as file:
+            file.write(",".join(columns) + "\n")
+            for row in zip(*(columns[name].tolist() for name in columns)):
+                file.write(",".join(map(str, row)) + "\n")
+        commands = [
+            ("interpreter only", ["-c", "pass"]),
+            ("import salary_engine", ["-c", "import salary_engine"]),
+            ("import calculator", ["-c", "import In_Hand_salary_calculator"]),
+            (f"batch job, {STARTUP_BATCH_ROWS} rows",
+             [CALCULATOR_PATH, "batch", input_path, os.path.join(temp, "breakup.csv")]),
+            ("calculator + GUI stack",
+             ["-c", "import In_Hand_salary_calculator as calculator; calculator.load_tk()"]),
+        ]
+        print(f"{'command':<28}{'wall ms':>10}{'import ms':>11}{'tkinter':>9}")
+        for name, command in commands:
+            best_wall, best_import = float("inf"), float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                completed = subprocess.run([sys.executable, "-X", "importtime"] + command, cwd=directory,
+                                           capture_output=True, text=True)
+                wall = time.perf_counter() - start
+                if completed.returncode:
+                    raise RuntimeError(f"{name} failed: {completed.stderr.strip().splitlines()[-1]}")
+                import_time, modules = _import_times(completed.stderr)
+                best_wall, best_import = min(best_wall, wall), min(best_import, import_time)
+            print(f"{name:<28}{best_wall * 1000:>10.1f}{best_import / 1000:>11.1f}"
+                  f"{'yes' if 'tkinter' in modules else 'no':>9}")
+
+
+BENCHMARKS = {
+    "golden": bench_golden,
+    "single": bench_single,
+    "batch": bench_batch,
+    "arithmetic": bench_arithmetic,
+    "sweep": bench_sweep,
+    "store": bench_store,
+    "service": bench_service,
+    "startup": bench_startup,
+}
+
+
+def _population_sizes(text):
+    try:
+        sizes = tuple(int(size) for size in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated row counts, got {text!r}")
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError("row counts must be positive")
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Salary engine benchmarks")
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--rows", type=_population_sizes, default=DEFAULT_POPULATIONS,
+                        help="Comma-separated synthetic population sizes "
+                             f"(default: {','.join(map(str, DEFAULT_POPULATIONS))})")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per measurement, best is kept")
+    parser.add_argument("--requests", type=int, default=20000,
+                        help="Requests per scenario in the service benchmark (default: 20000)")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="Load generator connections in the service benchmark (default: 32)")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="Golden values file")
+    parser.add_argument("--write-golden", action="store_true",
+                        help="Recompute the golden values from the original calculator's formulas "
+                             "instead of checking them")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    status = 0
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"== {name}: {BENCHMARKS[name].__doc__}")
+        status = BENCHMARKS[name](args) or status
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1184 @@
+"""
+Tk-free payroll engine for the Indian salary calculator.
+
+Every calculation works on NumPy arrays, so the same code path handles a
+single employee (the GUI) and a whole payroll extract (batch jobs). Inputs
+are monthly amounts except the bonus, which is annual, exactly as entered in
+the calculator window.
+"""
+import bisect
+import collections
+import functools
+import json
+import math
+import os
+
+import numpy as np
+
+import parallel
+
+# Tax regimes supported by the calculator, in display order
+REGIMES = ("old", "new", "new_post_2025")
+
+REGIME_NAMES = {
+    "old": "Old Tax Regime",
+    "new": "New Tax Regime (Current)",
+    "new_post_2025": "New Tax Regime (Post 2025-26 Budget)"
+}
+
+# Input columns accepted by calculate_salary_batch (monthly, bonus is annual)
+INPUT_COLUMNS = (
+    "basic",
+    "hra",
+    "special_allowance",
+    "bonus",
+    "pf_employer",
+    "gratuity",
+    "medical",
+    "other_allowances"
+)
+
+# Rows of the salary breakup, as shown in the calculator's Treeview.
+# Each key has a "<key>_monthly" and "<key>_annual" column in the results.
+BREAKDOWN = (
+    ("Basic Salary", "basic"),
+    ("HRA", "hra"),
+    ("Special Allowance", "special_allowance"),
+    ("Bonus/Ex Gratia", "bonus"),
+    ("Medical Insurance", "medical"),
+    ("Other Allowances", "other_allowances"),
+    ("Employer PF Contribution", "pf_employer"),
+    ("Gratuity", "gratuity"),
+    ("Professional Tax", "professional_tax"),
+    ("Income Tax", "income_tax"),
+    ("In-Hand Salary", "in_hand")
+)
+
+# Professional Tax (₹200 per month in most states)
+MONTHLY_PROFESSIONAL_TAX = 200
+ANNUAL_PROFESSIONAL_TAX = 2400
+
+# Slab schedules ship as one JSON file per financial year in this directory
+TAX_SLABS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tax_slabs")
+DEFAULT_FINANCIAL_YEAR = "2025-26"
+
+# Default salary structure used when splitting a CTC (see show_formulas):
+# Basic is 40% of CTC, HRA is 50% of Basic and the employer PF is
+# min(12% of Basic, ₹15,000) a month
+DEFAULT_BASIC_RATIO = 0.40
+DEFAULT_HRA_RATIO = 0.50
+PF_EMPLOYER_RATE = 0.12
+PF_EMPLOYER_CAP = 15000
+
+# Entries kept by each SalaryCache memo table
+DEFAULT_CACHE_SIZE = 4096
+
+# Rows per shard when a batch is split across worker processes
+DEFAULT_SHARD_SIZE = 100000
+
+# Columns returned by calculate_salary_batch
+RESULT_COLUMNS = tuple([key + suffix for _, key in BREAKDOWN for suffix in ("_monthly", "_annual")]
+                       + ["gross_monthly", "gross_annual", "taxable_income", "hra_exemption"])
+
+# Columns reported by a what-if sweep unless others are asked for
+SWEEP_OUTPUTS = ("gross_annual", "taxable_income", "income_tax_annual", "in_hand_monthly",
+                 "in_hand_annual")
+
+# Shorter runs of sorted incomes are cheaper to evaluate income by income
+MIN_SEGMENT_RUN = 64
+
+
+def _round_div(numerator, denominator):
+    """Integer division rounding halves away from zero, for ints or int64 arrays"""
+    if isinstance(numerator, int):
+        quotient = (abs(numerator) + denominator // 2) // denominator
+        return quotient if numerator >= 0 else -quotient
+    quotient = (np.abs(numerator) + denominator // 2) // denominator
+    return np.where(numerator >= 0, quotient, -quotient)
+
+
+def to_paise(rupees):
+    """Converts rupee amounts to int64 paise, rounding to the nearest paisa"""
+    return np.rint(np.asarray(rupees, dtype=np.float64) * 100).astype(np.int64)
+
+
+def format_paise(paise):
+    """Formats int64 paise as exact rupee strings ("1234.50")"""
+    return [f"-{-value // 100}.{-value % 100:02d}" if value < 0 else f"{value // 100}.{value % 100:02d}"
+            for value in np.asarray(paise).tolist()]
+
+
+class SlabSchedule:
+    """
+    A regime's slab schedule compiled into lookup arrays.
+
+    The tax due at the start of every slab is precomputed, so evaluating a
+    taxable income is a binary search for its slab plus one multiply-add.
+    Schedules are plain arrays and can be pickled to worker processes.
+    """
+    def __init__(self, regime, definition):
+        self.regime = regime
+        slabs = sorted(definition["slabs"], key=lambda slab: slab["from"])
+        if not slabs or slabs[0]["from"] != 0:
+            raise ValueError(f"Slabs for regime {regime!r} must start at 0")
+
+        self.lowers = np.array([slab["from"] for slab in slabs], dtype=np.float64)
+        self.rates = np.array([slab["rate"] for slab in slabs], dtype=np.float64)
+
+        # Tax payable on income up to the start of each slab, rounded to
+        # paise so the table matches the statutory constants exactly
+        cumulative = [0.0]
+        for i in range(1, len(slabs)):
+            cumulative.append(round(
+                cumulative[-1] + (self.lowers[i] - self.lowers[i - 1]) * self.rates[i - 1], 2))
+        self.cumulative = np.array(cumulative, dtype=np.float64)
+
+        # Integer tables for exact arithmetic: amounts in paise, rates in
+        # basis points. Slab starts are whole rupees, so these are exact.
+        self.lowers_paise = np.array([round(slab["from"] * 100) for slab in slabs], dtype=np.int64)
+        self.rates_bp = np.array([round(slab["rate"] * 10000) for slab in slabs], dtype=np.int64)
+        cumulative_paise = [0]
+        for i in range(1, len(slabs)):
+            cumulative_paise.append(cumulative_paise[-1] + _round_div(
+                int(self.lowers_paise[i] - self.lowers_paise[i - 1]) * int(self.rates_bp[i - 1]), 10000))
+        self.cumulative_paise = np.array(cumulative_paise, dtype=np.int64)
+
+        # Plain lists for evaluating one income at a time without NumPy overhead
+        self._lowers = self.lowers.tolist()
+        self._rates = self.rates.tolist()
+        self._cumulative = self.cumulative.tolist()
+
+        self.standard_deduction = definition["standard_deduction"]
+        self.cess = definition["cess"]
+        self.rebate_income_limit = definition.get("rebate", {}).get("income_limit", 0)
+        self.max_rebate = definition.get("rebate", {}).get("max_rebate", 0)
+        self.section_80c_limit = definition.get("section_80c_limit", 0)
+        self.section_80d_limit = definition.get("section_80d_limit", 0)
+        self.cess_bp = round(self.cess * 10000)
+
+    def slab_tax(self, taxable_income):
+        """Calculates income tax from the slabs, before rebate and cess"""
+        taxable_income = np.asarray(taxable_income, dtype=np.float64)
+        # A slab's upper bound belongs to that slab, hence side="left"
+        index = np.maximum(np.searchsorted(self.lowers, taxable_income, side="left") - 1, 0)
+        return self.cumulative[index] + np.maximum(taxable_income - self.lowers[index], 0) * self.rates[index]
+
+    def slab_tax_sorted(self, taxable_income):
+        """
+        slab_tax for incomes that are non-decreasing along the last axis.
+
+        The incomes in each slab then form one contiguous segment, so the tax
+        is evaluated a segment at a time with the slab's coefficients as
+        scalars instead of looking up the slab of every income. Results are
+        identical to slab_tax, which is used for input that is not sorted.
+        """
+        taxable_income = np.asarray(taxable_income, dtype=np.float64)
+        if (taxable_income.ndim == 0 or taxable_income.shape[-1] < MIN_SEGMENT_RUN
+                or not (np.diff(taxable_income, axis=-1) >= 0).all()):
+            return self.slab_tax(taxable_income)
+
+        tax = np.empty(taxable_income.shape)
+        length = taxable_income.shape[-1]
+        for incomes, taxes in zip(taxable_income.reshape(-1, length), tax.reshape(-1, length)):
+            # Incomes up to a slab's start belong to the slab below it
+            bounds = [0] + np.searchsorted(incomes, self.lowers[1:], side="right").tolist() + [length]
+            for slab, (start, stop) in enumerate(zip(bounds, bounds[1:])):
+                if start < stop:
+                    segment = taxes[start:stop]
+                    np.subtract(incomes[start:stop], self.lowers[slab], out=segment)
+                    np.maximum(segment, 0, out=segment)
+                    segment *= self.rates[slab]
+                    segment += self.cumulative[slab]
+        return tax
+
+    def income_tax(self, taxable_income, sorted_incomes=False):
+        """
+        Calculates income tax including the rebate and cess.
+
+        With sorted_incomes, slab tax is evaluated by slab_tax_sorted.
+        """
+        taxable_income = np.asarray(taxable_income, dtype=np.float64)
+        tax = self.slab_tax_sorted(taxable_income) if sorted_incomes else self.slab_tax(taxable_income)
+        if self.max_rebate:
+            tax = tax - np.where(taxable_income <= self.rebate_income_limit,
+                                 np.minimum(tax, self.max_rebate), 0.0)
+        return tax * (1 + self.cess)
+
+    def slab_tax_paise(self, taxable_income):
+        """slab_tax in exact integer paise, rounding the marginal slab to the nearest paisa"""
+        taxable_income = np.asarray(taxable_income, dtype=np.int64)
+        index = np.maximum(np.searchsorted(self.lowers_paise, taxable_income, side="left") - 1, 0)
+        marginal = np.maximum(taxable_income - self.lowers_paise[index], 0) * self.rates_bp[index]
+        return self.cumulative_paise[index] + _round_div(marginal, 10000)
+
+    def income_tax_paise(self, taxable_income):
+        """
+        income_tax in exact integer paise.
+
+        Cess is rounded to the nearest paisa and the tax payable to the nearest
+        ten rupees (section 288B).
+        """
+        taxable_income = np.asarray(taxable_income, dtype=np.int64)
+        tax = self.slab_tax_paise(taxable_income)
+        if self.max_rebate:
+            tax = tax - np.where(taxable_income <= self.rebate_income_limit * 100,
+                                 np.minimum(tax, self.max_rebate * 100), 0)
+        tax = tax + _round_div(tax * self.cess_bp, 10000)
+        return _round_div(tax, 1000) * 1000
+
+    def slab_tax_scalar(self, taxable_income):
+        """slab_tax for a single float, using bisect instead of NumPy"""
+        index = max(bisect.bisect_left(self._lowers, taxable_income) - 1, 0)
+        return self._cumulative[index] + max(taxable_income - self._lowers[index], 0) * self._rates[index]
+
+    def income_tax_scalar(self, taxable_income, slab_tax=None):
+        """income_tax for a single float, using bisect instead of NumPy"""
+        tax = self.slab_tax_scalar(taxable_income) if slab_tax is None else slab_tax
+        if self.max_rebate and taxable_income <= self.rebate_income_limit:
+            tax = tax - min(tax, self.max_rebate)
+        return tax * (1 + self.cess)
+
+
+@functools.lru_cache(maxsize=None)
+def load_tax_tables(financial_year=DEFAULT_FINANCIAL_YEAR, slabs_dir=TAX_SLABS_DIR):
+    """
+    Loads and compiles the slab schedules for a financial year.
+
+    Tables are compiled once per process and cached; treat them as read-only.
+
+    Returns:
+        dict[str, SlabSchedule]: Compiled schedules keyed by regime.
+    """
+    path = os.path.join(slabs_dir, f"{financial_year}.json")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    tables = {regime: SlabSchedule(regime, definition)
+              for regime, definition in data["regimes"].items()}
+    missing = [regime for regime in REGIMES if regime not in tables]
+    if missing:
+        raise ValueError(f"{path} is missing regimes: {', '.join(missing)}")
+    return tables
+
+
+def calculate_hra_exemption(basic, hra, rent_paid):
+    """Calculate HRA exemption as per old regime rules"""
+    # Least of:
+    # 1. Actual HRA received
+    # 2. Rent paid - 10% of basic salary
+    # 3. 50% of basic (metro) or 40% (non-metro)
+    exemption1 = hra
+    exemption2 = rent_paid - (0.1 * basic)
+    exemption3 = 0.5 * basic  # Assuming metro city
+
+    return np.minimum(np.minimum(exemption1, exemption2), exemption3)
+
+
+def calculate_old_regime_tax(taxable_income):
+    """Calculate tax as per old regime slabs"""
+    return load_tax_tables()["old"].slab_tax(taxable_income)
+
+
+def calculate_new_regime_tax(taxable_income):
+    """Calculate tax as per current new regime slabs"""
+    return load_tax_tables()["new"].slab_tax(taxable_income)
+
+
+def calculate_new_post_2025_regime_tax(taxable_income):
+    """Calculate tax as per new regime post 2025-26 budget"""
+    return load_tax_tables()["new_post_2025"].slab_tax(taxable_income)
+
+
+def _salary_components(columns):
+    """Converts the input columns to monthly and annual salary components"""
+    inputs = {}
+    shape = None
+    for name in INPUT_COLUMNS:
+        if name in columns:
+            inputs[name] = np.asarray(columns[name], dtype=np.float64)
+            shape = inputs[name].shape
+    if shape is None:
+        raise ValueError("No salary columns given")
+    for name in INPUT_COLUMNS:
+        if name not in inputs:
+            inputs[name] = np.zeros(shape)
+
+    components = {}
+    for name in INPUT_COLUMNS:
+        if name == "bonus":
+            # Convert annual bonus to monthly
+            components["bonus_monthly"] = inputs["bonus"] / 12
+            components["bonus_annual"] = inputs["bonus"]
+        else:
+            components[name + "_monthly"] = inputs[name]
+            components[name + "_annual"] = inputs[name] * 12
+
+    # Calculate gross salary
+    monthly_gross = (components["basic_monthly"] + components["hra_monthly"] +
+                     components["special_allowance_monthly"] + components["bonus_monthly"] +
+                     components["medical_monthly"] + components["other_allowances_monthly"])
+    components["gross_monthly"] = monthly_gross
+    components["gross_annual"] = monthly_gross * 12
+
+    components["professional_tax_monthly"] = np.full(shape, float(MONTHLY_PROFESSIONAL_TAX))
+    components["professional_tax_annual"] = np.full(shape, float(ANNUAL_PROFESSIONAL_TAX))
+    return components
+
+
+def _old_regime_deductions(components, schedule):
+    """Calculates the HRA exemption, 80C and 80D deductions of the old regime"""
+    annual_basic = components["basic_annual"]
+    annual_hra = components["hra_annual"]
+    annual_gross = components["gross_annual"]
+
+    # HRA exemption calculation
+    hra_exemption = calculate_hra_exemption(
+        annual_basic, annual_hra,
+        np.minimum(annual_hra, 0.5 * (annual_gross - annual_basic)))  # For metro cities
+
+    # Section 80C deductions (PF, LIC, etc.)
+    section_80c = np.minimum(components["pf_employer_annual"] + schedule.section_80c_limit,
+                             schedule.section_80c_limit)  # Max ₹1.5L
+
+    # Medical insurance deduction (Section 80D)
+    section_80d = np.minimum(components["medical_annual"], schedule.section_80d_limit)  # For individuals <60 years
+
+    return hra_exemption, section_80c, section_80d
+
+
+def _regime_tax(components, regime, schedule, old_deductions=None, sorted_incomes=False):
+    """
+    Calculates taxable income and annual income tax (with cess) for a regime.
+
+    Returns:
+        tuple: (taxable_income, annual_income_tax, hra_exemption)
+    """
+    taxable_income = components["gross_annual"] - schedule.standard_deduction
+    if regime == "old":
+        if old_deductions is None:
+            old_deductions = _old_regime_deductions(components, schedule)
+        hra_exemption, section_80c, section_80d = old_deductions
+        taxable_income = taxable_income - hra_exemption
+        taxable_income = taxable_income - section_80c
+        taxable_income = taxable_income - section_80d
+    else:
+        hra_exemption = np.zeros(taxable_income.shape)
+
+    # Slab tax, rebate and cess (4% of income tax)
+    return taxable_income, schedule.income_tax(taxable_income, sorted_incomes), hra_exemption
+
+
+def _monthly_in_hand(components, annual_income_tax):
+    # Calculate in-hand salary
+    monthly_deductions = MONTHLY_PROFESSIONAL_TAX + annual_income_tax / 12
+    return components["gross_monthly"] - monthly_deductions
+
+
+def calculate_salary_batch(columns, regime="new", tables=None):
+    """
+    Calculates the salary breakup for a batch of employees.
+
+    Args:
+        columns (Mapping[str, array-like]): Input columns keyed by the names in
+            INPUT_COLUMNS. Missing columns are treated as zero; all columns
+            must have the same length.
+        regime (str): One of REGIMES.
+        tables (dict[str, SlabSchedule], optional): Compiled slab schedules,
+            defaults to load_tax_tables().
+
+    Returns:
+        dict[str, numpy.ndarray]: "<key>_monthly" and "<key>_annual" for every
+        BREAKDOWN row, plus "gross_monthly", "gross_annual", "taxable_income"
+        and "hra_exemption".
+    """
+    if tables is None:
+        tables = load_tax_tables()
+    if regime not in tables:
+        raise ValueError(f"Unknown tax regime: {regime!r}")
+
+    results = _salary_components(columns)
+    taxable_income, annual_income_tax, hra_exemption = _regime_tax(results, regime, tables[regime])
+    monthly_in_hand = _monthly_in_hand(results, annual_income_tax)
+
+    results["income_tax_monthly"] = annual_income_tax / 12
+    results["income_tax_annual"] = annual_income_tax
+    results["in_hand_monthly"] = monthly_in_hand
+    results["in_hand_annual"] = monthly_in_hand * 12
+    results["taxable_income"] = taxable_income
+    results["hra_exemption"] = hra_exemption
+    return results
+
+
+def comparison_columns(regimes=REGIMES):
+    """Names of the columns returned by compare_regimes"""
+    columns = []
+    for regime in regimes:
+        columns += [f"{regime}_income_tax_annual", f"{regime}_in_hand_monthly"]
+    return columns + ["best_regime", "savings_annual"]
+
+
+def compare_regimes(columns, baseline="new", regimes=REGIMES, tables=None):
+    """
+    Calculates income tax under every regime in one pass and picks the cheapest.
+
+    Gross salary and the old regime's HRA exemption and 80C/80D deductions are
+    computed once and shared by all regimes.
+
+    Args:
+        columns (Mapping[str, array-like]): Input columns, as for
+            calculate_salary_batch.
+        baseline (str): Regime the savings are measured against, usually the
+            one the employee has chosen.
+        regimes (sequence[str]): Regimes to compare.
+
+    Returns:
+        dict[str, numpy.ndarray]: "<regime>_income_tax_annual" and
+        "<regime>_in_hand_monthly" for every regime, "best_regime" (the
+        regime with the lowest tax; ties go to the earlier regime) and
+        "savings_annual" (baseline tax minus the lowest tax).
+    """
+    if tables is None:
+        tables = load_tax_tables()
+    unknown = [regime for regime in regimes if regime not in tables]
+    if unknown:
+        raise ValueError(f"Unknown tax regime: {unknown[0]!r}")
+    if baseline not in regimes:
+        raise ValueError(f"Baseline regime {baseline!r} is not being compared")
+
+    components = _salary_components(columns)
+    old_deductions = _old_regime_deductions(components, tables["old"]) if "old" in regimes else None
+
+    results = {}
+    taxes = []
+    for regime in regimes:
+        _, annual_income_tax, _ = _regime_tax(components, regime, tables[regime], old_deductions)
+        results[f"{regime}_income_tax_annual"] = annual_income_tax
+        results[f"{regime}_in_hand_monthly"] = _monthly_in_hand(components, annual_income_tax)
+        taxes.append(annual_income_tax)
+
+    taxes = np.stack(taxes)
+    best = np.argmin(taxes, axis=0)
+    best_tax = np.min(taxes, axis=0)
+    results["best_regime"] = np.asarray(regimes, dtype=object)[best]
+    results["savings_annual"] = results[f"{baseline}_income_tax_annual"] - best_tax
+    return results
+
+
+def _salary_components_paise(columns):
+    """_salary_components in exact integer paise"""
+    inputs = {name: to_paise(columns[name]) for name in INPUT_COLUMNS if name in columns}
+    if not inputs:
+        raise ValueError("No salary columns given")
+    shape = next(iter(inputs.values())).shape
+    for name in INPUT_COLUMNS:
+        if name not in inputs:
+            inputs[name] = np.zeros(shape, dtype=np.int64)
+
+    components = {}
+    for name in INPUT_COLUMNS:
+        if name == "bonus":
+            components["bonus_monthly"] = _round_div(inputs["bonus"], 12)
+            components["bonus_annual"] = inputs["bonus"]
+        else:
+            components[name + "_monthly"] = inputs[name]
+            components[name + "_annual"] = inputs[name] * 12
+
+    components["gross_monthly"] = (components["basic_monthly"] + components["hra_monthly"] +
+                                   components["special_allowance_monthly"] + components["bonus_monthly"] +
+                                   components["medical_monthly"] + components["other_allowances_monthly"])
+    # The whole bonus counts towards annual gross, not twelve rounded instalments
+    components["gross_annual"] = (components["gross_monthly"] - components["bonus_monthly"]) * 12 + inputs["bonus"]
+
+    components["professional_tax_monthly"] = np.full(shape, MONTHLY_PROFESSIONAL_TAX * 100, dtype=np.int64)
+    components["professional_tax_annual"] = np.full(shape, ANNUAL_PROFESSIONAL_TAX * 100, dtype=np.int64)
+    return components
+
+
+def _old_regime_deductions_paise(components, schedule):
+    """_old_regime_deductions in exact integer paise"""
+    annual_basic = components["basic_annual"]
+    annual_hra = components["hra_annual"]
+    rent_paid = np.minimum(annual_hra, _round_div(components["gross_annual"] - annual_basic, 2))
+    hra_exemption = np.minimum(np.minimum(annual_hra, rent_paid - _round_div(annual_basic, 10)),
+                               _round_div(annual_basic, 2))
+    section_80c = np.minimum(components["pf_employer_annual"] + schedule.section_80c_limit * 100,
+                             schedule.section_80c_limit * 100)
+    section_80d = np.minimum(components["medical_annual"], schedule.section_80d_limit * 100)
+    return hra_exemption, section_80c, section_80d
+
+
+def _regime_tax_paise(components, regime, schedule, old_deductions=None):
+    """
+    _regime_tax in exact integer paise. Taxable income is rounded to the
+    nearest ten rupees (section 288A) before the slabs are applied.
+    """
+    taxable_income = components["gross_annual"] - schedule.standard_deduction * 100
+    if regime == "old":
+        if old_deductions is None:
+            old_deductions = _old_regime_deductions_paise(components, schedule)
+        hra_exemption, section_80c, section_80d = old_deductions
+        taxable_income = taxable_income - hra_exemption - section_80c - section_80d
+    else:
+        hra_exemption = np.zeros(taxable_income.shape, dtype=np.int64)
+
+    taxable_income = _round_div(taxable_income, 1000) * 1000
+    return taxable_income, schedule.income_tax_paise(taxable_income), hra_exemption
+
+
+def _monthly_in_hand_paise(components, annual_income_tax):
+    return components["gross_monthly"] - MONTHLY_PROFESSIONAL_TAX * 100 - _round_div(annual_income_tax, 12)
+
+
+def calculate_salary_batch_paise(columns, regime="new", tables=None):
+    """
+    Exact counterpart of calculate_salary_batch, in integer paise.
+
+    Inputs (in rupees) are rounded to the nearest paisa and the whole
+    pipeline then runs on int64 arrays: every division rounds to the nearest
+    paisa (halves away from zero), taxable income and tax payable are rounded
+    to the nearest ten rupees (sections 288A and 288B), and monthly tax is
+    the annual tax divided by 12 and rounded to the nearest paisa. Nothing
+    drifts across rows, so totals reconcile exactly with bank files.
+
+    Returns:
+        dict[str, numpy.ndarray]: The same keys as calculate_salary_batch, as
+        int64 paise.
+    """
+    if tables is None:
+        tables = load_tax_tables()
+    if regime not in tables:
+        raise ValueError(f"Unknown tax regime: {regime!r}")
+
+    results = _salary_components_paise(columns)
+    taxable_income, annual_income_tax, hra_exemption = _regime_tax_paise(results, regime, tables[regime])
+    monthly_in_hand = _monthly_in_hand_paise(results, annual_income_tax)
+
+    results["income_tax_monthly"] = _round_div(annual_income_tax, 12)
+    results["income_tax_annual"] = annual_income_tax
+    results["in_hand_monthly"] = monthly_in_hand
+    results["in_hand_annual"] = monthly_in_hand * 12
+    results["taxable_income"] = taxable_income
+    results["hra_exemption"] = hra_exemption
+    return results
+
+
+def compare_regimes_paise(columns, baseline="new", regimes=REGIMES, tables=None):
+    """
+    Exact counterpart of compare_regimes; amounts are int64 paise.
+    """
+    if tables is None:
+        tables = load_tax_tables()
+    unknown = [regime for regime in regimes if regime not in tables]
+    if unknown:
+        raise ValueError(f"Unknown tax regime: {unknown[0]!r}")
+    if baseline not in regimes:
+        raise ValueError(f"Baseline regime {baseline!r} is not being compared")
+
+    components = _salary_components_paise(columns)
+    old_deductions = _old_regime_deductions_paise(components, tables["old"]) if "old" in regimes else None
+
+    results = {}
+    taxes = []
+    for regime in regimes:
+        _, annual_income_tax, _ = _regime_tax_paise(components, regime, tables[regime], old_deductions)
+        results[f"{regime}_income_tax_annual"] = annual_income_tax
+        results[f"{regime}_in_hand_monthly"] = _monthly_in_hand_paise(components, annual_income_tax)
+        taxes.append(annual_income_tax)
+
+    taxes = np.stack(taxes)
+    results["best_regime"] = np.asarray(regimes, dtype=object)[np.argmin(taxes, axis=0)]
+    results["savings_annual"] = results[f"{baseline}_income_tax_annual"] - np.min(taxes, axis=0)
+    return results
+
+
+def calculate_salary(basic, hra, special_allowance, bonus=0, pf_employer=0,
+                     gratuity=0, medical=0, other_allowances=0, regime="new",
+                     tables=None):
+    """
+    Calculates the salary breakup for a single employee.
+
+    Returns:
+        dict[str, float]: The same keys as calculate_salary_batch.
+    """
+    results = calculate_salary_batch({
+        "basic": basic,
+        "hra": hra,
+        "special_allowance": special_allowance,
+        "bonus": bonus,
+        "pf_employer": pf_employer,
+        "gratuity": gratuity,
+        "medical": medical,
+        "other_allowances": other_allowances
+    }, regime, tables)
+    return {key: float(value) for key, value in results.items()}
+
+
+def compare_regimes_single(basic, hra, special_allowance, bonus=0, pf_employer=0,
+                           gratuity=0, medical=0, other_allowances=0, baseline="new",
+                           tables=None):
+    """
+    Compares the tax regimes for a single employee.
+
+    Returns:
+        dict: The same keys as compare_regimes, with float values and
+        "best_regime" as a str.
+    """
+    results = compare_regimes({
+        "basic": basic,
+        "hra": hra,
+        "special_allowance": special_allowance,
+        "bonus": bonus,
+        "pf_employer": pf_employer,
+        "gratuity": gratuity,
+        "medical": medical,
+        "other_allowances": other_allowances
+    }, baseline, tables=tables)
+    best_regime = results.pop("best_regime")
+    results = {key: float(value) for key, value in results.items()}
+    results["best_regime"] = str(best_regime)
+    return results
+
+
+class SalaryCache:
+    """
+    Memoizes single-employee calculations in bounded LRU tables.
+
+    Employees with identical salary structures are common, and a cached
+    result is a dict lookup instead of a full (NumPy) evaluation. Inputs are
+    normalized to floats and keyed together with the regime, so results are
+    identical to the uncached functions. Whole batches are not cached:
+    vectorized evaluation is cheaper than hashing their rows.
+
+    Args:
+        maxsize (int): Entries kept per table (regime tax, salary breakup,
+            regime comparison); None for unbounded.
+        tables (dict[str, SlabSchedule], optional): Compiled slab schedules,
+            defaults to load_tax_tables().
+    """
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, tables=None):
+        self.tables = tables if tables is not None else load_tax_tables()
+        self._regime_tax = functools.lru_cache(maxsize)(self._regime_tax_uncached)
+        self._salary = functools.lru_cache(maxsize)(self._salary_uncached)
+        self._comparison = functools.lru_cache(maxsize)(self._comparison_uncached)
+
+    def _regime_tax_uncached(self, regime, taxable_income):
+        return float(self.tables[regime].slab_tax(taxable_income))
+
+    def _salary_uncached(self, components, regime):
+        return calculate_salary(*components, regime=regime, tables=self.tables)
+
+    def _comparison_uncached(self, components, baseline):
+        return compare_regimes_single(*components, baseline=baseline, tables=self.tables)
+
+    def regime_tax(self, regime, taxable_income):
+        """Slab tax for a taxable income, as calculate_<regime>_regime_tax"""
+        return self._regime_tax(regime, float(taxable_income))
+
+    def calculate_salary(self, basic, hra, special_allowance, bonus=0, pf_employer=0,
+                         gratuity=0, medical=0, other_allowances=0, regime="new"):
+        """Cached calculate_salary; returns a new dict on every call"""
+        components = tuple(map(float, (basic, hra, special_allowance, bonus, pf_employer,
+                                       gratuity, medical, other_allowances)))
+        return dict(self._salary(components, regime))
+
+    def compare_regimes(self, basic, hra, special_allowance, bonus=0, pf_employer=0,
+                        gratuity=0, medical=0, other_allowances=0, baseline="new"):
+        """Cached compare_regimes_single; returns a new dict on every call"""
+        components = tuple(map(float, (basic, hra, special_allowance, bonus, pf_employer,
+                                       gratuity, medical, other_allowances)))
+        return dict(self._comparison(components, baseline))
+
+    def cache_info(self):
+        """
+        Returns:
+            dict[str, functools._CacheInfo]: Hits, misses, maxsize and current
+            size of the "regime_tax", "salary" and "comparison" tables.
+        """
+        return {
+            "regime_tax": self._regime_tax.cache_info(),
+            "salary": self._salary.cache_info(),
+            "comparison": self._comparison.cache_info()
+        }
+
+    def cache_clear(self):
+        self._regime_tax.cache_clear()
+        self._salary.cache_clear()
+        self._comparison.cache_clear()
+
+
+class IncrementalSalary:
+    """
+    Salary breakup of one employee that recomputes only what an input change affects.
+
+    Every derived quantity (gross, HRA exemption, taxable income, slab tax,
+    tax with cess, in-hand) is a node whose inputs are recorded the first
+    time it is computed. Setting an input marks only the nodes that read it,
+    directly or indirectly, as stale; they are recomputed lazily on the next
+    get(). All regimes share the same gross and deduction nodes, so keeping
+    a regime comparison up to date costs little more than the breakup itself.
+
+    Values are bit-for-bit identical to calculate_salary.
+    """
+    def __init__(self, tables=None, **inputs):
+        self.tables = tables if tables is not None else load_tax_tables()
+        self._formulas = {}
+        self._values = dict.fromkeys(INPUT_COLUMNS, 0.0)
+        self._values["regime"] = "new"
+        self._dependents = collections.defaultdict(set)
+        self._computing = []
+        self._define_formulas()
+        self.set(**inputs)
+
+    def _define_formulas(self):
+        f = self._formulas
+        get = self.get
+
+        # Monthly and annual components
+        for name in INPUT_COLUMNS:
+            if name == "bonus":
+                f["bonus_monthly"] = lambda: get("bonus") / 12  # Convert annual bonus to monthly
+                f["bonus_annual"] = lambda: get("bonus")
+            else:
+                f[name + "_monthly"] = functools.partial(get, name)
+                f[name + "_annual"] = lambda name=name: get(name) * 12
+        f["professional_tax_monthly"] = lambda: float(MONTHLY_PROFESSIONAL_TAX)
+        f["professional_tax_annual"] = lambda: float(ANNUAL_PROFESSIONAL_TAX)
+
+        # Gross salary
+        f["gross_monthly"] = lambda: (get("basic") + get("hra") + get("special_allowance") +
+                                      get("bonus_monthly") + get("medical") + get("other_allowances"))
+        f["gross_annual"] = lambda: get("gross_monthly") * 12
+
+        # Old regime deductions
+        old = self.tables["old"]
+        f["rent_paid"] = lambda: min(get("hra_annual"), 0.5 * (get("gross_annual") - get("basic_annual")))
+        f["old_hra_exemption"] = lambda: min(min(get("hra_annual"), get("rent_paid") - (0.1 * get("basic_annual"))),
+                                             0.5 * get("basic_annual"))
+        f["section_80c"] = lambda: min(get("pf_employer_annual") + old.section_80c_limit, old.section_80c_limit)
+        f["section_80d"] = lambda: min(get("medical_annual"), old.section_80d_limit)
+
+        # Tax and in-hand under every regime
+        for regime, schedule in self.tables.items():
+            if regime == "old":
+                f["old_taxable_income"] = lambda: (get("gross_annual") - old.standard_deduction
+                                                   - get("old_hra_exemption") - get("section_80c")
+                                                   - get("section_80d"))
+            else:
+                f[regime + "_taxable_income"] = (
+                    lambda schedule=schedule: get("gross_annual") - schedule.standard_deduction)
+            f[regime + "_slab_tax"] = (
+                lambda regime=regime, schedule=schedule: schedule.slab_tax_scalar(get(regime + "_taxable_income")))
+            f[regime + "_income_tax_annual"] = (
+                lambda regime=regime, schedule=schedule: schedule.income_tax_scalar(
+                    get(regime + "_taxable_income"), get(regime + "_slab_tax")))
+            f[regime + "_in_hand_monthly"] = (
+                lambda regime=regime: get("gross_monthly") - (MONTHLY_PROFESSIONAL_TAX +
+                                                              get(regime + "_income_tax_annual") / 12))
+
+        # The selected regime
+        f["taxable_income"] = lambda: get(get("regime") + "_taxable_income")
+        f["hra_exemption"] = lambda: get("old_hra_exemption") if get("regime") == "old" else 0.0
+        f["income_tax_annual"] = lambda: get(get("regime") + "_income_tax_annual")
+        f["income_tax_monthly"] = lambda: get("income_tax_annual") / 12
+        f["in_hand_monthly"] = lambda: get(get("regime") + "_in_hand_monthly")
+        f["in_hand_annual"] = lambda: get("in_hand_monthly") * 12
+
+    def set(self, **inputs):
+        """
+        Updates inputs (INPUT_COLUMNS and "regime"), invalidating what depends on them.
+        """
+        for name, value in inputs.items():
+            if name == "regime":
+                if value not in self.tables:
+                    raise ValueError(f"Unknown tax regime: {value!r}")
+            elif name in INPUT_COLUMNS:
+                value = float(value)
+            else:
+                raise ValueError(f"Unknown salary input: {name!r}")
+            if self._values[name] != value:
+                self._values[name] = value
+                self._invalidate(name)
+
+    def _invalidate(self, name):
+        stale = list(self._dependents.pop(name, ()))
+        while stale:
+            node = stale.pop()
+            if node in self._values:
+                del self._values[node]
+                stale.extend(self._dependents.pop(node, ()))
+
+    def get(self, name):
+        """Returns an input or derived quantity, recomputing it only if stale"""
+        if self._computing:
+            self._dependents[name].add(self._computing[-1])
+        if name not in self._values:
+            if name not in self._formulas:
+                raise KeyError(name)
+            self._computing.append(name)
+            try:
+                self._values[name] = self._formulas[name]()
+            finally:
+                self._computing.pop()
+        return self._values[name]
+
+    def breakdown(self):
+        """
+        Returns:
+            dict[str, float]: The same keys as calculate_salary, for the
+            selected regime.
+        """
+        keys = [key + suffix for _, key in BREAKDOWN for suffix in ("_monthly", "_annual")]
+        keys += ["gross_monthly", "gross_annual", "taxable_income", "hra_exemption"]
+        return {key: self.get(key) for key in keys}
+
+    def comparison(self, baseline=None):
+        """
+        Returns:
+            dict: The same keys as compare_regimes_single; the baseline
+            defaults to the selected regime.
+        """
+        baseline = baseline or self.get("regime")
+        results = {}
+        for regime in REGIMES:
+            results[f"{regime}_income_tax_annual"] = self.get(regime + "_income_tax_annual")
+            results[f"{regime}_in_hand_monthly"] = self.get(regime + "_in_hand_monthly")
+        taxes = [results[f"{regime}_income_tax_annual"] for regime in REGIMES]
+        best_tax = min(taxes)
+        results["savings_annual"] = results[f"{baseline}_income_tax_annual"] - best_tax
+        results["best_regime"] = REGIMES[taxes.index(best_tax)]
+        return results
+
+
+def _init_worker(financial_year, slabs_dir):
+    """Loads the slab tables once when a worker process starts"""
+    load_tax_tables(financial_year, slabs_dir)
+
+
+def iter_parallel(function, items, workers=None, financial_year=DEFAULT_FINANCIAL_YEAR,
+                  slabs_dir=TAX_SLABS_DIR, max_pending=None):
+    """
+    parallel.iter_parallel with every worker compiling the slab tables for
+    financial_year when it starts.
+
+    Yields:
+        tuple: (item, function(item)) pairs, in input order.
+    """
+    return parallel.iter_parallel(function, items, workers, max_pending, initializer=_init_worker,
+                                  initargs=(financial_year, slabs_dir))
+
+
+def _calculate_shard(columns, regime, financial_year, slabs_dir):
+    return calculate_salary_batch(columns, regime, load_tax_tables(financial_year, slabs_dir))
+
+
+def calculate_salary_parallel(columns, regime="new", workers=None, shard_size=DEFAULT_SHARD_SIZE,
+                              financial_year=DEFAULT_FINANCIAL_YEAR, slabs_dir=TAX_SLABS_DIR):
+    """
+    Calculates the salary breakup for a batch of employees on several processes.
+
+    The columns are split into shards of shard_size rows, calculated by a
+    pool of workers processes and joined back together in input order. The
+    result is identical to calculate_salary_batch.
+    """
+    inputs = {name: np.asarray(columns[name], dtype=np.float64)
+              for name in INPUT_COLUMNS if name in columns}
+    if not inputs:
+        raise ValueError("No salary columns given")
+    rows = len(next(iter(inputs.values())))
+
+    shards = ({name: column[start:start + shard_size] for name, column in inputs.items()}
+              for start in range(0, rows, shard_size))
+    function = functools.partial(_calculate_shard, regime=regime,
+                                 financial_year=financial_year, slabs_dir=slabs_dir)
+    results = [result for _, result in iter_parallel(function, shards, workers,
+                                                     financial_year, slabs_dir)]
+    if not results:
+        return calculate_salary_batch(inputs, regime, load_tax_tables(financial_year, slabs_dir))
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+
+def split_ctc(ctc, bonus=0, gratuity=0, medical=0, other_allowances=0,
+              basic_ratio=DEFAULT_BASIC_RATIO, hra_ratio=DEFAULT_HRA_RATIO):
+    """
+    Splits an annual CTC into monthly Basic, HRA, Special Allowance and employer PF.
+
+    Basic is basic_ratio of the monthly CTC, HRA is hra_ratio of Basic and the
+    employer PF is min(12% of Basic, ₹15,000). The bonus (annual) and the
+    monthly gratuity, medical and other allowances are taken as given, and
+    Special Allowance is whatever balance remains.
+
+    Returns:
+        dict[str, numpy.ndarray]: INPUT_COLUMNS for the structure, plus "ctc"
+        and "feasible" (False where the fixed components and ratios leave a
+        negative Special Allowance).
+    """
+    ctc = np.asarray(ctc, dtype=np.float64)
+    bonus = np.asarray(bonus, dtype=np.float64)
+    fixed_monthly = np.asarray(gratuity, dtype=np.float64) + medical + other_allowances
+
+    monthly_basic = basic_ratio * ctc / 12
+    monthly_hra = hra_ratio * monthly_basic
+    monthly_pf_employer = np.minimum(PF_EMPLOYER_RATE * monthly_basic, PF_EMPLOYER_CAP)
+    monthly_special_allowance = ((ctc - bonus) / 12 - fixed_monthly
+                                 - monthly_basic - monthly_hra - monthly_pf_employer)
+
+    shape = np.broadcast(ctc, bonus, fixed_monthly).shape
+    columns = {
+        "ctc": ctc,
+        "basic": monthly_basic,
+        "hra": monthly_hra,
+        "special_allowance": monthly_special_allowance,
+        "bonus": bonus,
+        "pf_employer": monthly_pf_employer,
+        "gratuity": np.asarray(gratuity, dtype=np.float64),
+        "medical": np.asarray(medical, dtype=np.float64),
+        "other_allowances": np.asarray(other_allowances, dtype=np.float64),
+        "feasible": monthly_special_allowance >= 0
+    }
+    return {name: np.array(np.broadcast_to(values, shape)) for name, values in columns.items()}
+
+
+def solve_for_in_hand(target_in_hand, regime="new", bonus=0, gratuity=0, medical=0,
+                      other_allowances=0, basic_ratio=DEFAULT_BASIC_RATIO,
+                      hra_ratio=DEFAULT_HRA_RATIO, tables=None, tolerance=0.005):
+    """
+    Finds the annual CTC and salary structure that gives a target monthly in-hand.
+
+    In-hand salary is an increasing, piecewise-linear function of CTC, so the
+    CTC is bracketed by bisection until each target's bracket falls inside a
+    single linear piece (or is narrower than a rupee), then solved exactly by
+    linear interpolation across that bracket. All targets are solved together
+    with vectorized evaluations of calculate_salary_batch.
+
+    Args:
+        target_in_hand (array-like): Monthly in-hand salaries to hit.
+        tolerance (float): Largest acceptable in-hand error in rupees.
+
+    Returns:
+        dict[str, numpy.ndarray]: The split_ctc columns for the solved CTC,
+        plus "in_hand_monthly" achieved. "feasible" is False where the target
+        cannot be reached with the given fixed components.
+    """
+    if tables is None:
+        tables = load_tax_tables()
+    target = np.atleast_1d(np.asarray(target_in_hand, dtype=np.float64))
+    shape = np.broadcast(target, bonus, gratuity, medical, other_allowances).shape
+    target = np.broadcast_to(target, shape)
+    fixed = dict(bonus=np.broadcast_to(bonus, shape), gratuity=np.broadcast_to(gratuity, shape),
+                 medical=np.broadcast_to(medical, shape),
+                 other_allowances=np.broadcast_to(other_allowances, shape),
+                 basic_ratio=basic_ratio, hra_ratio=hra_ratio)
+
+    def shortfall(ctc):
+        structure = split_ctc(ctc, **fixed)
+        return calculate_salary_batch(structure, regime, tables)["in_hand_monthly"] - target
+
+    # Smallest CTC that covers the fixed components; below it the structure
+    # cannot exist, so targets already met there are infeasible
+    low = fixed["bonus"] + 12 * (fixed["gratuity"] + fixed["medical"] + fixed["other_allowances"])
+    low = low / (1 - basic_ratio * (1 + hra_ratio + PF_EMPLOYER_RATE))
+    low_shortfall = shortfall(low)
+    reachable = low_shortfall < 0
+
+    # Grow the upper bound until every target is bracketed
+    high = np.maximum(low, 12 * np.abs(target)) * 2 + 1
+    high_shortfall = shortfall(high)
+    while np.any(high_shortfall < 0):
+        grow = high_shortfall < 0
+        high = np.where(grow, high * 2, high)
+        high_shortfall = shortfall(high)
+
+    for _ in range(64):
+        # Within a single linear piece the midpoint lies exactly on the chord
+        middle = (low + high) / 2
+        middle_shortfall = shortfall(middle)
+        chord = (low_shortfall + high_shortfall) / 2
+        linear = np.abs(middle_shortfall - chord) <= tolerance / 4
+        if np.all(linear | (high - low < 1)):
+            break
+        below = middle_shortfall < 0
+        low = np.where(below, middle, low)
+        low_shortfall = np.where(below, middle_shortfall, low_shortfall)
+        high = np.where(below, high, middle)
+        high_shortfall = np.where(below, high_shortfall, middle_shortfall)
+
+    # Invert the linear piece
+    span = high_shortfall - low_shortfall
+    fraction = np.divide(-low_shortfall, span, out=np.zeros(shape), where=span > 0)
+    ctc = np.where(reachable, low + np.clip(fraction, 0, 1) * (high - low), low)
+
+    structure = split_ctc(ctc, **fixed)
+    results = calculate_salary_batch(structure, regime, tables)
+    structure["in_hand_monthly"] = results["in_hand_monthly"]
+    structure["feasible"] = structure["feasible"] & reachable & (
+        np.abs(results["in_hand_monthly"] - target) <= tolerance)
+    return structure
+
+
+def _check_regimes(regimes, tables):
+    unknown = [regime for regime in regimes if regime not in tables]
+    if unknown:
+        raise ValueError(f"Unknown tax regime: {unknown[0]!r}")
+
+
+class SweepGrid:
+    """
+    The cartesian product of salary input values, for what-if sweeps.
+
+    The grid is evaluated as a 2-D array: one row for every combination of
+    the outer inputs, with the last swept input running along each row.
+    Inputs are broadcast rather than expanded, and when the last input is in
+    ascending order taxable income rises along every row, so slab tax is
+    evaluated a whole segment at a time (see SlabSchedule.slab_tax_sorted).
+
+    Args:
+        grid (Mapping[str, float or array-like]): Values of the inputs in
+            INPUT_COLUMNS. Arrays are swept, scalars are held fixed and
+            missing inputs are zero. Put the finest input (e.g. Basic in
+            100-rupee steps) last.
+    """
+    def __init__(self, grid):
+        self.axes = []
+        self.fixed = {}
+        for name, values in grid.items():
+            if name not in INPUT_COLUMNS:
+                raise ValueError(f"Unknown salary input: {name!r}")
+            values = np.asarray(values, dtype=np.float64)
+            if values.ndim == 0:
+                self.fixed[name] = float(values)
+            elif values.ndim == 1 and len(values):
+                self.axes.append((name, values))
+            else:
+                raise ValueError(f"Values of {name} must be a number or a non-empty 1-D array")
+        if not self.axes:
+            raise ValueError("A sweep needs at least one input with an array of values")
+        self.names = [name for name, _ in self.axes]
+        self.shape = tuple(len(values) for _, values in self.axes)
+        self.rows = math.prod(self.shape[:-1])
+        self.size = math.prod(self.shape)
+
+    def evaluate_rows(self, start, stop, regimes=REGIMES, tables=None):
+        """
+        Evaluates grid rows start:stop.
+
+        Returns:
+            dict[str, dict[str, numpy.ndarray]]: For every regime, the
+            calculate_salary_batch results shaped (stop - start, length of the
+            last input), some of them broadcast views.
+        """
+        if tables is None:
+            tables = load_tax_tables()
+        _check_regimes(regimes, tables)
+        *outer, (last_name, last_values) = self.axes
+        columns = {name: np.full((1, 1), value) for name, value in self.fixed.items()}
+        if outer:
+            indices = np.unravel_index(np.arange(start, stop), self.shape[:-1])
+            for (name, values), index in zip(outer, indices):
+                columns[name] = values[index].reshape(-1, 1)
+        columns[last_name] = last_values.reshape(1, -1)
+        for name in INPUT_COLUMNS:
+            columns.setdefault(name, np.zeros((1, 1)))
+
+        components = _salary_components(columns)
+        old_deductions = _old_regime_deductions(components, tables["old"]) if "old" in regimes else None
+        shape = (stop - start, len(last_values))
+        results = {}
+        for regime in regimes:
+            taxable_income, annual_income_tax, hra_exemption = _regime_tax(
+                components, regime, tables[regime], old_deductions, sorted_incomes=True)
+            monthly_in_hand = _monthly_in_hand(components, annual_income_tax)
+            regime_results = dict(components)
+            regime_results["income_tax_monthly"] = annual_income_tax / 12
+            regime_results["income_tax_annual"] = annual_income_tax
+            regime_results["in_hand_monthly"] = monthly_in_hand
+            regime_results["in_hand_annual"] = monthly_in_hand * 12
+            regime_results["taxable_income"] = taxable_income
+            regime_results["hra_exemption"] = hra_exemption
+            results[regime] = {name: np.broadcast_to(values, shape)
+                               for name, values in regime_results.items()}
+        return results
+
+    def evaluate(self, regimes=REGIMES, outputs=SWEEP_OUTPUTS, tables=None):
+        """
+        Evaluates the whole grid at once.
+
+        Returns:
+            dict[str, numpy.ndarray]: One array per output, shaped
+            (len(regimes), *lengths of the swept inputs). Values are identical
+            to calculate_salary_batch on the same inputs.
+        """
+        _check_outputs(outputs)
+        results = self.evaluate_rows(0, self.rows, regimes, tables)
+        return {name: np.stack([results[regime][name] for regime in regimes]).reshape(
+                    (len(regimes),) + self.shape)
+                for name in outputs}
+
+    def blocks(self, regimes=REGIMES, chunk_size=DEFAULT_SHARD_SIZE):
+        """
+        Splits the grid into blocks of whole rows, about chunk_size points each.
+
+        Returns:
+            list[tuple]: (regime, start row, stop row) for every block, regime
+            by regime.
+        """
+        rows_per_block = max(1, chunk_size // self.shape[-1])
+        return [(regime, start, min(start + rows_per_block, self.rows))
+                for regime in regimes for start in range(0, self.rows, rows_per_block)]
+
+    def table(self, block, outputs=SWEEP_OUTPUTS, tables=None):
+        """
+        Evaluates one block as a flat table.
+
+        Returns:
+            dict: "regime" (list of str), the swept inputs and the outputs,
+            one row per grid point in row-major order.
+        """
+        _check_outputs(outputs)
+        regime, start, stop = block
+        results = self.evaluate_rows(start, stop, (regime,), tables)[regime]
+        shape = (stop - start, self.shape[-1])
+        table = {"regime": [regime] * (shape[0] * shape[1])}
+        *outer, (last_name, last_values) = self.axes
+        if outer:
+            indices = np.unravel_index(np.arange(start, stop), self.shape[:-1])
+            for (name, values), index in zip(outer, indices):
+                table[name] = np.repeat(values[index], shape[1])
+        table[last_name] = np.tile(last_values, shape[0])
+        # Keep the swept inputs in grid order
+        table = {"regime": table["regime"], **{name: table[name] for name in self.names}}
+        for name in outputs:
+            table[name] = results[name].ravel()
+        return table
+
+    def iter_table(self, regimes=REGIMES, outputs=SWEEP_OUTPUTS, tables=None,
+                   chunk_size=DEFAULT_SHARD_SIZE):
+        """Yields the flat table of the whole grid, one block at a time"""
+        for block in self.blocks(regimes, chunk_size):
+            yield self.table(block, outputs, tables)
+
+
+def _check_outputs(outputs):
+    unknown = [name for name in outputs if name not in RESULT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown output column: {unknown[0]!r}")
+
+
+def sweep(grid, regimes=REGIMES, outputs=SWEEP_OUTPUTS, tables=None):
+    """
+    Evaluates in-hand salary and tax over every combination of input values.
+
+    For example, Basic from ₹20,000 to ₹5,00,000 in ₹100 steps against three
+    bonus levels and every regime:
+
+        sweep({"bonus": [0, 100000, 200000], "basic": np.arange(20000, 500001, 100)})
+
+    Args:
+        grid (Mapping[str, float or array-like]): See SweepGrid.
+        regimes (sequence[str]): Regimes to evaluate.
+        outputs (sequence[str]): Columns of calculate_salary_batch to return.
+
+    Returns:
+        dict[str, numpy.ndarray]: One array per output, shaped
+        (len(regimes), *lengths of the swept inputs in grid order).
+    """
+    return SweepGrid(grid).evaluate(regimes, outputs, tables)
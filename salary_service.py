@@ -0,0 +1,477 @@
+"""
+Local HTTP/JSON service for the salary engine.
+
+Serves the same calculations as the desktop calculator without a display:
+
+    python salary_service.py --port 8080
+
+Endpoints:
+    GET  /health                      Service status and financial year.
+    POST /salary?regime=new           One employee as a JSON object; returns
+                                      its breakup as a JSON object.
+    POST /salary/batch?regime=new     Employees as a JSON array or NDJSON
+                                      (one object per line); streams one
+                                      NDJSON breakup per employee, in order.
+
+Add compare=true to either endpoint to include every regime's tax and the
+cheapest regime. An employee may carry its own "regime", which overrides
+the query's on both endpoints; a batch calculates each regime's rows
+together, and reports a row with an unknown regime as an error line.
+Inputs so large that the breakup overflows are rejected the same way (an
+error line, or 400 Bad Request from /salary), as JSON cannot carry inf.
+Fields other than the salary inputs (an employee id, say, or the regime)
+are echoed back on each result. Slab tables are loaded once at startup and
+shared by all requests.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import salary_engine
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+# Batch rows calculated (and streamed back) together; a chunk holds the
+# event loop for roughly 10ms, which bounds the delay seen by other requests
+DEFAULT_BATCH_CHUNK_SIZE = 500
+# Largest body accepted by the non-streaming endpoints
+MAX_BODY_SIZE = 64 * 1024 * 1024
+# Batch results buffered for a client that is still uploading its request
+MAX_BUFFERED_RESPONSE = 256 * 1024 * 1024
+READ_SIZE = 64 * 1024
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl",
+                "application/x-jsonlines")
+# Request fields that are not echoed back on results; a row's own regime is, so clients see what was applied
+ECHO_EXCLUDED = frozenset(salary_engine.INPUT_COLUMNS)
+# Reported for inputs so large that the breakup overflows, as JSON has no inf or nan
+NON_FINITE_ERROR = "Inputs too large: the breakup is not finite"
+RESPONSE_COLUMNS = [key + suffix for _, key in salary_engine.BREAKDOWN
+                    for suffix in ("_monthly", "_annual")]
+
+
+class HttpError(Exception):
+    """An error reported to the client as a JSON response"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """A parsed HTTP request whose body is read on demand"""
+    def __init__(self, reader, method, target, version, headers):
+        self.reader = reader
+        self.method = method
+        url = urlsplit(target)
+        self.path = url.path.rstrip("/") or "/"
+        self.query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        self.headers = headers
+        self.keep_alive = (headers.get("connection", "").lower() != "close"
+                           if version == "HTTP/1.1"
+                           else headers.get("connection", "").lower() == "keep-alive")
+        self.chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        try:
+            self.remaining = 0 if self.chunked else int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        self.body_done = not self.chunked and self.remaining == 0
+
+    @property
+    def content_type(self):
+        return self.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    async def iter_body(self):
+        """Yields the body in blocks as it arrives, decoding chunked transfer encoding"""
+        reader = self.reader
+        if self.chunked:
+            while not self.body_done:
+                size_line = await reader.readline()
+                try:
+                    size = int(size_line.split(b";")[0], 16)
+                except ValueError:
+                    raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid chunk size")
+                if size == 0:
+                    # Skip trailers up to the blank line ending the body
+                    while (await reader.readline()).strip():
+                        pass
+                    self.body_done = True
+                    break
+                data = await reader.readexactly(size)
+                await reader.readexactly(2)
+                yield data
+        else:
+            while self.remaining:
+                data = await reader.read(min(self.remaining, READ_SIZE))
+                if not data:
+                    raise asyncio.IncompleteReadError(b"", self.remaining)
+                self.remaining -= len(data)
+                yield data
+            self.body_done = True
+
+    async def read_body(self, limit=MAX_BODY_SIZE):
+        if not self.chunked and self.remaining > limit:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        blocks, size = [], 0
+        async for block in self.iter_body():
+            size += len(block)
+            if size > limit:
+                raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+            blocks.append(block)
+        return b"".join(blocks)
+
+    async def iter_lines(self):
+        """Yields the body's lines as they arrive"""
+        pending = b""
+        async for block in self.iter_body():
+            lines = (pending + block).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line
+        if pending:
+            yield pending
+
+
+async def read_request(reader):
+    """Reads a request line and headers, returning None when the client has gone"""
+    request_line = await reader.readline()
+    while request_line in (b"\r\n", b"\n"):
+        request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return Request(reader, method.upper(), target, version, headers)
+
+
+def _response_head(status, content_type, keep_alive, length=None):
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}",
+             "Connection: " + ("keep-alive" if keep_alive else "close")]
+    lines.append("Transfer-Encoding: chunked" if length is None else f"Content-Length: {length}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def send_json(writer, status, body, keep_alive=True):
+    data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+    writer.write(_response_head(status, "application/json", keep_alive, len(data)) + data)
+
+
+def write_chunk(writer, data):
+    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+def _employee_values(employee):
+    """The salary inputs of one JSON employee, in INPUT_COLUMNS order"""
+    if not isinstance(employee, dict):
+        raise ValueError("Each employee must be a JSON object")
+    values = []
+    for name in salary_engine.INPUT_COLUMNS:
+        value = employee.get(name) or 0
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a number")
+        if not math.isfinite(value):
+            raise ValueError(f"{name} must be finite")
+        values.append(value)
+    return values
+
+
+def _employee_regime(employee, default):
+    """The regime an employee asks for, or default; raises ValueError if it is unknown"""
+    regime = employee.get("regime")
+    if regime is None:
+        regime = default
+    if not isinstance(regime, str) or regime not in salary_engine.REGIMES:
+        raise ValueError(f"Unknown regime {regime!r}, expected one of {', '.join(salary_engine.REGIMES)}")
+    return regime
+
+
+def _extra_fields(employee):
+    """JSON text of the fields echoed back, ready to splice into a result object"""
+    extra = {key: value for key, value in employee.items() if key not in ECHO_EXCLUDED}
+    return json.dumps(extra)[1:-1] + ", " if extra else ""
+
+
+def _encode_field(name, value):
+    """A "name": value pair, with amounts to two decimals like the batch CLI"""
+    if isinstance(value, float):
+        return f'"{name}": %.2f' % value
+    return f'"{name}": {json.dumps(value)}'
+
+
+class SalaryService:
+    """
+    Request handlers around a preloaded set of slab tables.
+
+    Single-employee requests go through a SalaryCache, so repeated
+    employees (a payroll UI re-rendering the same person) are answered
+    from memory. Batches are parsed into column arrays a chunk at a time
+    and evaluated with the vectorized engine.
+    """
+    def __init__(self, financial_year=salary_engine.DEFAULT_FINANCIAL_YEAR,
+                 chunk_size=DEFAULT_BATCH_CHUNK_SIZE):
+        self.financial_year = financial_year
+        self.tables = salary_engine.load_tax_tables(financial_year)
+        self.cache = salary_engine.SalaryCache(tables=self.tables)
+        self.chunk_size = chunk_size
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("POST", "/salary"): self.single,
+            ("POST", "/salary/batch"): self.batch,
+        }
+
+    def _options(self, request, employee=None):
+        try:
+            regime = _employee_regime(employee or {}, request.query.get("regime", "new"))
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+        compare = request.query.get("compare", "").lower() in ("1", "true", "yes")
+        return regime, compare
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = None
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    handler = self.routes.get((request.method, request.path))
+                    if handler is None:
+                        if any(path == request.path for _, path in self.routes):
+                            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed")
+                        raise HttpError(HTTPStatus.NOT_FOUND, f"No endpoint at {request.path}")
+                    await handler(request, writer)
+                except HttpError as e:
+                    if request is not None and not request.body_done:
+                        request.keep_alive = False
+                    send_json(writer, e.status, {"error": str(e)},
+                              keep_alive=request is not None and request.keep_alive)
+                    if request is None:
+                        await writer.drain()
+                        break
+                await writer.drain()
+                # An unread body would be mistaken for the next request
+                if not (request.keep_alive and request.body_done):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def health(self, request, writer):
+        send_json(writer, HTTPStatus.OK, {"status": "ok", "financial_year": self.financial_year,
+                                          "regimes": list(salary_engine.REGIMES)},
+                  request.keep_alive)
+
+    async def single(self, request, writer):
+        try:
+            employee = json.loads(await request.read_body())
+            values = _employee_values(employee)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+        regime, compare = self._options(request, employee)
+        with np.errstate(over="ignore", invalid="ignore"):
+            results = self.cache.calculate_salary(*values, regime=regime)
+            output_columns = list(RESPONSE_COLUMNS)
+            if compare:
+                results.update(self.cache.compare_regimes(*values, baseline=regime))
+                output_columns += salary_engine.comparison_columns()
+        if not all(math.isfinite(results[name]) for name in output_columns
+                   if isinstance(results[name], float)):
+            raise HttpError(HTTPStatus.BAD_REQUEST, NON_FINITE_ERROR)
+        parts = [_encode_field(name, results[name]) for name in output_columns]
+        send_json(writer, HTTPStatus.OK, "{" + _extra_fields(employee) + ", ".join(parts) + "}",
+                  request.keep_alive)
+
+    def encode_chunk(self, employees, regime, compare):
+        """
+        Calculates a list of parsed employees, returning their NDJSON lines.
+
+        regime applies to the employees that do not name their own; each
+        regime's employees are calculated together.
+        """
+        lines = [None] * len(employees)
+        try:
+            # Well-formed chunks convert in one go; otherwise rows are checked one by one
+            matrix = np.array([[employee.get(name) or 0 for name in salary_engine.INPUT_COLUMNS]
+                               for _, employee in employees], dtype=np.float64)
+            if not np.isfinite(matrix).all():
+                raise ValueError("non-finite input")
+            valid = range(len(employees))
+        except (AttributeError, TypeError, ValueError):
+            valid, values = [], []
+            for index, (line_number, employee) in enumerate(employees):
+                try:
+                    if isinstance(employee, Exception):
+                        raise employee
+                    values.append(_employee_values(employee))
+                except ValueError as e:
+                    lines[index] = json.dumps({"line": line_number, "error": str(e)})
+                    continue
+                valid.append(index)
+            matrix = np.array(values, dtype=np.float64).reshape(-1, len(salary_engine.INPUT_COLUMNS))
+
+        # Rows of each regime, as (indexes into employees, rows of matrix)
+        groups = {}
+        for row, index in enumerate(valid):
+            line_number, employee = employees[index]
+            try:
+                row_regime = _employee_regime(employee, regime)
+            except ValueError as e:
+                lines[index] = json.dumps({"line": line_number, "error": str(e)})
+                continue
+            indexes, rows = groups.setdefault(row_regime, ([], []))
+            indexes.append(index)
+            rows.append(row)
+
+        for row_regime, (indexes, rows) in groups.items():
+            columns = dict(zip(salary_engine.INPUT_COLUMNS, matrix[rows].T))
+            with np.errstate(over="ignore", invalid="ignore"):
+                results = salary_engine.calculate_salary_batch(columns, row_regime, self.tables)
+                output_columns = list(RESPONSE_COLUMNS)
+                if compare:
+                    results.update(salary_engine.compare_regimes(columns, baseline=row_regime,
+                                                                 tables=self.tables))
+                    output_columns += salary_engine.comparison_columns()
+            finite = np.ones(len(indexes), dtype=bool)
+            formats, values = [], []
+            for name in output_columns:
+                column = results[name]
+                if column.dtype.kind == "f":
+                    finite &= np.isfinite(column)
+                    formats.append(f'"{name}": %.2f')
+                    values.append(column.tolist())
+                else:
+                    formats.append(f'"{name}": %s')
+                    values.append(list(map(json.dumps, column.tolist())))
+            template = "{%s" + ", ".join(formats) + "}"
+            prefixes = [_extra_fields(employees[index][1]) for index in indexes]
+            for index, row_finite, row in zip(indexes, finite.tolist(), zip(prefixes, *values)):
+                if row_finite:
+                    lines[index] = template % row
+                else:
+                    lines[index] = json.dumps({"line": employees[index][0], "error": NON_FINITE_ERROR})
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    async def _parsed_employees(self, request):
+        """Yields (line number, employee or parse error) from a JSON array or NDJSON body"""
+        if request.content_type in NDJSON_TYPES:
+            line_number = 0
+            async for line in request.iter_lines():
+                line_number += 1
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, ValueError(f"Invalid JSON: {e}")
+            return
+        try:
+            employees = json.loads(await request.read_body())
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+        if isinstance(employees, dict):
+            employees = [employees]
+        if not isinstance(employees, list):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Expected a JSON array of employees")
+        for line_number, employee in enumerate(employees, 1):
+            yield line_number, employee
+
+    async def batch(self, request, writer):
+        regime, compare = self._options(request)
+        started = False
+        chunk = []
+
+        async def flush():
+            nonlocal started
+            if not started:
+                writer.write(_response_head(HTTPStatus.OK, "application/x-ndjson", request.keep_alive))
+                started = True
+            if chunk:
+                write_chunk(writer, self.encode_chunk(chunk, regime, compare))
+                chunk.clear()
+            # Most clients send the whole body before reading the response, so
+            # waiting for them to read while they are still uploading would
+            # deadlock; results are buffered instead, up to a limit
+            if (request.body_done
+                    or writer.transport.get_write_buffer_size() > MAX_BUFFERED_RESPONSE):
+                await writer.drain()
+
+        try:
+            async for item in self._parsed_employees(request):
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    await flush()
+        except HttpError as e:
+            if not started:
+                raise
+            # Results are already streaming; report the error in-band and drop the connection
+            chunk.clear()
+            write_chunk(writer, (json.dumps({"error": str(e)}) + "\n").encode("utf-8"))
+            request.keep_alive = False
+        if chunk or not started:
+            await flush()
+        writer.write(b"0\r\n\r\n")
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, financial_year=salary_engine.DEFAULT_FINANCIAL_YEAR,
+                chunk_size=DEFAULT_BATCH_CHUNK_SIZE, ready=None):
+    """
+    Runs the service until cancelled.
+
+    Args:
+        ready (callable, optional): Called with the bound (host, port) once
+            the server is listening; useful with port 0.
+    """
+    service = SalaryService(financial_year, chunk_size)
+    server = await asyncio.start_server(service.handle_connection, host, port, limit=READ_SIZE)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[:2])
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Salary calculation HTTP service")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"Port to bind, 0 for any free port (default: {DEFAULT_PORT})")
+    parser.add_argument("--financial-year", default=salary_engine.DEFAULT_FINANCIAL_YEAR,
+                        help=f"Slab tables to serve (default: {salary_engine.DEFAULT_FINANCIAL_YEAR})")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_BATCH_CHUNK_SIZE,
+                        help=f"Batch rows calculated together (default: {DEFAULT_BATCH_CHUNK_SIZE})")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    def ready(address):
+        print(f"Listening on http://{address[0]}:{address[1]}", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.financial_year, args.chunk_size, ready))
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
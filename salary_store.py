@@ -0,0 +1,314 @@
+"""
+Compact storage for large employee populations.
+
+EmployeeRecord holds one employee's salary inputs in __slots__;
+EmployeeTable holds many employees as one NumPy column per input, which the
+salary engine consumes directly. Tables are saved in a single-file columnar
+format that is memory-mapped when opened, so a 10M-employee table reopens
+in milliseconds and only the pages a calculation touches are read.
+
+Memory per employee is 8 bytes per column: 64 bytes for the eight salary
+inputs, 72 with an employee_id column. The same employee takes about
+500 bytes as a dict of floats and about 330 bytes as an EmployeeRecord,
+counting the float objects (see salary_benchmark.py store).
+
+File layout (all integers little-endian):
+    8 bytes   MAGIC
+    4 bytes   header length in bytes
+    header    JSON: {"version", "rows", "columns": [{"name", "dtype", "offset"}]}
+    columns   each column contiguous, starting at its offset (64-byte aligned)
+"""
+
+import json
+import os
+import shutil
+import struct
+
+import numpy as np
+
+import salary_engine
+
+# File extension of saved employee tables
+TABLE_EXTENSION = ".etab"
+MAGIC = b"SALTAB\x00\x01"
+FORMAT_VERSION = 1
+# Column offsets are aligned for vectorized loads straight from the mapping
+ALIGNMENT = 64
+
+# Integer employee identifier, the only column stored as int64 by default
+ID_COLUMN = "employee_id"
+
+
+class EmployeeRecord:
+    """One employee's salary inputs: monthly amounts except the annual bonus"""
+    __slots__ = (ID_COLUMN,) + salary_engine.INPUT_COLUMNS
+
+    def __init__(self, basic=0.0, hra=0.0, special_allowance=0.0, bonus=0.0, pf_employer=0.0,
+                 gratuity=0.0, medical=0.0, other_allowances=0.0, employee_id=None):
+        self.employee_id = employee_id
+        self.basic = float(basic)
+        self.hra = float(hra)
+        self.special_allowance = float(special_allowance)
+        self.bonus = float(bonus)
+        self.pf_employer = float(pf_employer)
+        self.gratuity = float(gratuity)
+        self.medical = float(medical)
+        self.other_allowances = float(other_allowances)
+
+    def inputs(self):
+        """The salary inputs as a dict keyed by INPUT_COLUMNS"""
+        return {name: getattr(self, name) for name in salary_engine.INPUT_COLUMNS}
+
+    def calculate(self, regime="new", tables=None):
+        """Calculates this employee's breakup (see salary_engine.calculate_salary)"""
+        return salary_engine.calculate_salary(**self.inputs(), regime=regime, tables=tables)
+
+    def __eq__(self, other):
+        if not isinstance(other, EmployeeRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"EmployeeRecord({fields})"
+
+
+def _column_dtype(name, values):
+    """Salary inputs are float64; other columns keep integers as int64"""
+    if name in salary_engine.INPUT_COLUMNS:
+        return np.dtype(np.float64)
+    kind = np.asarray(values).dtype.kind
+    if kind in "iub":
+        return np.dtype(np.int64)
+    if kind == "f":
+        return np.dtype(np.float64)
+    raise ValueError(f"Column {name!r} is not numeric")
+
+
+class EmployeeTable:
+    """
+    Salary inputs of many employees, one float64 or int64 column each.
+
+    Slicing with a slice returns a table of views into the same columns, so
+    chunks of a memory-mapped table never copy. Indexing with an int returns
+    an EmployeeRecord and with a column name returns that column.
+
+    Args:
+        columns (Mapping[str, array-like]): Columns of equal length. Salary
+            inputs missing from the table count as zero in calculations.
+    """
+    def __init__(self, columns):
+        self.columns = {}
+        length = None
+        for name, values in columns.items():
+            values = np.asarray(values)
+            values = values.astype(_column_dtype(name, values), copy=False)
+            if values.ndim != 1:
+                raise ValueError(f"Column {name!r} must be one-dimensional")
+            if length is None:
+                length = len(values)
+            elif len(values) != length:
+                raise ValueError(f"Column {name!r} has {len(values)} rows, expected {length}")
+            self.columns[name] = values
+        self.length = length or 0
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds a table from EmployeeRecords, with an employee_id column if
+        the records have ids. Either every record has one or none does; a
+        mix raises ValueError naming the first record without one.
+        """
+        records = list(records)
+        columns = {name: np.fromiter((getattr(record, name) for record in records), np.float64, len(records))
+                   for name in salary_engine.INPUT_COLUMNS}
+        if any(record.employee_id is not None for record in records):
+            missing = next((index for index, record in enumerate(records) if record.employee_id is None), None)
+            if missing is not None:
+                raise ValueError(f"Record {missing} has no employee_id, but others do; "
+                                 "give every record an id or none")
+            columns = {ID_COLUMN: np.array([record.employee_id for record in records], dtype=np.int64),
+                       **columns}
+        return cls(columns)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        if isinstance(key, (int, np.integer)):
+            if not -self.length <= key < self.length:
+                raise IndexError("Employee index out of range")
+            inputs = {name: float(values[key]) for name, values in self.columns.items()
+                      if name in salary_engine.INPUT_COLUMNS}
+            if ID_COLUMN in self.columns:
+                inputs[ID_COLUMN] = int(self.columns[ID_COLUMN][key])
+            return EmployeeRecord(**inputs)
+        # Slices give views; index arrays and masks give copies
+        return EmployeeTable({name: values[key] for name, values in self.columns.items()})
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self[index]
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values())
+
+    @property
+    def bytes_per_employee(self):
+        return sum(values.itemsize for values in self.columns.values())
+
+    def iter_chunks(self, chunk_size=salary_engine.DEFAULT_SHARD_SIZE):
+        """Yields dicts of column views, chunk_size employees at a time"""
+        for start in range(0, self.length, chunk_size):
+            yield {name: values[start:start + chunk_size] for name, values in self.columns.items()}
+
+    def calculate(self, regime="new", tables=None):
+        """Calculates every employee's breakup (see salary_engine.calculate_salary_batch)"""
+        return salary_engine.calculate_salary_batch(self.columns, regime, tables)
+
+    def save(self, path):
+        """Writes the table to path in the memory-mappable format"""
+        with EmployeeTableWriter(path, {name: values.dtype for name, values in self.columns.items()},
+                                 rows=self.length) as writer:
+            writer.append(self.columns)
+
+    @classmethod
+    def open(cls, path, mode="r"):
+        """
+        Memory-maps a saved table.
+
+        Args:
+            mode (str): "r" for read-only columns, "r+" to update values in
+                place, "c" for writable columns whose changes stay in memory.
+        """
+        with open(path, "rb") as file:
+            magic = file.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an employee table")
+            (header_length,) = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(header_length))
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported employee table version: {header.get('version')}")
+
+        rows = header["rows"]
+        if rows == 0:
+            return cls({column["name"]: np.empty(0, dtype=column["dtype"]) for column in header["columns"]})
+        data = np.memmap(path, dtype=np.uint8, mode=mode)
+        columns = {}
+        for column in header["columns"]:
+            dtype = np.dtype(column["dtype"])
+            start = column["offset"]
+            columns[column["name"]] = data[start:start + rows * dtype.itemsize].view(dtype)
+        return cls(columns)
+
+
+def _header(rows, dtypes):
+    """Builds the file header; returns (header bytes, offset of each column, file size)"""
+    names = list(dtypes)
+    offsets = [0] * len(names)
+    # The header's own length depends on the offsets, so lay out until it is stable
+    while True:
+        header = json.dumps({"version": FORMAT_VERSION, "rows": rows, "columns": [
+            {"name": name, "dtype": np.dtype(dtypes[name]).str, "offset": offset}
+            for name, offset in zip(names, offsets)]}).encode("utf-8")
+        position = _align(len(MAGIC) + 4 + len(header))
+        layout = []
+        for name in names:
+            layout.append(position)
+            position = _align(position + rows * np.dtype(dtypes[name]).itemsize)
+        if layout == offsets:
+            return MAGIC + struct.pack("<I", len(header)) + header, offsets, position
+        offsets = layout
+
+
+def _align(position):
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+class EmployeeTableWriter:
+    """
+    Writes an employee table chunk by chunk, for inputs larger than memory.
+
+    With rows given up front the columns are written straight into place;
+    otherwise each column is spooled to a temporary file and the table is
+    assembled on close. The table is written under a temporary name and
+    renamed into place, so readers never see a partial file.
+
+    Args:
+        dtypes (Mapping[str, dtype]): Column names and types.
+        rows (int, optional): Total number of rows, if known.
+    """
+    def __init__(self, path, dtypes, rows=None):
+        self.path = path
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in dtypes.items()}
+        self.rows = rows
+        self.written = 0
+        self.temp_path = path + ".tmp"
+        if rows is None:
+            self.spools = {name: open(f"{self.temp_path}.{index}", "w+b")
+                           for index, name in enumerate(self.dtypes)}
+        else:
+            header, self.offsets, self.size = _header(rows, self.dtypes)
+            self.file = open(self.temp_path, "w+b")
+            self.file.write(header)
+
+    def append(self, columns):
+        """Appends a chunk of columns (a dict of equal-length arrays)"""
+        lengths = {len(columns[name]) for name in self.dtypes}
+        if len(lengths) != 1:
+            raise ValueError("Columns of a chunk must have the same length")
+        length = lengths.pop()
+        if self.rows is not None and self.written + length > self.rows:
+            raise ValueError(f"More than the declared {self.rows} rows")
+        for index, (name, dtype) in enumerate(self.dtypes.items()):
+            data = np.ascontiguousarray(columns[name], dtype=dtype)
+            if self.rows is None:
+                self.spools[name].write(memoryview(data).cast("B"))
+            else:
+                self.file.seek(self.offsets[index] + self.written * dtype.itemsize)
+                self.file.write(memoryview(data).cast("B"))
+        self.written += length
+
+    def close(self):
+        """Finishes the table and moves it into place"""
+        if self.rows is None:
+            header, offsets, size = _header(self.written, self.dtypes)
+            with open(self.temp_path, "wb") as file:
+                file.write(header)
+                for offset, (name, spool) in zip(offsets, self.spools.items()):
+                    file.write(b"\0" * (offset - file.tell()))
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, file, 1024 * 1024)
+                    spool.close()
+                    os.remove(spool.name)
+                file.truncate(size)
+        else:
+            if self.written != self.rows:
+                self.abort()
+                raise ValueError(f"Wrote {self.written} rows, expected {self.rows}")
+            # Pad the last column out to its aligned end
+            self.file.truncate(self.size)
+            self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        """Discards everything written so far"""
+        for handle in getattr(self, "spools", {}).values():
+            handle.close()
+            os.remove(handle.name)
+        if hasattr(self, "file"):
+            self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,119 @@
+import pytest
+from PyPDF2 import PdfReader
+
+import pdf_merge
+
+
+def write_pdf(path, kids_per_node, pages, cycle=False):
+    """
+    Writes a PDF of pages pages whose page tree splits into kids_per_node
+    (a list, one entry per level) /Pages nodes at each level. Page n (from 1)
+    has a MediaBox n points wide, so merged pages can be told apart.
+    """
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>"}
+    next_number = [3]
+
+    def number():
+        next_number[0] += 1
+        return next_number[0] - 1
+
+    def build(node_number, parent, first, count, levels):
+        if levels:
+            size = -(-count // levels[0])
+            children = []
+            for start in range(first, first + count, size):
+                child = number()
+                build(child, node_number, start, min(size, first + count - start), levels[1:])
+                children.append(child)
+        else:
+            children = []
+            for page in range(first, first + count):
+                child = number()
+                objects[child] = b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d 792] >>" % (node_number, page)
+                children.append(child)
+        kids = [b"%d 0 R" % child for child in children]
+        if cycle and parent is not None and not levels:
+            # Leaf nodes also list the root, first, among their kids
+            kids.insert(0, b"2 0 R")
+        parent_entry = b" /Parent %d 0 R" % parent if parent is not None else b""
+        objects[node_number] = b"<< /Type /Pages%s /Kids [%s] /Count %d >>" % (parent_entry, b" ".join(kids), count)
+
+    build(2, None, 1, pages, kids_per_node)
+    return write_objects(path, objects)
+
+
+def write_objects(path, objects):
+    """Writes {object number: serialized object} as a PDF whose catalog is object 1"""
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_number in sorted(objects):
+        offsets[object_number] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (object_number, objects[object_number])
+    size = max(objects) + 1
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for object_number in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[object_number] if object_number in offsets else b"0000000000 00001 f \n"
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    path.write_bytes(bytes(out))
+    return str(path)
+
+
+def write_image_pdf(path):
+    """A one-page PDF drawing an image whose soft mask and decode parameters are separate objects"""
+    mask = bytes(range(256)) * 4
+    image = bytes(reversed(range(256))) * 4
+    return write_objects(path, {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        3: b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+           b"/Resources << /XObject << /Im0 5 0 R >> >> >>",
+        4: b"<< /Length 25 >>\nstream\nq 100 0 0 100 0 0 cm /Im0 Do Q\nendstream",
+        5: b"<< /Type /XObject /Subtype /Image /Width 32 /Height 32 /ColorSpace /DeviceGray "
+           b"/BitsPerComponent 8 /SMask 6 0 R /DecodeParms 7 0 R /Length %d >>\nstream\n%s\nendstream"
+           % (len(image), image),
+        6: b"<< /Type /XObject /Subtype /Image /Width 32 /Height 32 /ColorSpace /DeviceGray "
+           b"/BitsPerComponent 8 /Length %d >>\nstream\n%s\nendstream" % (len(mask), mask),
+        7: b"<< /Predictor 1 >>",
+    })
+
+
+def merged_widths(output_path):
+    return [int(page.mediabox.width) for page in PdfReader(output_path).pages]
+
+
+@pytest.mark.parametrize("levels", [[3], [3, 2], [1, 4]])
+def test_merge_nested_page_tree(tmp_path, levels):
+    path = write_pdf(tmp_path / "nested.pdf", levels, 30)
+    output_path = str(tmp_path / "merged.pdf")
+    assert pdf_merge.merge_pdfs([path], output_path, workers=1) == 30
+    assert merged_widths(output_path) == list(range(1, 31))
+
+
+@pytest.mark.parametrize("pages, expected", [
+    ("13,17", [13, 17]),
+    ("10-11", [10, 11]),
+    ("1,-1", [1, 30]),
+    ("15-16,2", [15, 16, 2]),
+    ("20-5", list(range(20, 4, -1))),
+])
+def test_merge_nested_page_tree_ranges(tmp_path, pages, expected):
+    path = write_pdf(tmp_path / "nested.pdf", [3], 30)
+    output_path = str(tmp_path / "merged.pdf")
+    pdf_merge.merge_pdfs([pdf_merge.MergeInput(path, pages)], output_path, workers=1)
+    assert merged_widths(output_path) == expected
+
+
+def test_page_tree_cycle_is_reported(tmp_path):
+    path = write_pdf(tmp_path / "cycle.pdf", [3], 30, cycle=True)
+    with pytest.raises(ValueError, match="cycle"):
+        pdf_merge.merge_pdfs([pdf_merge.MergeInput(path, "1")], str(tmp_path / "merged.pdf"), workers=1)
+
+
+def test_deduplicate_streams_referencing_other_objects(tmp_path):
+    paths = [write_image_pdf(tmp_path / f"image{index}.pdf") for index in range(2)]
+    output_path = str(tmp_path / "merged.pdf")
+    pdf_merge.merge_pdfs(paths, output_path, workers=1, deduplicate=True)
+    images = [page["/Resources"].get_object()["/XObject"].raw_get("/Im0") for page in PdfReader(output_path).pages]
+    assert images[0].idnum == images[1].idnum
+    assert images[0].get_object()["/SMask"].get_object()["/Width"] == 32
@@ -0,0 +1,14 @@
+import salary_benchmark
+
+
+def test_golden_breakups_match_every_entry_point():
+    golden = salary_benchmark.load_golden()
+    assert golden["cases"]
+    mismatches = salary_benchmark.check_golden(golden)
+    assert not mismatches, "\n".join(map(str, mismatches[:20]))
+
+
+def test_golden_values_are_the_original_calculators():
+    for case in salary_benchmark.load_golden()["cases"]:
+        for regime, expected in case["expected"].items():
+            assert salary_benchmark.original_breakup(case["inputs"], regime) == expected
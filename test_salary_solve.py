@@ -0,0 +1,18 @@
+import csv
+
+import In_Hand_salary_calculator
+
+
+def test_solve_chooses_ctc_or_target_per_row(tmp_path):
+    input_path = tmp_path / "solve.csv"
+    input_path.write_text("id,ctc,target_in_hand\n1,1200000,\n2,,80000\n3,,\n4,900000,50000\n")
+    output_path = str(tmp_path / "structure.csv")
+    assert In_Hand_salary_calculator.run_solve(str(input_path), output_path) == 4
+
+    with open(output_path, newline="") as f:
+        rows = {row["id"]: row for row in csv.DictReader(f)}
+    assert float(rows["1"]["ctc"]) == 1200000
+    assert float(rows["2"]["in_hand_monthly"]) == 80000
+    assert rows["2"]["feasible"] == "True"
+    assert rows["3"]["feasible"] == "False"
+    assert float(rows["4"]["ctc"]) == 900000